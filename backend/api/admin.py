@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Content, Movie, TVShow, Genre, Platform, Rating, Review, WatchProgress, WatchHistory
+from .models import Content, Movie, TVShow, Genre, Platform, Rating, Review, WatchProgress, WatchHistory, PosterImage, ImportJob
 
 
 @admin.register(Genre)
@@ -54,3 +54,13 @@ class WatchHistoryAdmin(admin.ModelAdmin):
     list_filter = ['watch_date', 'session_type']
 
 
+@admin.register(PosterImage)
+class PosterImageAdmin(admin.ModelAdmin):
+    list_display = ['source_url', 'content_hash', 'width', 'height', 'fetched_at']
+    search_fields = ['source_url']
+
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'source', 'status', 'rows_processed', 'matched', 'created_content', 'unmatched', 'created_at']
+    list_filter = ['source', 'status']
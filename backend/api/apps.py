@@ -5,4 +5,12 @@ class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
 
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from . import signals  # noqa: F401
+        from .db_profiles import apply_db_profile
+        from .replica import record_replica_version
+        connection_created.connect(apply_db_profile, dispatch_uid='api_apply_db_profile')
+        connection_created.connect(record_replica_version, dispatch_uid='api_record_replica_version')
+
 
@@ -0,0 +1,69 @@
+"""
+Raw multi-row inserts for bulk loading.
+
+`bulk_create` cannot insert multi-table inheritance children (Movie, TVShow)
+and builds a model instance per row. These helpers write column tuples
+straight into one model's own table with `executemany`, for code that already
+has database-ready values (snapshot restore, synthetic data).
+"""
+from typing import Dict, Iterable, Iterator, List, Sequence
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+DEFAULT_INSERT_BATCH = 10000
+
+
+def table_columns(model) -> List[str]:
+    """Columns stored in the model's own table (for MTI children: the parent link plus own fields)."""
+    return [field.column for field in model._meta.local_concrete_fields]
+
+
+def insert_rows(model, columns: Sequence[str], rows: Iterable[Sequence], using: str = DEFAULT_DB_ALIAS,
+                batch_size: int = DEFAULT_INSERT_BATCH) -> int:
+    """INSERT `rows` (tuples ordered like `columns`) into the model's table; returns the row count.
+
+    No signals are sent and nothing is validated, so callers must bump table
+    versions and invalidate caches themselves.
+    """
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        quote(model._meta.db_table),
+        ', '.join(quote(column) for column in columns),
+        ', '.join(['%s'] * len(columns)),
+    )
+    inserted = 0
+    batch = []
+    with connection.cursor() as cursor:
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                cursor.executemany(sql, batch)
+                inserted += len(batch)
+                batch = []
+        if batch:
+            cursor.executemany(sql, batch)
+            inserted += len(batch)
+    return inserted
+
+
+def delete_all_rows(model, using: str = DEFAULT_DB_ALIAS):
+    """DELETE every row of the model's own table without collecting objects."""
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {connection.ops.quote_name(model._meta.db_table)}')
+
+
+def db_rows(model, values: Iterable[Dict], using: str = DEFAULT_DB_ALIAS) -> Iterator[tuple]:
+    """Database-ready tuples (ordered like `table_columns`) from dicts of attribute values.
+
+    Missing attributes fall back to the field default; auto_now(_add) fields
+    are not filled in and must be given explicitly.
+    """
+    connection = connections[using]
+    fields = model._meta.local_concrete_fields
+    for item in values:
+        yield tuple(
+            field.get_db_prep_save(item[field.attname] if field.attname in item else field.get_default(), connection)
+            for field in fields
+        )
@@ -0,0 +1,260 @@
+"""
+Two-tier cache backend: a per-process LRU (L1) in front of a shared cache (L2).
+
+Every gunicorn worker keeps its own L1, so reads of hot keys (recommendation
+pools, TMDB details, search results) never leave the process. Consistency
+between workers goes through per-key version stamps kept in L2 next to each
+value (`__stamp__<key>`): every write stores a fresh stamp in the same round
+trip as the value, deletes remove it, and an L1 entry is only served while the
+stamp it was cached under is still current. Workers re-check an entry's stamp
+at most once per STAMP_CHECK_INTERVAL, which bounds cross-worker staleness;
+writing one key never evicts other keys from anyone's L1.
+
+Groups (the key minus its last `_segment`, e.g. `tmdb_movie_603` ->
+`tmdb_movie`) listed in L1_BYPASS are always read from L2. Use it for keys
+that must never be stale, such as the validators behind ETags.
+
+Configure with:
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'api.cache_backends.TwoTierCache',
+            'OPTIONS': {
+                'L2': 'shared',              # alias of the shared cache
+                'L1_MAX_ENTRIES': 2000,
+                'L1_TIMEOUT': 60,            # seconds an entry may live in L1
+                'STAMP_CHECK_INTERVAL': 1.0, # seconds between stamp re-reads
+                'L1_BYPASS': ['table_version'],
+            },
+        },
+        'shared': {...},
+    }
+"""
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict, defaultdict
+from typing import Dict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+STAMP_PREFIX = '__stamp__'
+GLOBAL_STAMP = f'{STAMP_PREFIX}*'
+
+_MISSING = object()
+
+
+def key_group(key: str) -> str:
+    """Group used for L1_BYPASS and statistics: the key without its last `_` segment."""
+    if key.startswith(STAMP_PREFIX):
+        return STAMP_PREFIX
+    return key.rsplit('_', 1)[0] if '_' in key else key
+
+
+class TwoTierCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._l2_alias = options.get('L2', 'shared')
+        self._l1_max_entries = int(options.get('L1_MAX_ENTRIES', 2000))
+        self._l1_timeout = float(options.get('L1_TIMEOUT', 60))
+        self._stamp_interval = float(options.get('STAMP_CHECK_INTERVAL', 1.0))
+        self._l1_bypass = frozenset(options.get('L1_BYPASS', ()))
+        self._l1 = OrderedDict()  # l1 key -> [value, expires_at, stamp, checked_at]
+        self._global_stamp = (None, None)  # (stamp, checked_at)
+        self._stats = defaultdict(Counter)
+        self._lock = threading.RLock()
+
+    @property
+    def l2(self):
+        return caches[self._l2_alias]
+
+    # Version stamps
+
+    @staticmethod
+    def _stamp_key(key):
+        return f'{STAMP_PREFIX}{key}'
+
+    @staticmethod
+    def _new_stamp():
+        return uuid.uuid4().hex
+
+    def _fetch_global_stamp(self, force: bool = False):
+        """Stamp changed by `clear()`; re-read at most once per interval."""
+        now = time.monotonic()
+        stamp, checked_at = self._global_stamp
+        if force or checked_at is None or now - checked_at >= self._stamp_interval:
+            stamp = self.l2.get(GLOBAL_STAMP)
+            self._global_stamp = (stamp, now)
+        return stamp
+
+    def _uses_l1(self, key) -> bool:
+        return key_group(key) not in self._l1_bypass
+
+    # L1 helpers
+
+    def _l1_get(self, l1_key, key, version):
+        with self._lock:
+            entry = self._l1.get(l1_key)
+            if entry is None:
+                return _MISSING
+            value, expires_at, stamp, checked_at = entry
+            now = time.monotonic()
+            if expires_at < now:
+                del self._l1[l1_key]
+                return _MISSING
+            fresh = now - checked_at < self._stamp_interval
+        if not fresh:
+            current = (self._fetch_global_stamp(), self.l2.get(self._stamp_key(key), version=version))
+            with self._lock:
+                if current != stamp or current[1] is None:
+                    self._l1.pop(l1_key, None)
+                    return _MISSING
+                entry[3] = now
+        with self._lock:
+            if l1_key in self._l1:
+                self._l1.move_to_end(l1_key)
+        return value
+
+    def _l1_set(self, l1_key, value, timeout, stamp):
+        if stamp[1] is None:
+            return  # no stamp in L2, so other workers' writes could not be detected
+        ttl = self._l1_timeout
+        if timeout is not None and timeout is not DEFAULT_TIMEOUT:
+            ttl = min(ttl, timeout)
+        elif timeout is DEFAULT_TIMEOUT and self.default_timeout is not None:
+            ttl = min(ttl, self.default_timeout)
+        if ttl <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._l1[l1_key] = [value, now + ttl, stamp, now]
+            self._l1.move_to_end(l1_key)
+            while len(self._l1) > self._l1_max_entries:
+                self._l1.popitem(last=False)
+
+    def _l1_delete(self, l1_key):
+        with self._lock:
+            self._l1.pop(l1_key, None)
+
+    def _record(self, group, event):
+        with self._lock:
+            self._stats[group][event] += 1
+
+    # Cache API
+
+    def get(self, key, default=None, version=None):
+        l1_key = self.make_and_validate_key(key, version=version)
+        group = key_group(key)
+        if not self._uses_l1(key):
+            value = self.l2.get(key, _MISSING, version=version)
+            self._record(group, 'misses' if value is _MISSING else 'l2_hits')
+            return default if value is _MISSING else value
+        value = self._l1_get(l1_key, key, version)
+        if value is not _MISSING:
+            self._record(group, 'l1_hits')
+            return value
+        stamp_key = self._stamp_key(key)
+        # Stamp before value: a value read after a newer stamp can only be newer still
+        values = self.l2.get_many([stamp_key, key], version=version)
+        if key not in values:
+            self._record(group, 'misses')
+            return default
+        value = values[key]
+        self._record(group, 'l2_hits')
+        self._l1_set(l1_key, value, DEFAULT_TIMEOUT, (self._fetch_global_stamp(), values.get(stamp_key)))
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout=timeout, version=version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        l1_key = self.make_and_validate_key(key, version=version)
+        added = self.l2.add(key, value, timeout=self._l2_timeout(timeout), version=version)
+        if added and self._uses_l1(key):
+            stamp = self._new_stamp()
+            self.l2.set(self._stamp_key(key), stamp, timeout=self._l2_timeout(timeout), version=version)
+            self._l1_set(l1_key, value, timeout, (self._fetch_global_stamp(), stamp))
+        if added:
+            self._record(key_group(key), 'sets')
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self._l1_delete(self.make_and_validate_key(key, version=version))
+        return self.l2.touch(key, timeout=self._l2_timeout(timeout), version=version)
+
+    def delete(self, key, version=None):
+        l1_key = self.make_and_validate_key(key, version=version)
+        deleted = self.l2.delete(key, version=version)
+        if self._uses_l1(key):
+            self.l2.delete(self._stamp_key(key), version=version)
+        self._l1_delete(l1_key)
+        self._record(key_group(key), 'deletes')
+        return deleted
+
+    def incr(self, key, delta=1, version=None):
+        l1_key = self.make_and_validate_key(key, version=version)
+        value = self.l2.incr(key, delta, version=version)
+        self._l1_delete(l1_key)
+        if self._uses_l1(key):
+            # A missing stamp keeps every worker from caching the old value in L1
+            self.l2.delete(self._stamp_key(key), version=version)
+        return value
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        # Values and their stamps go to L2 in one round trip
+        stamps = {key: self._new_stamp() for key in data if self._uses_l1(key)}
+        payload = {**data, **{self._stamp_key(key): stamp for key, stamp in stamps.items()}}
+        failed = self.l2.set_many(payload, timeout=self._l2_timeout(timeout), version=version)
+        global_stamp = self._fetch_global_stamp() if stamps else None
+        for key, value in data.items():
+            if key in failed:
+                continue
+            l1_key = self.make_and_validate_key(key, version=version)
+            if key in stamps and self._stamp_key(key) not in failed:
+                self._l1_set(l1_key, value, timeout, (global_stamp, stamps[key]))
+            else:
+                self._l1_delete(l1_key)
+            self._record(key_group(key), 'sets')
+        return [key for key in failed if key in data]
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self.l2.delete_many(keys + [self._stamp_key(key) for key in keys if self._uses_l1(key)], version=version)
+        for key in keys:
+            self._l1_delete(self.make_and_validate_key(key, version=version))
+            self._record(key_group(key), 'deletes')
+
+    def has_key(self, key, version=None):
+        return self.get(key, _MISSING, version=version) is not _MISSING
+
+    def clear(self):
+        self.l2.clear()
+        self.l2.set(GLOBAL_STAMP, self._new_stamp(), None)
+        with self._lock:
+            self._l1.clear()
+        self._fetch_global_stamp(force=True)
+
+    def close(self, **kwargs):
+        self.l2.close(**kwargs)
+
+    def _l2_timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    # Statistics
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per key-group hit/miss counters for this process."""
+        with self._lock:
+            snapshot = {group: dict(counter) for group, counter in self._stats.items()}
+            l1_size = len(self._l1)
+        for counters in snapshot.values():
+            hits = counters.get('l1_hits', 0) + counters.get('l2_hits', 0)
+            lookups = hits + counters.get('misses', 0)
+            counters['hit_rate'] = round(hits / lookups, 4) if lookups else 0.0
+        return {'l1_entries': l1_size, 'groups': snapshot}
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats.clear()
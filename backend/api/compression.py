@@ -0,0 +1,129 @@
+"""
+Negotiated response compression (brotli or gzip).
+
+`CompressionMiddleware` compresses the API's JSON, NDJSON and CSV responses at
+least RESPONSE_COMPRESSION['MIN_SIZE'] bytes long with the best encoding the
+client accepts: brotli when the `brotli` package is installed, otherwise gzip.
+HTML (the admin and the browsable API) is left alone: those pages carry CSRF
+tokens next to reflected input, which compression would expose to BREACH.
+Streaming responses (exports) are compressed chunk by chunk. Strong ETags
+are weakened, as Django's GZipMiddleware does, since the bytes now depend on
+the encoding; the conditional GET check compares ETags weakly.
+"""
+import gzip
+import zlib
+from typing import Dict, Iterable, Iterator, Optional
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # optional: pip install brotli
+    brotli = None
+
+DEFAULTS = {
+    'ENABLED': True,
+    'MIN_SIZE': 1024,
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 5,
+}
+COMPRESSIBLE_TYPES = {'application/json', 'application/x-ndjson', 'text/csv'}
+
+
+def compression_settings() -> Dict:
+    return {**DEFAULTS, **getattr(settings, 'RESPONSE_COMPRESSION', {})}
+
+
+def available_encodings():
+    """Supported encodings, preferred first."""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def choose_encoding(accept_encoding: str, available=None) -> Optional[str]:
+    """The best of `available` the Accept-Encoding header allows (q-values honoured), or None."""
+    available = available or available_encodings()
+    weights = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[coding] = quality
+    best, best_quality = None, 0.0
+    for coding in available:
+        quality = weights.get(coding, weights.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def _compress(data: bytes, encoding: str, options: Dict) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=options['BROTLI_QUALITY'])
+    return gzip.compress(data, compresslevel=options['GZIP_LEVEL'], mtime=0)
+
+
+def _compress_stream(chunks: Iterable[bytes], encoding: str, options: Dict) -> Iterator[bytes]:
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=options['BROTLI_QUALITY'])
+        for chunk in chunks:
+            data = compressor.process(chunk)
+            if data:
+                yield data
+        yield compressor.finish()
+        return
+    compressor = zlib.compressobj(options['GZIP_LEVEL'], zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class CompressionMiddleware:
+    def __init__(self, get_response):
+        self.options = compression_settings()
+        if not self.options['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if response.has_header('Content-Encoding') or response.status_code in (204, 304) \
+                or getattr(response, 'is_async', False):
+            return response
+        media_type = response.get('Content-Type', '').partition(';')[0].strip().lower()
+        if media_type not in COMPRESSIBLE_TYPES:
+            return response
+        if not response.streaming and len(response.content) < self.options['MIN_SIZE']:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = _compress_stream(response.streaming_content, encoding, self.options)
+            del response['Content-Length']
+        else:
+            compressed = _compress(response.content, encoding, self.options)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,114 @@
+"""
+Conditional GET support (ETag / Last-Modified) for list and detail endpoints.
+
+Every model has a table version: a nanosecond timestamp stored in the cache and
+replaced whenever a row of that table changes (see `api.signals`). Validators
+are built from the versions of the tables an endpoint reads, so an unchanged
+resource is answered with 304 Not Modified before any query or serializer runs.
+
+Code that writes without firing model signals (`bulk_create`, `bulk_update`,
+`QuerySet.update`) must call `bump_table_versions` itself. Bumps take effect
+when the writing transaction commits.
+"""
+import hashlib
+import math
+import time
+from typing import Iterable, List
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def _version_key(model) -> str:
+    return f"table_version_{model._meta.label_lower}"
+
+
+def _with_parents(models: Iterable) -> List:
+    """Include multi-table parents: saving a Movie changes the Content table too."""
+    result = []
+    for model in models:
+        for m in [model, *model._meta.get_parent_list()]:
+            if m not in result:
+                result.append(m)
+    return result
+
+
+def table_versions(models: Iterable) -> List[int]:
+    """Current versions for `models`, initialising any that are missing."""
+    models = list(models)
+    keys = [_version_key(m) for m in models]
+    found = cache.get_many(keys)
+    versions = []
+    for key in keys:
+        version = found.get(key)
+        if version is None:
+            # Unknown (e.g. evicted): start a fresh version so no stale 304 is possible
+            cache.add(key, time.time_ns(), None)
+            version = cache.get(key) or time.time_ns()
+        versions.append(version)
+    return versions
+
+
+def _bump_now(models):
+    now = time.time_ns()
+    for model in _with_parents(models):
+        cache.set(_version_key(model), now, None)
+
+
+def bump_table_versions(*models):
+    """Mark the tables of `models` (and their parents) as changed once the current transaction commits.
+
+    Bumping before the commit would let a concurrent GET pair the new
+    validator with the old snapshot, and clients would then get 304s for
+    stale data until the next write. Outside a transaction it happens at once.
+    """
+    transaction.on_commit(lambda: _bump_now(models))
+
+
+class ConditionalGetMixin:
+    """ViewSet mixin answering list/retrieve with 304 when nothing they read changed.
+
+    Set `conditional_models` to every model the endpoint's serializers read.
+    """
+    conditional_models = ()
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(request, super().retrieve, *args, **kwargs)
+
+    def _conditional(self, request, handler, *args, **kwargs):
+        versions = table_versions(self.conditional_models)
+        fingerprint = '|'.join([
+            self.action, request.get_full_path(), request.META.get('HTTP_ACCEPT', ''),
+            *(str(v) for v in versions),
+        ])
+        etag = quote_etag(hashlib.md5(fingerprint.encode()).hexdigest())
+        last_modified = math.ceil(max(versions) / 1e9) if versions else None
+
+        if self._not_modified(request, etag, last_modified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified)
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+    @staticmethod
+    def _not_modified(request, etag, last_modified) -> bool:
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            # If-None-Match takes precedence over If-Modified-Since (RFC 9110 13.2.2)
+            # Weak comparison: CompressionMiddleware sends the ETag back as W/"..."
+            tags = [tag[2:] if tag.startswith('W/') else tag for tag in parse_etags(if_none_match)]
+            return '*' in tags or etag in tags
+        if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+        return bool(last_modified and if_modified_since and last_modified <= if_modified_since)
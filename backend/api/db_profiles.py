@@ -0,0 +1,70 @@
+"""
+SQLite tuning profiles, applied to every new connection.
+
+`settings.DB_PROFILE` (env `DB_PROFILE`) names one of PROFILES. The pragmas are
+set from a `connection_created` receiver (connected in `ApiConfig.ready`).
+
+- `default`: SQLite's stock behaviour (rollback journal, synchronous=FULL), set
+  explicitly so switching profiles on an existing file takes effect.
+- `production`: WAL so readers never block the writer, synchronous=NORMAL
+  (durable at checkpoints, safe against corruption), a 256 MB mmap, 64 MB page
+  cache, in-memory temp tables and a busy timeout instead of immediate
+  "database is locked" errors.
+
+Transactions start with a plain (deferred) BEGIN, so read-only transactions such
+as a snapshot dump never hold the write lock. Deployments dominated by
+read-then-write transactions can opt into BEGIN IMMEDIATE with
+DB_TRANSACTION_MODE, which sets DATABASES['default']['OPTIONS']['transaction_mode']
+(Django 5.1+).
+"""
+from typing import Dict
+
+from django.conf import settings
+
+PROFILES = {
+    'default': {
+        'pragmas': {
+            'journal_mode': 'DELETE',
+            'synchronous': 'FULL',
+        },
+    },
+    'production': {
+        'pragmas': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'mmap_size': 256 * 1024 * 1024,
+            'cache_size': -64 * 1024,  # negative: KiB rather than pages
+            'busy_timeout': 5000,  # milliseconds
+            'temp_store': 'MEMORY',
+        },
+    },
+}
+
+# Pragmas that write the database header; skipped on read-only connections
+WRITE_PRAGMAS = {'journal_mode', 'synchronous'}
+
+
+def get_db_profile() -> Dict:
+    name = getattr(settings, 'DB_PROFILE', 'default')
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown DB_PROFILE {name!r}; choose one of {sorted(PROFILES)}")
+
+
+def apply_db_profile(sender, connection, **kwargs):
+    """connection_created receiver: set the profile's pragmas on a new SQLite connection."""
+    if connection.vendor != 'sqlite':
+        return
+    read_only = is_read_only(connection)
+    with connection.cursor() as cursor:
+        for pragma, value in get_db_profile()['pragmas'].items():
+            if read_only and pragma in WRITE_PRAGMAS:
+                continue
+            cursor.execute(f'PRAGMA {pragma} = {value}')
+
+
+def is_read_only(connection) -> bool:
+    """Opened with a `file:...?mode=ro` URI (the read replica)."""
+    return 'mode=ro' in str(connection.settings_dict['NAME'])
+
@@ -0,0 +1,110 @@
+"""
+Per-object cache of serialized content detail payloads.
+
+Entries are dropped by the signal receivers in `api.signals` whenever the
+content, its rating, reviews, watch progress or genres change. Genre and
+platform renames affect many objects at once, so each entry also records the
+Genre/Platform table versions it was built with and is ignored once they move.
+
+Invalidation runs after the writing transaction commits, and also moves a
+per-object version. Readers take that version before they read the row and
+store it with the payload, so a payload serialized from the old row while a
+write was committing is never served afterwards.
+"""
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .conditional import table_versions
+from .models import Genre, Platform
+
+DETAIL_CACHE_TIMEOUT = 60 * 60 * 6
+# Outlive every entry, so an expired version can never make an old entry match again
+VERSION_TIMEOUT = DETAIL_CACHE_TIMEOUT * 2
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+# Bump when the payload shape changes so entries written by older code are ignored
+PAYLOAD_VERSION = 2
+
+
+def _key(content_id) -> str:
+    return f"content_detail_v{PAYLOAD_VERSION}_{content_id}"
+
+
+def _version_key(content_id) -> str:
+    return f"content_detail_version_{content_id}"
+
+
+def _record(event: str, count: int = 1):
+    with _stats_lock:
+        _stats[event] += count
+
+
+def _shared_versions():
+    return table_versions([Genre, Platform])
+
+
+def detail_versions(content_ids: Iterable[int]) -> Dict[int, int]:
+    """Current per-object versions; read them before reading the rows to be cached."""
+    content_ids = list(content_ids)
+    found = cache.get_many([_version_key(pk) for pk in content_ids])
+    return {pk: found.get(_version_key(pk), 0) for pk in content_ids}
+
+
+def get_cached_detail(content_id) -> Tuple[Optional[Dict], int]:
+    """(payload or None, object version); pass the version to `cache_detail` when filling a miss."""
+    key, version_key = _key(content_id), _version_key(content_id)
+    found = cache.get_many([key, version_key])
+    entry, version = found.get(key), found.get(version_key, 0)
+    if entry is not None and entry.get('object_version') == version and entry['versions'] == _shared_versions():
+        _record('hits')
+        return entry['data'], version
+    _record('misses')
+    return None, version
+
+
+def _entry(data: Dict, version: int, shared) -> Dict:
+    return {'versions': shared, 'object_version': version, 'data': data}
+
+
+def cache_detail(content_id, data: Dict, version: int, versions=None):
+    """Store a payload built after `version` was read (see `get_cached_detail`)."""
+    cache.set(_key(content_id), _entry(data, version, versions or _shared_versions()), DETAIL_CACHE_TIMEOUT)
+
+
+def cache_details(payloads: Dict[int, Dict], versions: Dict[int, int]):
+    """Store many payloads at once (used by the warm-up command); `versions` from `detail_versions`."""
+    shared = _shared_versions()
+    cache.set_many(
+        {_key(pk): _entry(data, versions.get(pk, 0), shared) for pk, data in payloads.items()},
+        DETAIL_CACHE_TIMEOUT,
+    )
+
+
+def _invalidate_now(content_ids):
+    version = time.time_ns()
+    cache.set_many({_version_key(pk): version for pk in content_ids}, VERSION_TIMEOUT)
+    cache.delete_many([_key(pk) for pk in content_ids])
+    _record('invalidations', len(content_ids))
+
+
+def invalidate_content_detail(content_ids: Iterable[int]):
+    """Drop the payloads of `content_ids` once the current transaction commits (at once outside one)."""
+    content_ids = {pk for pk in content_ids if pk is not None}
+    if content_ids:
+        transaction.on_commit(lambda: _invalidate_now(content_ids))
+
+
+def detail_cache_stats() -> Dict[str, float]:
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats.get('hits', 0) + stats.get('misses', 0)
+    stats['hit_rate'] = round(stats.get('hits', 0) / lookups, 4) if lookups else 0.0
+    return stats
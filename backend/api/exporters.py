@@ -0,0 +1,141 @@
+"""
+Streaming library export as CSV or JSON Lines.
+
+Rows are read with `QuerySet.iterator(chunk_size=...)`; Django runs the
+prefetches for genres, ratings, reviews (and episode progress for JSON Lines)
+once per chunk, so memory stays flat however large the library is and the
+first bytes are produced after the first chunk.
+"""
+import csv
+import io
+from typing import Dict, Iterator, Optional
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch, QuerySet
+
+from .models import Content, Rating, Review, WatchProgress
+
+DEFAULT_CHUNK_SIZE = 2000
+
+# Rows buffered per yielded piece of output
+ROWS_PER_WRITE = 200
+
+CSV_FIELDS = [
+    'id', 'content_type', 'title', 'director', 'release_date', 'status', 'platform',
+    'genres', 'tmdb_id', 'imdb_id', 'runtime', 'total_seasons', 'total_episodes',
+    'rating', 'rated_at', 'review_text', 'review_notes',
+    'watched_episodes', 'latest_season', 'latest_episode', 'created_at', 'updated_at',
+]
+
+
+def export_queryset(queryset: Optional[QuerySet] = None, include_episodes: bool = False) -> QuerySet:
+    """Content with everything an export row needs, in primary key order."""
+    queryset = Content.objects.all() if queryset is None else queryset
+    prefetches = [
+        'genre',
+        Prefetch('ratings', queryset=Rating.objects.only('id', 'content_id', 'rating', 'rated_at')),
+        Prefetch('reviews', queryset=Review.objects.only('id', 'content_id', 'review_text', 'notes', 'created_at')),
+    ]
+    if include_episodes:
+        prefetches.append(Prefetch(
+            'watch_progress',
+            queryset=WatchProgress.objects.filter(completed=True)
+            .only('id', 'content_id', 'season', 'episode', 'watched_at')
+            .order_by('season', 'episode'),
+        ))
+    return (
+        queryset.select_related('platform', 'tvshow')
+        .prefetch_related(*prefetches)
+        .order_by('pk')
+    )
+
+
+def export_rows(queryset: Optional[QuerySet] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                include_episodes: bool = False) -> Iterator[Dict]:
+    """One flat dict per content; `episodes` is added when include_episodes is set."""
+    contents = export_queryset(queryset, include_episodes)
+    for content in contents.iterator(chunk_size=chunk_size):
+        # Prefetched relations are lists already; indexing avoids a new query
+        ratings = list(content.ratings.all())
+        reviews = list(content.reviews.all())
+        rating = ratings[0] if ratings else None
+        review = reviews[0] if reviews else None
+        tv_show = getattr(content, 'tvshow', None) if content.content_type == 'tv_show' else None
+        row = {
+            'id': content.pk,
+            'content_type': content.content_type,
+            'title': content.title,
+            'director': content.director,
+            'release_date': content.release_date,
+            'status': content.status,
+            'platform': content.platform.name if content.platform else None,
+            'genres': [genre.name for genre in content.genre.all()],
+            'tmdb_id': content.tmdb_id,
+            'imdb_id': content.imdb_id,
+            'runtime': content.runtime,
+            'total_seasons': tv_show.total_seasons if tv_show else None,
+            'total_episodes': tv_show.total_episodes if tv_show else None,
+            'rating': rating.rating if rating else None,
+            'rated_at': rating.rated_at if rating else None,
+            'review_text': review.review_text if review else None,
+            'review_notes': review.notes if review else None,
+            'watched_episodes': tv_show.watched_episode_count if tv_show else None,
+            'latest_season': tv_show.latest_season if tv_show else None,
+            'latest_episode': tv_show.latest_episode if tv_show else None,
+            'created_at': content.created_at,
+            'updated_at': content.updated_at,
+        }
+        if include_episodes:
+            row['episodes'] = [
+                {'season': p.season, 'episode': p.episode, 'watched_at': p.watched_at}
+                for p in content.watch_progress.all()
+            ]
+        yield row
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, list):
+        return '|'.join(value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def stream_csv(rows: Iterator[Dict]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_FIELDS)
+    for count, row in enumerate(rows, 1):
+        writer.writerow([_csv_value(row[field]) for field in CSV_FIELDS])
+        if count % ROWS_PER_WRITE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def stream_jsonl(rows: Iterator[Dict]) -> Iterator[str]:
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    lines = []
+    for row in rows:
+        lines.append(encoder.encode(row))
+        if len(lines) >= ROWS_PER_WRITE:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+# format -> (row streamer, media type, file extension, include episode lists)
+EXPORT_FORMATS = {
+    'csv': (stream_csv, 'text/csv', 'csv', False),
+    'jsonl': (stream_jsonl, 'application/x-ndjson', 'jsonl', True),
+}
+
+
+def stream_export(export_format: str, queryset: Optional[QuerySet] = None,
+                  chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+    streamer, _, _, include_episodes = EXPORT_FORMATS[export_format]
+    return streamer(export_rows(queryset, chunk_size, include_episodes))
@@ -0,0 +1,326 @@
+"""
+Local stand-in for the TMDB and OMDB APIs.
+
+Replays recorded fixtures (and synthesizes plausible payloads for ids that were
+never recorded) so the upstream code paths in `api.utils` can be exercised and
+benchmarked without API keys or network access.
+
+Requests are routed by prefix:
+
+    /tmdb/3/...   -> TMDB API     (set TMDB_API_BASE_URL to http://host:port/tmdb/3)
+    /tmdb/img/... -> TMDB images  (set TMDB_IMAGE_BASE_URL to http://host:port/tmdb/img)
+    /omdb/        -> OMDB API     (set OMDB_API_BASE_URL to http://host:port/omdb/)
+
+Two control endpoints are available: `GET /__stats__` returns call counters and
+`POST /__reset__` clears them.
+"""
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FIXTURES = Path(__file__).resolve().parent / 'fixtures.json'
+
+REAL_UPSTREAMS = {
+    'tmdb': 'https://api.themoviedb.org/3',
+    'omdb': 'https://www.omdbapi.com',
+    'img': 'https://image.tmdb.org/t/p',
+}
+
+# Query parameters that never take part in fixture matching
+IGNORED_PARAMS = {'api_key', 'apikey', 'language'}
+
+# Smallest valid GIF, served for every poster request
+PLACEHOLDER_IMAGE = (
+    b'GIF89a\x01\x00\x01\x00\x80\x00\x00\xff\xff\xff\x00\x00\x00!\xf9\x04\x01\x00'
+    b'\x00\x00\x00,\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;'
+)
+
+SYNTHETIC_GENRES = [
+    {'id': 28, 'name': 'Action'}, {'id': 12, 'name': 'Adventure'},
+    {'id': 35, 'name': 'Comedy'}, {'id': 80, 'name': 'Crime'},
+    {'id': 18, 'name': 'Drama'}, {'id': 14, 'name': 'Fantasy'},
+    {'id': 27, 'name': 'Horror'}, {'id': 878, 'name': 'Science Fiction'},
+    {'id': 53, 'name': 'Thriller'},
+]
+
+
+def fixture_key(service: str, path: str, query: Dict[str, str]) -> str:
+    """Build the lookup key for a request, ignoring credentials and locale."""
+    params = sorted((k, v) for k, v in query.items() if k not in IGNORED_PARAMS)
+    encoded = '&'.join(f"{k}={v}" for k, v in params)
+    return f"{service} {path}?{encoded}" if encoded else f"{service} {path}"
+
+
+class TokenBucket:
+    """Thread-safe token bucket used to emulate upstream rate limits."""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self) -> bool:
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class FakeUpstream:
+    """Fixture store plus fault injection shared by all request handler threads."""
+
+    def __init__(self, fixtures_path: Optional[Path] = None, latency_ms: float = 0,
+                 jitter_ms: float = 0, error_rate: float = 0.0, rate_limit: float = 0,
+                 record: bool = False, synthesize: bool = True, seed: Optional[int] = None):
+        self.fixtures_path = Path(fixtures_path) if fixtures_path else DEFAULT_FIXTURES
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.bucket = TokenBucket(rate_limit) if rate_limit else None
+        self.record = record
+        self.synthesize = synthesize
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = Counter()
+        self.fixtures = self._load_fixtures()
+
+    def _load_fixtures(self) -> Dict[str, Dict]:
+        if not self.fixtures_path.exists():
+            return {}
+        with open(self.fixtures_path, encoding='utf-8') as fh:
+            entries = json.load(fh)
+        return {fixture_key(e['service'], e['path'], e.get('query', {})): e for e in entries}
+
+    def save_fixtures(self):
+        with self.lock:
+            entries = sorted(self.fixtures.values(), key=lambda e: (e['service'], e['path']))
+        with open(self.fixtures_path, 'w', encoding='utf-8') as fh:
+            json.dump(entries, fh, indent=2, sort_keys=True)
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {'total': sum(self.calls.values()), 'by_route': dict(self.calls)}
+
+    def reset(self):
+        with self.lock:
+            self.calls.clear()
+
+    def _count(self, service: str, path: str):
+        # Collapse numeric ids so counters group by route rather than by title
+        route = '/'.join(':id' if part.isdigit() else part for part in path.split('/'))
+        with self.lock:
+            self.calls[f"{service} {route}"] += 1
+
+    def _sleep(self):
+        delay = self.latency_ms
+        if self.jitter_ms:
+            delay += self.random.uniform(0, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+
+    def resolve(self, service: str, path: str, query: Dict[str, str]) -> Tuple[int, Dict[str, str], bytes]:
+        """Return (status, headers, body) for a request."""
+        self._count(service, path)
+        self._sleep()
+
+        if self.bucket and not self.bucket.take():
+            return 429, {'Retry-After': '1'}, json.dumps({'status_code': 25, 'status_message': 'Rate limit exceeded'}).encode()
+        with self.lock:
+            fail = self.error_rate and self.random.random() < self.error_rate
+        if fail:
+            return 503, {}, json.dumps({'status_code': 11, 'status_message': 'Injected failure'}).encode()
+
+        if service == 'img':
+            return 200, {'Content-Type': 'image/gif'}, PLACEHOLDER_IMAGE
+
+        key = fixture_key(service, path, query)
+        entry = self.fixtures.get(key) or self.fixtures.get(fixture_key(service, path, {}))
+        if entry is None and self.record:
+            entry = self._record(service, path, query, key)
+        if entry is None and self.synthesize:
+            body = synthesize(service, path, query)
+            if body is not None:
+                entry = {'status': 200, 'body': body}
+        if entry is None:
+            return 404, {}, json.dumps({'status_code': 34, 'status_message': 'The resource you requested could not be found.'}).encode()
+        return entry.get('status', 200), {'Content-Type': 'application/json'}, json.dumps(entry['body']).encode()
+
+    def _record(self, service: str, path: str, query: Dict[str, str], key: str) -> Optional[Dict]:
+        url = REAL_UPSTREAMS[service] + path
+        try:
+            response = requests.get(url, params=query, timeout=10)
+            body = response.json()
+        except Exception as exc:
+            logger.warning("Error recording %s: %s", url, exc)
+            return None
+        entry = {
+            'service': service,
+            'path': path,
+            'query': {k: v for k, v in query.items() if k not in IGNORED_PARAMS},
+            'status': response.status_code,
+            'body': body,
+        }
+        with self.lock:
+            self.fixtures[key] = entry
+        self.save_fixtures()
+        return entry
+
+
+def synthesize(service: str, path: str, query: Dict[str, str]) -> Optional[Dict]:
+    """Generate a deterministic payload for routes without a recorded fixture."""
+    parts = [p for p in path.split('/') if p]
+    if service == 'omdb':
+        imdb_id = query.get('i')
+        if imdb_id:
+            n = int(''.join(ch for ch in imdb_id if ch.isdigit()) or 0)
+            return {
+                'Response': 'True', 'Title': f"Synthetic Title {n}", 'Year': str(1980 + n % 40),
+                'Released': f"01 Jan {1980 + n % 40}", 'Runtime': f"{80 + n % 70} min",
+                'Genre': ', '.join(g['name'] for g in _pick_genres(n)), 'Director': f"Director {n % 97}",
+                'Plot': 'A synthetic plot.', 'Poster': 'N/A', 'imdbID': imdb_id,
+                'Type': 'series' if n % 3 == 0 else 'movie', 'totalSeasons': str(1 + n % 6) if n % 3 == 0 else 'N/A',
+            }
+        if query.get('s'):
+            return {'Response': 'True', 'Search': [
+                {'Title': f"{query['s'].title()} {i}", 'Year': str(2000 + i), 'imdbID': f"tt{9000000 + i:07d}",
+                 'Type': query.get('type', 'movie'), 'Poster': 'N/A'}
+                for i in range(10)
+            ]}
+        return None
+
+    if parts[:2] == ['genre', 'movie']:
+        return {'genres': SYNTHETIC_GENRES}
+    if parts and parts[0] in ('search', 'discover'):
+        kind = parts[1] if len(parts) > 1 else 'movie'
+        seed = int(hashlib.md5(json.dumps(sorted(query.items())).encode()).hexdigest()[:6], 16)
+        return {'page': 1, 'results': [_summary(kind, seed + i) for i in range(20)]}
+    if len(parts) >= 2 and parts[0] in ('movie', 'tv') and parts[1].isdigit():
+        n = int(parts[1])
+        if len(parts) == 2:
+            return _movie(n) if parts[0] == 'movie' else _tv(n)
+        if parts[2] == 'credits':
+            return {'id': n, 'cast': [], 'crew': [{'job': 'Director', 'name': f"Director {n % 97}"}]}
+        if parts[2] == 'external_ids':
+            return {'id': n, 'imdb_id': f"tt{n:07d}"}
+    return None
+
+
+def _pick_genres(n: int):
+    return [SYNTHETIC_GENRES[n % len(SYNTHETIC_GENRES)], SYNTHETIC_GENRES[(n // 7) % len(SYNTHETIC_GENRES)]]
+
+
+def _summary(kind: str, n: int) -> Dict:
+    item = {'id': 100000 + n, 'overview': 'A synthetic overview.', 'poster_path': f"/synthetic{n}.jpg"}
+    if kind == 'tv':
+        item.update({'name': f"Synthetic Show {n}", 'first_air_date': f"{1990 + n % 30}-01-01"})
+    else:
+        item.update({'title': f"Synthetic Movie {n}", 'release_date': f"{1980 + n % 40}-06-15"})
+    return item
+
+
+def _movie(n: int) -> Dict:
+    return {
+        'id': n, 'title': f"Synthetic Movie {n}", 'overview': 'A synthetic overview.',
+        'release_date': f"{1980 + n % 40}-06-15", 'poster_path': f"/synthetic{n}.jpg",
+        'runtime': 80 + n % 70, 'genres': _pick_genres(n),
+    }
+
+
+def _tv(n: int) -> Dict:
+    seasons = 1 + n % 8
+    layout = [{'season_number': s, 'episode_count': 6 + (n + s) % 18} for s in range(1, seasons + 1)]
+    return {
+        'id': n, 'name': f"Synthetic Show {n}", 'overview': 'A synthetic overview.',
+        'first_air_date': f"{1990 + n % 30}-01-01", 'poster_path': f"/synthetic{n}.jpg",
+        'number_of_seasons': seasons, 'number_of_episodes': sum(s['episode_count'] for s in layout),
+        'seasons': layout, 'genres': _pick_genres(n),
+    }
+
+
+class FakeUpstreamHandler(BaseHTTPRequestHandler):
+    """Dispatch requests to the FakeUpstream attached to the server."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status: int, headers: Dict[str, str], body: bytes):
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+        if status == 200 and self.headers.get('If-None-Match') == etag:
+            status, body = 304, b''
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if status in (200, 304):
+            self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        upstream = self.server.upstream
+        url = urlsplit(self.path)
+        query = dict(parse_qsl(url.query))
+        if url.path == '/__stats__':
+            return self._send(200, {'Content-Type': 'application/json'}, json.dumps(upstream.stats()).encode())
+        for prefix, service in (('/tmdb/3', 'tmdb'), ('/tmdb/img', 'img'), ('/omdb', 'omdb')):
+            if url.path.startswith(prefix):
+                path = url.path[len(prefix):] or '/'
+                return self._send(*upstream.resolve(service, path, query))
+        self._send(404, {}, b'')
+
+    def do_POST(self):
+        if urlsplit(self.path).path == '/__reset__':
+            self.server.upstream.reset()
+            return self._send(200, {}, b'')
+        self._send(404, {}, b'')
+
+
+class FakeUpstreamServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, upstream: FakeUpstream, host: str = '127.0.0.1', port: int = 0, verbose: bool = False):
+        super().__init__((host, port), FakeUpstreamHandler)
+        self.upstream = upstream
+        self.verbose = verbose
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def upstream_settings(self) -> Dict[str, str]:
+        """Settings overrides that point `api.utils` at this server."""
+        return {
+            'TMDB_API_BASE_URL': f"{self.base_url}/tmdb/3",
+            'TMDB_IMAGE_BASE_URL': f"{self.base_url}/tmdb/img",
+            'OMDB_API_BASE_URL': f"{self.base_url}/omdb/",
+            'TMDB_API_KEY': 'fake-upstream',
+            'OMDB_API_KEY': 'fake-upstream',
+        }
+
+    def start_in_background(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
@@ -0,0 +1,400 @@
+"""
+Bulk import of watch history from Letterboxd and IMDb CSV exports.
+
+The CSV is read incrementally in batches. For each batch:
+
+1. rows are matched to existing Content by imdb_id, then by (title, year), with
+   one query per lookup kind;
+2. the remaining rows are resolved through the upstream fetchers (OMDb by IMDb
+   id, TMDB title search otherwise) on a bounded thread pool;
+3. new Content, ratings and watch history are written, and the job's
+   `rows_processed` is advanced, in a single transaction.
+
+Because progress only moves together with the rows it covers, an interrupted
+import can be resumed from `rows_processed` without duplicating anything.
+"""
+import csv
+import itertools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models.functions import Lower
+
+from .conditional import bump_table_versions
+from .detail_cache import invalidate_content_detail
+from .models import Content, Genre, ImportJob, Movie, Rating, TVShow, WatchHistory
+from .utils import fetch_omdb_title, fetch_tmdb_movie, fetch_tmdb_tv, find_tmdb_id
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_CONCURRENCY = 4
+DEFAULT_WATCH_MINUTES = 110
+MAX_UNMATCHED_TITLES = 500
+
+IMDB_MOVIE_TYPES = {'movie', 'tvMovie', 'video', 'short', 'tvSpecial', 'tvShort'}
+IMDB_SHOW_TYPES = {'tvSeries', 'tvMiniSeries'}
+
+# Jobs running in this process, so a resume request cannot start a second runner
+_running_jobs = set()
+_running_lock = threading.Lock()
+
+
+def detect_source(header: List[str]) -> Optional[str]:
+    columns = set(header or [])
+    if {'Const', 'Your Rating'} <= columns:
+        return 'imdb'
+    if 'Letterboxd URI' in columns or {'Name', 'Year'} <= columns:
+        return 'letterboxd'
+    return None
+
+
+def _parse_date(value: str) -> Optional[date]:
+    value = (value or '').strip()
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value[:10])
+    except ValueError:
+        return None
+
+
+def _parse_year(value: str) -> Optional[int]:
+    value = (value or '').strip()
+    return int(value) if value.isdigit() else None
+
+
+def parse_letterboxd_row(row: Dict) -> Optional[Dict]:
+    """Letterboxd ratings/diary/watched rows; star ratings (0.5-5) become 1-10."""
+    title = (row.get('Name') or '').strip()
+    if not title:
+        return None
+    try:
+        stars = float(row.get('Rating') or 0)
+    except ValueError:
+        stars = 0
+    return {
+        'imdb_id': '',
+        'title': title,
+        'year': _parse_year(row.get('Year')),
+        'content_type': 'movie',
+        'rating': max(1, min(10, round(stars * 2))) if stars else None,
+        'watched_on': _parse_date(row.get('Watched Date') or row.get('Date')),
+        'runtime': None,
+    }
+
+
+def parse_imdb_row(row: Dict) -> Optional[Dict]:
+    """IMDb ratings export rows; episodes and other title types are skipped."""
+    title_type = (row.get('Title Type') or 'movie').strip()
+    if title_type in IMDB_MOVIE_TYPES:
+        content_type = 'movie'
+    elif title_type in IMDB_SHOW_TYPES:
+        content_type = 'tv_show'
+    else:
+        return None
+    imdb_id = (row.get('Const') or '').strip()
+    title = (row.get('Title') or '').strip()
+    if not imdb_id and not title:
+        return None
+    try:
+        rating = int(row.get('Your Rating') or 0) or None
+    except ValueError:
+        rating = None
+    return {
+        'imdb_id': imdb_id,
+        'title': title,
+        'year': _parse_year(row.get('Year')),
+        'content_type': content_type,
+        'rating': rating,
+        # A rated movie has been watched; IMDb only records when it was rated
+        'watched_on': _parse_date(row.get('Date Rated')) if content_type == 'movie' else None,
+        'runtime': _parse_year(row.get('Runtime (mins)')),
+    }
+
+
+ROW_PARSERS = {
+    'letterboxd': parse_letterboxd_row,
+    'imdb': parse_imdb_row,
+}
+
+
+def _title_key(title: str, year: Optional[int]):
+    return (title.strip().lower(), year)
+
+
+def _match_existing(rows: List[Dict]) -> Dict[int, int]:
+    """Map row index -> content id using one imdb_id query and one title query."""
+    matches = {}
+    imdb_ids = {row['imdb_id'] for row in rows if row['imdb_id']}
+    by_imdb = dict(
+        Content.objects.filter(imdb_id__in=imdb_ids).values_list('imdb_id', 'pk')
+    ) if imdb_ids else {}
+    for i, row in enumerate(rows):
+        if row['imdb_id'] in by_imdb:
+            matches[i] = by_imdb[row['imdb_id']]
+
+    titles = {row['title'].lower() for i, row in enumerate(rows) if i not in matches and row['title']}
+    if titles:
+        by_title = {}
+        candidates = (
+            Content.objects.annotate(title_lower=Lower('title'))
+            .filter(title_lower__in=titles)
+            .values_list('pk', 'title_lower', 'release_date', 'content_type')
+        )
+        for pk, title_lower, release_date, content_type in candidates:
+            year = release_date.year if release_date else None
+            by_title.setdefault((title_lower, content_type), {})[year] = pk
+        for i, row in enumerate(rows):
+            if i in matches or not row['title']:
+                continue
+            by_year = by_title.get((row['title'].lower(), row['content_type']), {})
+            # Exact year first; a row without a year only matches an unambiguous title
+            if row['year'] in by_year:
+                matches[i] = by_year[row['year']]
+            elif row['year'] is None and len(by_year) == 1:
+                matches[i] = next(iter(by_year.values()))
+    return matches
+
+
+def resolve_upstream(row: Dict) -> Optional[Dict]:
+    """Fetch metadata for an unmatched row: OMDb by IMDb id, else TMDB title search."""
+    if row['imdb_id']:
+        data = fetch_omdb_title(row['imdb_id'])
+        if data:
+            data['tmdb_id'] = None
+            return data
+    tmdb_id = find_tmdb_id(row['title'], row['year'], row['content_type'])
+    if not tmdb_id:
+        return None
+    data = fetch_tmdb_movie(tmdb_id) if row['content_type'] == 'movie' else fetch_tmdb_tv(tmdb_id)
+    if not data:
+        return None
+    return {**data, 'tmdb_id': tmdb_id, 'content_type': row['content_type']}
+
+
+def _create_content(data: Dict, genres_by_name: Dict[str, Genre], status: str) -> Content:
+    # Movie/TVShow use multi-table inheritance, which bulk_create does not support
+    fields = {
+        'title': data['title'],
+        'description': data.get('description') or '',
+        'release_date': data.get('release_date') or None,
+        'poster_url': data.get('poster_url') or '',
+        'tmdb_id': data.get('tmdb_id'),
+        'imdb_id': data.get('imdb_id') or '',
+        'director': data.get('director') or '',
+        'status': status,
+    }
+    if data.get('content_type') == 'tv_show':
+        content = TVShow.objects.create(
+            content_type='tv_show',
+            total_seasons=data.get('total_seasons') or 1,
+            total_episodes=data.get('total_episodes') or 0,
+            episodes_per_season=data.get('episodes_per_season') or {},
+            **fields,
+        )
+    else:
+        content = Movie.objects.create(content_type='movie', runtime=data.get('runtime') or None, **fields)
+    genre_ids = [genres_by_name[name].pk for name in data.get('genres', []) if name in genres_by_name]
+    if genre_ids:
+        Content.genre.through.objects.bulk_create(
+            [Content.genre.through(content_id=content.pk, genre_id=gid) for gid in set(genre_ids)]
+        )
+    return content
+
+
+def _genres_for(resolved: List[Dict]) -> Dict[str, Genre]:
+    names = {name for data in resolved for name in data.get('genres', [])}
+    if not names:
+        return {}
+    Genre.objects.bulk_create([Genre(name=name) for name in names], ignore_conflicts=True)
+    return {genre.name: genre for genre in Genre.objects.filter(name__in=names)}
+
+
+def _remove_upload(file_path: str):
+    """Delete a finished job's CSV if it was uploaded to MEDIA_ROOT/imports."""
+    path = Path(file_path).resolve()
+    if path.parent == (Path(settings.MEDIA_ROOT) / 'imports').resolve():
+        path.unlink(missing_ok=True)
+
+
+class HistoryImporter:
+    def __init__(self, job: ImportJob, batch_size: int = DEFAULT_BATCH_SIZE,
+                 concurrency: int = DEFAULT_CONCURRENCY, resolve: bool = True):
+        self.job = job
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        self.resolve = resolve
+        self.parse_row = ROW_PARSERS[job.source]
+
+    def batches(self) -> Iterator[List[Dict]]:
+        """Raw CSV rows in batches, starting after the rows already committed."""
+        with open(self.job.file_path, encoding='utf-8-sig', errors='replace', newline='') as handle:
+            reader = csv.DictReader(handle)
+            rows = itertools.islice(reader, self.job.rows_processed, None)
+            while True:
+                batch = list(itertools.islice(rows, self.batch_size))
+                if not batch:
+                    return
+                yield batch
+
+    def run(self) -> ImportJob:
+        job = self.job
+        job.status = 'running'
+        job.error = ''
+        job.save(update_fields=['status', 'error', 'updated_at'])
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                for raw_rows in self.batches():
+                    self._import_batch(pool, raw_rows)
+        except Exception as exc:
+            # Counters of the batch that failed were rolled back; report what was committed
+            job.refresh_from_db()
+            job.status = 'failed'
+            job.error = str(exc)
+            job.save(update_fields=['status', 'error', 'updated_at'])
+            raise
+        job.status = 'completed'
+        job.save(update_fields=['status', 'updated_at'])
+        _remove_upload(job.file_path)
+        return job
+
+    def _import_batch(self, pool: ThreadPoolExecutor, raw_rows: List[Dict]):
+        job = self.job
+        parsed = [self.parse_row(raw) for raw in raw_rows]
+        rows = [row for row in parsed if row is not None]
+        skipped = len(parsed) - len(rows)
+        matches = _match_existing(rows)
+        matched = len(matches)
+
+        # Resolve each distinct unmatched title once, with bounded concurrency
+        pending = {}
+        for i, row in enumerate(rows):
+            if i not in matches:
+                key = row['imdb_id'] or _title_key(row['title'], row['year'])
+                pending.setdefault(key, []).append(i)
+        resolved = {}
+        if pending and self.resolve:
+            keys = list(pending)
+            results = pool.map(lambda key: resolve_upstream(rows[pending[key][0]]), keys)
+            resolved = {key: data for key, data in zip(keys, results) if data and data.get('title')}
+
+        # Upstream ids that already exist locally (e.g. a differently spelled title)
+        known_tmdb = {data['tmdb_id'] for data in resolved.values() if data.get('tmdb_id')}
+        known_imdb = {data['imdb_id'] for data in resolved.values() if data.get('imdb_id')}
+        existing_by_tmdb = dict(
+            Content.objects.filter(tmdb_id__in=known_tmdb).values_list('tmdb_id', 'pk')
+        ) if known_tmdb else {}
+        existing_by_imdb = dict(
+            Content.objects.filter(imdb_id__in=known_imdb).values_list('imdb_id', 'pk')
+        ) if known_imdb else {}
+
+        unmatched_titles = [rows[idx[0]]['title'] for key, idx in pending.items() if key not in resolved]
+        with transaction.atomic():
+            genres_by_name = _genres_for([
+                data for data in resolved.values()
+                if data.get('tmdb_id') not in existing_by_tmdb and data.get('imdb_id') not in existing_by_imdb
+            ])
+            created = 0
+            for key, data in resolved.items():
+                content_id = existing_by_tmdb.get(data.get('tmdb_id')) or existing_by_imdb.get(data.get('imdb_id'))
+                if content_id is None:
+                    watched = any(rows[i]['watched_on'] or rows[i]['rating'] for i in pending[key])
+                    content_id = _create_content(data, genres_by_name, 'completed' if watched else 'wishlist').pk
+                    created += 1
+                    # Later rows for the same id within this batch
+                    if data.get('tmdb_id'):
+                        existing_by_tmdb[data['tmdb_id']] = content_id
+                    if data.get('imdb_id'):
+                        existing_by_imdb[data['imdb_id']] = content_id
+                for i in pending[key]:
+                    matches[i] = content_id
+
+            ratings = {}
+            history = []
+            runtimes = dict(Content.objects.filter(pk__in=set(matches.values())).values_list('pk', 'runtime'))
+            for i, content_id in matches.items():
+                row = rows[i]
+                if row['rating']:
+                    ratings[content_id] = row['rating']  # the last row for a title wins
+                if row['watched_on'] and row['content_type'] == 'movie':
+                    history.append(WatchHistory(
+                        content_id=content_id,
+                        watch_date=row['watched_on'],
+                        watch_time_minutes=runtimes.get(content_id) or row['runtime'] or DEFAULT_WATCH_MINUTES,
+                        session_type='movie',
+                    ))
+            Rating.objects.bulk_create(
+                [Rating(content_id=content_id, rating=value) for content_id, value in ratings.items()],
+                update_conflicts=True,
+                unique_fields=['content'],
+                update_fields=['rating'],
+            )
+            WatchHistory.objects.bulk_create(history, batch_size=500)
+
+            job.rows_processed += len(raw_rows)
+            job.matched += matched
+            job.created_content += created
+            job.unmatched += sum(len(pending[key]) for key in pending if key not in resolved)
+            job.skipped += skipped
+            job.ratings_imported += len(ratings)
+            job.history_imported += len(history)
+            room = MAX_UNMATCHED_TITLES - len(job.unmatched_titles)
+            if room > 0:
+                job.unmatched_titles = job.unmatched_titles + unmatched_titles[:room]
+            job.save()
+
+        # bulk_create does not send post_save
+        bump_table_versions(Genre, Rating, WatchHistory)
+        if ratings:
+            invalidate_content_detail(ratings)
+
+
+def _claim(job_id: int):
+    with _running_lock:
+        if job_id in _running_jobs:
+            raise RuntimeError(f'Import job {job_id} is already running')
+        _running_jobs.add(job_id)
+
+
+def _release(job_id: int):
+    with _running_lock:
+        _running_jobs.discard(job_id)
+
+
+def is_job_running(job_id: int) -> bool:
+    with _running_lock:
+        return job_id in _running_jobs
+
+
+def run_import_job(job: ImportJob, **options) -> ImportJob:
+    """Run (or resume) a job in the calling thread."""
+    _claim(job.pk)
+    try:
+        return HistoryImporter(job, **options).run()
+    finally:
+        _release(job.pk)
+
+
+def start_import_job(job: ImportJob, **options) -> threading.Thread:
+    """Run (or resume) a job on a background thread, as the upload endpoint does."""
+    _claim(job.pk)
+
+    def target():
+        try:
+            HistoryImporter(job, **options).run()
+        except Exception:
+            logger.exception("Error importing history (job %s)", job.pk)
+        finally:
+            _release(job.pk)
+            connection.close()
+
+    thread = threading.Thread(target=target, name=f'import-job-{job.pk}', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,574 @@
+"""
+Buffered WatchHistory ingest.
+
+Watch events are accepted into a bounded in-process queue and written by a
+background flusher thread with one `bulk_create` per batch, either when
+BATCH_SIZE events are waiting or FLUSH_INTERVAL seconds after the first one
+arrived. Request threads therefore never wait on the SQLite write lock for
+history rows.
+
+Durability: unless JOURNAL_DIR is empty, every accepted event is first appended
+to a per-process journal, one JSON line per event with a sequence number. Once a
+batch is committed, `done` markers covering its sequence numbers are appended.
+The journal is split into segments (`watch_history.<pid>.<id>.<n>.journal`): a new
+one is started when the current one reaches JOURNAL_MAX_BYTES, and a segment is
+deleted once every event in it is done, so the journal only ever holds what has
+not reached the database. When a process starts the pipeline, its flusher
+thread first replays, one segment at a time, the events without a `done` marker
+from segments no live process holds (a process keeps an exclusive lock on each
+segment it has open), so a crash loses nothing that was acknowledged. Replayed
+batches are marked done as they commit, so an interrupted replay resumes where
+it stopped.
+
+Failed batches: a batch that still hits OperationalError ("database is locked")
+after MAX_RETRIES is put back on the queue, up to MAX_REQUEUES times. Batches
+that fail otherwise, or too often, go to a dead-letter file next to the journal
+(`watch_history.<pid>.<id>.dead_letter`) and are marked done, so they neither
+block segment deletion nor get retried forever.
+
+Backpressure: when the queue is full, submitters wait up to SUBMIT_TIMEOUT for
+space and are then rejected. Blocked/rejected counts, the queue high-water mark
+and flush timings are reported by `stats()`.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+from django.utils import timezone
+
+from .conditional import bump_table_versions
+from .models import Content, WatchHistory
+
+logger = logging.getLogger(__name__)
+
+try:
+    import fcntl
+except ImportError:  # Windows: journals of other processes cannot be told apart
+    fcntl = None
+
+SESSION_TYPES = {choice for choice, _ in WatchHistory._meta.get_field('session_type').choices}
+
+DEFAULTS = {
+    'ENABLED': True,
+    'MAX_QUEUE': 10000,
+    'BATCH_SIZE': 500,
+    'FLUSH_INTERVAL': 1.0,
+    'SUBMIT_TIMEOUT': 0.5,
+    'JOURNAL_DIR': '',
+    'JOURNAL_MAX_BYTES': 1024 * 1024,
+    'FSYNC': False,
+    'MAX_RETRIES': 5,
+    'MAX_REQUEUES': 3,
+}
+
+_ingest = None
+_ingest_lock = threading.Lock()
+
+
+class IngestQueueFull(Exception):
+    """Raised when the ingest queue stayed full for SUBMIT_TIMEOUT seconds.
+
+    `accepted` is the number of leading events that were queued before that.
+    """
+
+    def __init__(self, message, accepted=0):
+        super().__init__(message)
+        self.accepted = accepted
+
+
+def ingest_settings() -> Dict:
+    return {**DEFAULTS, **getattr(settings, 'WATCH_HISTORY_INGEST', {})}
+
+
+def parse_watch_event(data: Dict) -> Dict:
+    """Validate one watch event; raises ValueError with a message for the client."""
+    try:
+        content_id = int(data['content'])
+        minutes = int(data.get('watch_time_minutes') or 0)
+    except (KeyError, TypeError, ValueError):
+        raise ValueError('Each event needs an integer "content" and "watch_time_minutes"')
+    if minutes <= 0:
+        raise ValueError('"watch_time_minutes" must be positive')
+    session_type = data.get('session_type') or 'episode'
+    if session_type not in SESSION_TYPES:
+        raise ValueError(f'"session_type" must be one of {sorted(SESSION_TYPES)}')
+    watch_date = data.get('watch_date')
+    if watch_date:
+        try:
+            watch_date = date.fromisoformat(str(watch_date)[:10]).isoformat()
+        except ValueError:
+            raise ValueError('"watch_date" must be an ISO date')
+    else:
+        watch_date = timezone.now().date().isoformat()
+    return {
+        'content_id': content_id,
+        'watch_date': watch_date,
+        'watch_time_minutes': minutes,
+        'session_type': session_type,
+    }
+
+
+def write_watch_events(events: List[Dict], batch_size: int = 500) -> int:
+    """Insert parsed events directly; events for deleted content are skipped."""
+    if not events:
+        return 0
+    with transaction.atomic():
+        existing = set(
+            Content.objects.filter(pk__in={e['content_id'] for e in events}).values_list('pk', flat=True)
+        )
+        rows = [
+            WatchHistory(
+                content_id=e['content_id'],
+                watch_date=date.fromisoformat(e['watch_date']),
+                watch_time_minutes=e['watch_time_minutes'],
+                session_type=e['session_type'],
+            )
+            for e in events if e['content_id'] in existing
+        ]
+        WatchHistory.objects.bulk_create(rows, batch_size=batch_size)
+    # bulk_create does not send post_save
+    bump_table_versions(WatchHistory)
+    return len(rows)
+
+
+def _seq_ranges(seqs: Iterable[int]) -> List[List[int]]:
+    """Sequence numbers collapsed into sorted [first, last] runs."""
+    ranges = []
+    for seq in sorted(seqs):
+        if ranges and seq == ranges[-1][1] + 1:
+            ranges[-1][1] = seq
+        else:
+            ranges.append([seq, seq])
+    return ranges
+
+
+def _merge_ranges(ranges: Iterable[List[int]]) -> List[List[int]]:
+    """Overlapping or adjacent [first, last] ranges merged and sorted."""
+    merged = []
+    for first, last in sorted(ranges):
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], last)
+        else:
+            merged.append([first, last])
+    return merged
+
+
+class _Segment:
+    """One journal file, locked for as long as it is open."""
+
+    def __init__(self, path: Path, fsync: bool):
+        self.path = path
+        self.fsync = fsync
+        self.pending = 0
+        self._file = open(path, 'a', encoding='utf-8')
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    def _write(self, text: str):
+        self._file.write(text)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def append(self, first_seq: int, events: List[Dict]):
+        self._write(''.join(
+            json.dumps({'seq': first_seq + i, 'event': event}, separators=(',', ':')) + '\n'
+            for i, event in enumerate(events)
+        ))
+        self.pending += len(events)
+
+    def mark_done(self, seqs: List[int]):
+        self._write(''.join(json.dumps({'done': run}) + '\n' for run in _seq_ranges(seqs)))
+        self.pending -= len(seqs)
+
+    def size(self) -> int:
+        return self._file.tell()
+
+    def close(self):
+        self._file.close()
+        if self.pending == 0:
+            self.path.unlink(missing_ok=True)
+
+
+class _Journal:
+    """Append-only event log for one process, split into segments of about `max_bytes`."""
+
+    def __init__(self, directory: Path, fsync: bool, max_bytes: int):
+        directory.mkdir(parents=True, exist_ok=True)
+        self.prefix = f'watch_history.{os.getpid()}.{uuid.uuid4().hex[:8]}'
+        self.directory = directory
+        self.fsync = fsync
+        self.max_bytes = max_bytes
+        self.dead_letter_path = directory / f'{self.prefix}.dead_letter'
+        self._index = 0
+        self.segments: List[_Segment] = []  # oldest first; the last one is appended to
+        self._open_segment()
+
+    @property
+    def current(self) -> _Segment:
+        return self.segments[-1]
+
+    @property
+    def pending(self) -> int:
+        return sum(segment.pending for segment in self.segments)
+
+    def _open_segment(self):
+        self._index += 1
+        path = self.directory / f'{self.prefix}.{self._index:06d}.journal'
+        self.segments.append(_Segment(path, self.fsync))
+
+    def _rotate_if_full(self):
+        if self.current.size() >= self.max_bytes:
+            full = self.current
+            self._open_segment()
+            self._release(full)
+
+    def _release(self, segment: _Segment):
+        # Segments still holding pending events stay open (and locked) until they drain
+        if segment.pending == 0 and segment is not self.current:
+            self.segments.remove(segment)
+            segment.close()
+
+    def append(self, first_seq: int, events: List[Dict]) -> _Segment:
+        segment = self.current
+        segment.append(first_seq, events)
+        self._rotate_if_full()
+        return segment
+
+    def mark_done(self, segment: _Segment, seqs: List[int]):
+        segment.mark_done(seqs)
+        self._release(segment)
+        self._rotate_if_full()
+
+    def dead_letter(self, items: List, error: str):
+        with open(self.dead_letter_path, 'a', encoding='utf-8') as handle:
+            handle.write(''.join(
+                json.dumps({'seq': seq, 'event': event, 'error': error}, separators=(',', ':')) + '\n'
+                for seq, event, _, _ in items
+            ))
+
+    def close(self):
+        """Close every segment; fully processed ones are deleted."""
+        for segment in self.segments:
+            segment.close()
+        self.segments = []
+
+
+def _read_pending(path: Path) -> List[Tuple[int, Dict]]:
+    """(seq, event) pairs in a journal segment that have no `done` marker. A torn last line is ignored."""
+    events = {}
+    done = []
+    with open(path, encoding='utf-8') as handle:
+        for line in handle:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if 'seq' in entry:
+                events[entry['seq']] = entry['event']
+            elif 'done' in entry:
+                done.append(entry['done'])
+    pending = []
+    ranges = iter(_merge_ranges(done))
+    current = next(ranges, None)
+    for seq in sorted(events):
+        while current is not None and current[1] < seq:
+            current = next(ranges, None)
+        if current is None or seq < current[0]:
+            pending.append((seq, events[seq]))
+    return pending
+
+
+class WatchHistoryIngest:
+    def __init__(self, options: Optional[Dict] = None):
+        options = {**ingest_settings(), **(options or {})}
+        self.pid = os.getpid()
+        self.batch_size = max(1, int(options['BATCH_SIZE']))
+        self.flush_interval = float(options['FLUSH_INTERVAL'])
+        self.submit_timeout = float(options['SUBMIT_TIMEOUT'])
+        self.max_retries = int(options['MAX_RETRIES'])
+        self.max_requeues = int(options['MAX_REQUEUES'])
+        self.journal_max_bytes = int(options['JOURNAL_MAX_BYTES'])
+        self.journal_dir = Path(options['JOURNAL_DIR']) if options['JOURNAL_DIR'] else None
+        self.fsync = bool(options['FSYNC'])
+
+        self._queue = queue.Queue(maxsize=max(1, int(options['MAX_QUEUE'])))
+        self._lock = threading.Lock()
+        self._next_seq = 1
+        self._journal = None
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._stats = {
+            'submitted': 0, 'rejected': 0, 'blocked_submits': 0, 'blocked_seconds': 0.0,
+            'written': 0, 'dropped': 0, 'batches': 0, 'flush_errors': 0,
+            'last_flush_ms': None, 'replayed': 0, 'queue_high_water': 0,
+            'requeued': 0, 'dead_lettered': 0,
+        }
+
+    # Lifecycle
+
+    def start(self):
+        """Open this process's journal and start the flusher, which first replays abandoned journals."""
+        if self._thread is not None:
+            return
+        if self.journal_dir is not None:
+            self._journal = _Journal(self.journal_dir, self.fsync, self.journal_max_bytes)
+        self._thread = threading.Thread(target=self._run, name='watch-history-ingest', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self, timeout: float = 10.0):
+        """Flush everything still queued and stop the flusher."""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._wake.set()
+        self._thread.join(timeout)
+        self._thread = None
+        if self._journal is not None:
+            with self._lock:
+                # Segments with pending events stay behind for the next process to replay
+                self._journal.close()
+            self._journal = None
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Wait until every queued event has been written; False on timeout."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            self._wake.set()
+            time.sleep(0.005)
+        return True
+
+    def _replay_journals(self):
+        """Write the pending events of segments no live process holds, one segment at a time.
+
+        Runs on the flusher thread. Each batch gets a `done` marker in its segment
+        as soon as it commits, so a crash mid-replay does not insert it again.
+        """
+        for path in sorted(self.journal_dir.glob('watch_history.*.journal')):
+            if path.name.startswith(f'{self._journal.prefix}.'):
+                continue
+            try:
+                handle = open(path, 'a', encoding='utf-8')
+            except OSError:
+                continue
+            try:
+                if fcntl is not None:
+                    try:
+                        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except OSError:
+                        continue  # held by a live process
+                pending = _read_pending(path)
+                for i in range(0, len(pending), self.batch_size):
+                    batch = pending[i:i + self.batch_size]
+                    written = write_watch_events([event for _, event in batch], self.batch_size)
+                    runs = _seq_ranges(seq for seq, _ in batch)
+                    handle.write(''.join(json.dumps({'done': run}) + '\n' for run in runs))
+                    handle.flush()
+                    with self._lock:
+                        self._stats['replayed'] += written
+                path.unlink()
+            except Exception:
+                # Left in place (with the batches written so far marked done) for the next start
+                logger.exception("Error replaying watch history journal %s", path)
+            finally:
+                handle.close()
+
+    # Producers
+
+    def submit(self, event: Dict) -> int:
+        return self.submit_many([event])
+
+    def submit_many(self, events: List[Dict]) -> int:
+        """Queue parsed events. Raises IngestQueueFull if they could not all be queued."""
+        if not events:
+            return 0
+        if self._thread is None:
+            self.start()
+        with self._lock:
+            first_seq = self._next_seq
+            self._next_seq += len(events)
+            segment = self._journal.append(first_seq, events) if self._journal is not None else None
+
+        accepted = 0
+        blocked_since = None
+        deadline = time.monotonic() + self.submit_timeout
+        for offset, event in enumerate(events):
+            item = (first_seq + offset, event, segment, 0)
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                if blocked_since is None:
+                    blocked_since = time.monotonic()
+                try:
+                    self._queue.put(item, timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Full:
+                    break
+            accepted += 1
+
+        with self._lock:
+            self._stats['submitted'] += accepted
+            self._stats['queue_high_water'] = max(self._stats['queue_high_water'], self._queue.qsize())
+            if blocked_since is not None:
+                self._stats['blocked_submits'] += 1
+                self._stats['blocked_seconds'] += time.monotonic() - blocked_since
+            if accepted < len(events):
+                self._stats['rejected'] += len(events) - accepted
+                if segment is not None:
+                    self._journal.mark_done(segment, list(range(first_seq + accepted, first_seq + len(events))))
+        if accepted > self.batch_size // 2:
+            self._wake.set()
+        if accepted < len(events):
+            raise IngestQueueFull(
+                f'{len(events) - accepted} of {len(events)} events rejected: ingest queue is full', accepted
+            )
+        return accepted
+
+    # Flusher
+
+    def _run(self):
+        if self._journal is not None:
+            self._replay_journals()
+        while True:
+            batch = self._collect()
+            if batch:
+                self._flush_batch(batch)
+            elif self._stopping.is_set():
+                connection.close()
+                return
+
+    def _collect(self) -> List:
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            self._wake.clear()
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._wake.is_set() or self._stopping.is_set():
+                break
+            try:
+                batch.append(self._queue.get(timeout=min(remaining, 0.05)))
+            except queue.Empty:
+                pass
+        self._wake.clear()
+        return batch
+
+    def _flush_batch(self, batch: List):
+        events = [event for _, event, _, _ in batch]
+        started = time.monotonic()
+        written = None
+        transient = False
+        for attempt in range(self.max_retries + 1):
+            try:
+                written = write_watch_events(events, self.batch_size)
+                break
+            except OperationalError as exc:
+                # Typically "database is locked"; back off and try again
+                with self._lock:
+                    self._stats['flush_errors'] += 1
+                if attempt == self.max_retries:
+                    logger.error("Error flushing %d watch events: %s", len(events), exc)
+                    transient, error = True, str(exc)
+                else:
+                    time.sleep(min(2.0, 0.05 * 2 ** attempt))
+            except Exception as exc:
+                with self._lock:
+                    self._stats['flush_errors'] += 1
+                logger.exception("Error flushing %d watch events", len(events))
+                error = repr(exc)
+                break
+
+        with self._lock:
+            if written is not None:
+                self._stats['written'] += written
+                self._stats['dropped'] += len(events) - written
+                self._stats['batches'] += 1
+                self._stats['last_flush_ms'] = round((time.monotonic() - started) * 1000, 2)
+                self._mark_done(batch)
+            else:
+                self._handle_failed(batch, transient, error)
+        for _ in batch:
+            self._queue.task_done()
+
+    def _mark_done(self, items: List):
+        if self._journal is None:
+            return
+        by_segment = {}
+        for seq, _, segment, _ in items:
+            by_segment.setdefault(segment, []).append(seq)
+        for segment, seqs in by_segment.items():
+            self._journal.mark_done(segment, seqs)
+
+    def _handle_failed(self, batch: List, transient: bool, error: str):
+        """Re-queue a batch that hit a transient error, dead-letter anything else."""
+        if transient and self._stopping.is_set() and self._journal is not None:
+            return  # left pending in the journal for the next process to replay
+        dead = []
+        for seq, event, segment, requeues in batch:
+            if transient and requeues < self.max_requeues and not self._stopping.is_set():
+                try:
+                    self._queue.put_nowait((seq, event, segment, requeues + 1))
+                    self._stats['requeued'] += 1
+                    continue
+                except queue.Full:
+                    pass
+            dead.append((seq, event, segment, requeues))
+        if not dead:
+            return
+        self._stats['dead_lettered'] += len(dead)
+        if self._journal is None:
+            logger.error("Dropping %d watch events that could not be written", len(dead))
+            return
+        self._journal.dead_letter(dead, error)
+        self._mark_done(dead)
+
+    # Metrics
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            journal = self._journal
+            stats['journal_pending'] = journal.pending if journal is not None else 0
+            stats['journal_segments'] = len(journal.segments) if journal is not None else 0
+            stats['journal'] = str(journal.current.path) if journal is not None and journal.segments else None
+        stats['blocked_seconds'] = round(stats['blocked_seconds'], 3)
+        stats['queue_depth'] = self._queue.qsize()
+        stats['queue_capacity'] = self._queue.maxsize
+        stats['queue_utilization'] = round(stats['queue_depth'] / self._queue.maxsize, 4)
+        stats['avg_batch_size'] = round(stats['written'] / stats['batches'], 1) if stats['batches'] else 0
+        stats['running'] = self._thread is not None and self._thread.is_alive()
+        return stats
+
+
+def get_watch_history_ingest() -> Optional[WatchHistoryIngest]:
+    """The process-wide pipeline, or None when WATCH_HISTORY_INGEST is disabled."""
+    global _ingest
+    if not ingest_settings()['ENABLED']:
+        return None
+    with _ingest_lock:
+        # A forked worker must not reuse its parent's thread or journal
+        if _ingest is None or _ingest.pid != os.getpid():
+            _ingest = WatchHistoryIngest()
+            _ingest.start()
+        return _ingest
+
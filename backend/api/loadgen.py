@@ -0,0 +1,316 @@
+"""
+Asyncio HTTP load generator replaying the frontend's user journeys.
+
+Each virtual user keeps one keep-alive connection and walks a journey the
+way the React pages do: the Home list (optionally searched or filtered), the
+Movies or TV Shows page, a ContentDetail bundle, then maybe a rating or a
+watched episode followed by the bundle reload. Users pause for a random think
+time between steps and echo the X-DB-Fence header like the frontend, so
+read-your-writes routing behaves as it does for real clients.
+
+Only the standard library is used (asyncio streams and a minimal HTTP/1.1
+client), so it runs wherever the backend runs. `manage.py loadgen` drives it.
+"""
+import asyncio
+import json
+import random
+import ssl
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+from .bench import summarize
+from .replica import FENCE_HEADER
+
+# name -> relative weight
+JOURNEYS = {'browse': 4, 'movies': 2, 'tv_shows': 3, 'search': 2}
+SEARCH_TERMS = ('Storm', 'Night', 'City', 'Ghost', 'Star', 'Winter', 'Lost', 'Iron')
+STATUS_FILTERS = ('', '', 'watching', 'completed', 'wishlist')
+RATE_SHARE = 0.3
+MARK_EPISODE_SHARE = 0.6
+
+
+class HTTPError(Exception):
+    pass
+
+
+@dataclass
+class Response:
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+
+    def json(self):
+        return json.loads(self.body) if self.body else None
+
+
+class Connection:
+    """One keep-alive HTTP/1.1 connection; reconnects when the server closes it."""
+
+    def __init__(self, base_url: str, timeout: float):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.ssl = ssl.create_default_context() if parts.scheme == 'https' else None
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.reader = self.writer = None
+
+    async def request(self, method: str, path: str, body=None, headers: Optional[Dict] = None) -> Response:
+        for attempt in (1, 2):
+            reused = self.writer is not None
+            try:
+                return await asyncio.wait_for(self._request(method, path, body, headers or {}), self.timeout)
+            except (ConnectionError, asyncio.IncompleteReadError, HTTPError):
+                await self.close()
+                # A keep-alive connection the server dropped while idle: retry once on a fresh one
+                if not reused or attempt == 2:
+                    raise
+            except asyncio.TimeoutError:
+                await self.close()
+                raise
+
+    async def _request(self, method, path, body, headers) -> Response:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port, ssl=self.ssl)
+        payload = json.dumps(body).encode() if body is not None else b''
+        lines = [
+            f'{method} {self.prefix}{path} HTTP/1.1',
+            f'Host: {self.host}:{self.port}',
+            'Accept: application/json',
+            'Connection: keep-alive',
+        ]
+        if body is not None:
+            lines += ['Content-Type: application/json', f'Content-Length: {len(payload)}']
+        lines += [f'{name}: {value}' for name, value in headers.items()]
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + payload)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise HTTPError('Connection closed before the response')
+        try:
+            status = int(status_line.split()[1])
+        except (IndexError, ValueError):
+            raise HTTPError(f'Malformed status line: {status_line[:80]!r}')
+        response_headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+
+        if response_headers.get('transfer-encoding', '').lower() == 'chunked':
+            body = await self._read_chunked()
+        elif 'content-length' in response_headers:
+            body = await self.reader.readexactly(int(response_headers['content-length']))
+        else:
+            body = await self.reader.read()
+            response_headers['connection'] = 'close'
+        if response_headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return Response(status, response_headers, body)
+
+    async def _read_chunked(self) -> bytes:
+        chunks = []
+        while True:
+            size = int((await self.reader.readline()).split(b';')[0], 16)
+            if size == 0:
+                await self.reader.readline()
+                return b''.join(chunks)
+            chunks.append(await self.reader.readexactly(size))
+            await self.reader.readline()
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except (ConnectionError, ssl.SSLError):
+                pass
+        self.reader = self.writer = None
+
+
+@dataclass
+class StepStats:
+    latencies_ms: List[float] = field(default_factory=list)
+    errors: Dict[str, int] = field(default_factory=dict)
+
+    def record(self, ms: float, error: Optional[str]):
+        self.latencies_ms.append(ms)
+        if error:
+            self.errors[error] = self.errors.get(error, 0) + 1
+
+
+class VirtualUser:
+    def __init__(self, runner: 'LoadRunner', index: int):
+        self.runner = runner
+        self.rng = random.Random(runner.seed * 7919 + index)
+        self.connection = Connection(runner.base_url, runner.timeout)
+        self.fence = None
+
+    async def call(self, step: str, method: str, path: str, body=None) -> Optional[Response]:
+        """Run one request and record it under `step`; None when it failed or the run is over."""
+        if time.monotonic() >= self.runner.deadline:
+            return None
+        headers = {FENCE_HEADER: self.fence} if self.fence else {}
+        started = time.perf_counter()
+        response, error = None, None
+        try:
+            response = await self.connection.request(method, path, body, headers)
+            if response.status >= 400:
+                error = str(response.status)
+        except asyncio.TimeoutError:
+            error = 'timeout'
+        except (OSError, asyncio.IncompleteReadError, HTTPError) as exc:
+            error = type(exc).__name__
+        self.runner.record(step, (time.perf_counter() - started) * 1000, error)
+        if response is None or error:
+            return None
+        fence = response.headers.get(FENCE_HEADER.lower())
+        if fence:
+            self.fence = fence
+        return response
+
+    async def think(self):
+        if self.runner.think_time:
+            await asyncio.sleep(self.rng.expovariate(1 / self.runner.think_time))
+
+    async def run(self, deadline: float):
+        names, weights = list(self.runner.journeys), list(self.runner.journeys.values())
+        try:
+            while time.monotonic() < deadline:
+                journey = self.rng.choices(names, weights)[0]
+                await getattr(self, f'journey_{journey}')()
+                await self.think()
+        finally:
+            await self.connection.close()
+
+    # Journeys
+
+    async def journey_browse(self):
+        params = {}
+        status = self.rng.choice(STATUS_FILTERS)
+        if status:
+            params['status'] = status
+        response = await self.call('home', 'GET', f'/api/content/?{urlencode(params)}')
+        await self._open_one(response)
+
+    async def journey_search(self):
+        query = urlencode({'search': self.rng.choice(SEARCH_TERMS)})
+        response = await self.call('search', 'GET', f'/api/content/?{query}')
+        await self._open_one(response)
+
+    async def journey_movies(self):
+        await self._open_one(await self.call('movies', 'GET', '/api/content/movies/'))
+
+    async def journey_tv_shows(self):
+        await self._open_one(await self.call('tv_shows', 'GET', '/api/content/tv_shows/'))
+
+    async def _open_one(self, listing: Optional[Response]):
+        if listing is None:
+            return
+        data = listing.json()
+        items = data.get('results', []) if isinstance(data, dict) else data
+        if not items:
+            return
+        await self.think()
+        await self._detail(self.rng.choice(items)['id'])
+
+    async def _detail(self, content_id: int):
+        response = await self.call('detail', 'GET', f'/api/content/{content_id}/bundle/')
+        if response is None:
+            return
+        content = response.json()['content']
+        if self.runner.read_only:
+            return
+        if content['content_type'] == 'tv_show' and content['status'] == 'watching' \
+                and self.rng.random() < MARK_EPISODE_SHARE:
+            season, episode = next_episode(content)
+            await self.think()
+            body = {'content': content_id, 'season': season, 'episode': episode}
+            if await self.call('mark_episode', 'POST', '/api/watch-progress/mark_episode/', body):
+                # The page reloads its bundle after marking
+                await self.call('detail', 'GET', f'/api/content/{content_id}/bundle/')
+        elif self.rng.random() < RATE_SHARE:
+            await self.think()
+            body = {'content': content_id, 'rating': self.rng.randint(5, 10)}
+            await self.call('rate', 'POST', '/api/ratings/', body)
+
+
+def next_episode(content: Dict) -> Tuple[int, int]:
+    """The episode after the latest watched one, per the show's season layout."""
+    progress = content.get('progress_info') or {}
+    season = progress.get('latest_season') or 1
+    episode = (progress.get('latest_episode') or 0) + 1
+    layout = content.get('episodes_per_season') or {}
+    if str(season) in layout and episode > int(layout[str(season)]) and str(season + 1) in layout:
+        season, episode = season + 1, 1
+    return season, episode
+
+
+class LoadRunner:
+    def __init__(self, base_url: str, users: int = 10, duration: float = 30, think_time: float = 1.0,
+                 ramp_up: float = 0, timeout: float = 30, seed: int = 42, read_only: bool = False,
+                 journeys: Optional[Dict[str, int]] = None):
+        self.base_url = base_url
+        self.users = users
+        self.duration = duration
+        self.think_time = think_time
+        self.ramp_up = ramp_up
+        self.timeout = timeout
+        self.seed = seed
+        self.read_only = read_only
+        self.journeys = journeys or JOURNEYS
+        self.steps: Dict[str, StepStats] = {}
+        self.window_start = self.deadline = None
+
+    def record(self, step: str, ms: float, error: Optional[str]):
+        # Requests still running when the ramp-up ends belong to the warm-up
+        if self.window_start is None or time.monotonic() < self.window_start:
+            return
+        self.steps.setdefault(step, StepStats()).record(ms, error)
+
+    async def _start_user(self, index: int, deadline: float):
+        if self.ramp_up:
+            await asyncio.sleep(self.ramp_up * index / self.users)
+        await VirtualUser(self, index).run(deadline)
+
+    async def run(self) -> Dict:
+        started = time.monotonic()
+        self.window_start = started + self.ramp_up
+        self.deadline = self.window_start + self.duration
+        await asyncio.gather(*(self._start_user(i, self.deadline) for i in range(self.users)))
+        elapsed = max(time.monotonic() - self.window_start, 1e-9)
+        return self.report(elapsed)
+
+    def report(self, elapsed: float) -> Dict:
+        steps = {}
+        all_latencies, total_errors = [], 0
+        for name, stats in sorted(self.steps.items()):
+            errors = sum(stats.errors.values())
+            total_errors += errors
+            all_latencies += stats.latencies_ms
+            steps[name] = {
+                'requests': len(stats.latencies_ms),
+                'requests_per_second': round(len(stats.latencies_ms) / elapsed, 2),
+                'error_rate': round(errors / len(stats.latencies_ms), 4),
+                'errors': stats.errors,
+                'latency': summarize(stats.latencies_ms),
+            }
+        total = len(all_latencies)
+        return {
+            'users': self.users,
+            'seconds': round(elapsed, 2),
+            'requests': total,
+            'requests_per_second': round(total / elapsed, 2),
+            'error_rate': round(total_errors / total, 4) if total else 0.0,
+            'latency': summarize(all_latencies),
+            'steps': steps,
+        }
+
+
+def run_load(**options) -> Dict:
+    return asyncio.run(LoadRunner(**options).run())
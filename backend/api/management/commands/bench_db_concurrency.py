@@ -0,0 +1,171 @@
+"""
+Management command to benchmark concurrent reads and writes under each SQLite DB profile
+"""
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connection, connections, transaction
+from django.db.models import Count
+from django.test.utils import override_settings, setup_databases, teardown_databases
+from django.utils import timezone
+
+from api.bulk import db_rows, insert_rows, table_columns
+from api.db_profiles import PROFILES
+from api.models import Content, Movie, WatchHistory
+
+# profile -> CONN_MAX_AGE it is measured with: stock settings reconnect per request
+SCENARIOS = [('default', 0), ('production', 600)]
+
+
+class Command(BaseCommand):
+    help = 'Measures read/write throughput and lock errors with concurrent threads for each DB profile'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8, help='Reader threads')
+        parser.add_argument('--writers', type=int, default=4, help='Writer threads')
+        parser.add_argument('--seconds', type=float, default=5.0, help='Duration of each run')
+        parser.add_argument('--content', type=int, default=2000, help='Synthetic titles to seed')
+        parser.add_argument('--profile', choices=sorted(PROFILES), action='append',
+                            help='Only run these profiles (repeatable)')
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    def handle(self, *args, **options):
+        if options['readers'] < 0 or options['writers'] < 1:
+            raise CommandError('Need at least one writer and a non-negative number of readers')
+        scenarios = [s for s in SCENARIOS if not options['profile'] or s[0] in options['profile']]
+
+        with tempfile.TemporaryDirectory() as workdir, override_settings(
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        ):
+            # Locking only shows up with a real file; the default SQLite test database lives in memory
+            test_settings = connection.settings_dict['TEST']
+            old_name = test_settings.get('NAME')
+            test_settings['NAME'] = os.path.join(workdir, 'bench.sqlite3')
+            old_config = setup_databases(verbosity=0, interactive=False)
+            try:
+                self._populate(options['content'])
+                results = [self._run(profile, max_age, options) for profile, max_age in scenarios]
+            finally:
+                connections.close_all()
+                teardown_databases(old_config, verbosity=0)
+                test_settings['NAME'] = old_name
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(
+            f"{options['readers']} readers, {options['writers']} writers, {options['seconds']:.0f}s per profile"
+        )
+        self.stdout.write(
+            f"{'profile':<12}{'max age':>8}{'reads/s':>10}{'writes/s':>10}{'read p95':>10}{'write p95':>11}"
+            f"{'lock errs':>11}"
+        )
+        for r in results:
+            self.stdout.write(
+                f"{r['profile']:<12}{r['conn_max_age']:>8}{r['reads_per_second']:>10.0f}{r['writes_per_second']:>10.0f}"
+                f"{r['read_p95_ms']:>8.1f}ms{r['write_p95_ms']:>9.1f}ms{r['lock_errors']:>11}"
+            )
+        if len(results) == 2 and results[0]['writes_per_second']:
+            before, after = results
+            self.stdout.write(self.style.SUCCESS(
+                f"{after['profile']}: {after['reads_per_second'] / max(before['reads_per_second'], 1):.1f}x reads, "
+                f"{after['writes_per_second'] / before['writes_per_second']:.1f}x writes vs {before['profile']}"
+            ))
+
+    def _populate(self, count):
+        now = timezone.now()
+        rng = random.Random(42)
+        insert_rows(Content, table_columns(Content), db_rows(Content, (
+            {
+                'id': pk, 'title': f'Title {pk}', 'content_type': 'movie',
+                'status': rng.choice(['watching', 'completed', 'wishlist', 'paused']),
+                'runtime': rng.randint(80, 160), 'created_at': now, 'updated_at': now,
+            }
+            for pk in range(1, count + 1)
+        )))
+        insert_rows(Movie, table_columns(Movie), db_rows(Movie, ({'content_ptr_id': pk} for pk in range(1, count + 1))))
+
+    def _run(self, profile, max_age, options):
+        connections.close_all()
+        settings_dict = connections.settings[DEFAULT_DB_ALIAS]
+        old_max_age = settings_dict['CONN_MAX_AGE']
+        settings_dict['CONN_MAX_AGE'] = max_age
+
+        stop = threading.Event()
+        start = threading.Barrier(options['readers'] + options['writers'] + 1)
+        lock = threading.Lock()
+        totals = {'reads': [], 'writes': [], 'lock_errors': 0}
+        content_count = options['content']
+
+        def read(rng):
+            status = rng.choice(['watching', 'completed', 'wishlist', 'paused'])
+            list(Content.objects.filter(status=status).order_by('-created_at')[:20].values('id', 'title'))
+            WatchHistory.objects.values('session_type').annotate(n=Count('id')).count()
+
+        def write(rng):
+            # Read-then-write, like a view that loads the title before logging the session
+            with transaction.atomic():
+                content = Content.objects.only('id').get(pk=rng.randint(1, content_count))
+                WatchHistory.objects.create(content=content, watch_time_minutes=rng.randint(20, 180),
+                                            session_type='movie')
+
+        def worker(kind, operation, seed):
+            rng = random.Random(seed)
+            latencies = []
+            errors = 0
+            start.wait()
+            try:
+                while not stop.is_set():
+                    began = time.perf_counter()
+                    try:
+                        operation(rng)
+                        latencies.append(time.perf_counter() - began)
+                    except OperationalError:
+                        errors += 1
+                    # What request_finished does after every request
+                    connection.close_if_unusable_or_obsolete()
+            finally:
+                connection.close()
+            with lock:
+                totals[kind].extend(latencies)
+                totals['lock_errors'] += errors
+
+        with override_settings(DB_PROFILE=profile):
+            threads = [
+                threading.Thread(target=worker, args=('reads', read, i)) for i in range(options['readers'])
+            ] + [
+                threading.Thread(target=worker, args=('writes', write, 1000 + i)) for i in range(options['writers'])
+            ]
+            for thread in threads:
+                thread.start()
+            start.wait()
+            time.sleep(options['seconds'])
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+        settings_dict['CONN_MAX_AGE'] = old_max_age
+        connections.close_all()
+        return {
+            'profile': profile,
+            'conn_max_age': max_age,
+            'reads': len(totals['reads']),
+            'writes': len(totals['writes']),
+            'reads_per_second': round(len(totals['reads']) / options['seconds'], 1),
+            'writes_per_second': round(len(totals['writes']) / options['seconds'], 1),
+            'read_p95_ms': _p95_ms(totals['reads']),
+            'write_p95_ms': _p95_ms(totals['writes']),
+            'lock_errors': totals['lock_errors'],
+        }
+
+
+def _p95_ms(samples):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2)
@@ -0,0 +1,285 @@
+"""
+Management command to benchmark every API endpoint against a stored baseline
+"""
+import json
+import time
+from io import StringIO
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import override_settings, setup_databases, teardown_databases
+from django.urls import URLPattern, URLResolver, resolve
+from django.utils import timezone
+
+from api import urls as api_urls
+from api.bench import summarize
+from api.fake_upstream import FakeUpstream, FakeUpstreamServer
+from api.models import Content, Genre, Platform, Rating, Review, TVShow, WatchHistory, WatchProgress
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'benchmarks' / 'endpoints.json'
+
+# (label, method, URL, JSON body); writes are rolled back after every request
+ENDPOINTS = [
+    ('content list', 'GET', '/api/content/', None),
+    ('content list by status', 'GET', '/api/content/?status=watching', None),
+    ('content list by status and type', 'GET', '/api/content/?status=watching&content_type=tv_show', None),
+    ('content list by genre', 'GET', '/api/content/?genre=Drama', None),
+    ('content list by min rating', 'GET', '/api/content/?min_rating=8', None),
+    ('content search', 'GET', '/api/content/?search=Storm', None),
+    ('content ordered by title', 'GET', '/api/content/?ordering=title', None),
+    ('content list full detail', 'GET', '/api/content/?detail=full', None),
+    ('movies', 'GET', '/api/content/movies/', None),
+    ('tv shows', 'GET', '/api/content/tv_shows/', None),
+    ('content detail', 'GET', '/api/content/{movie}/', None),
+    ('content bundle', 'GET', '/api/content/{show}/bundle/', None),
+    ('completion estimate', 'GET', '/api/content/{show}/completion_estimate/', None),
+    ('completion estimates', 'GET', '/api/content/completion_estimates/', None),
+    ('content statistics', 'GET', '/api/content/statistics/', None),
+    ('recommendations', 'GET', '/api/content/recommendations/', None),
+    ('export', 'GET', '/api/content/export/', None),
+    ('genres', 'GET', '/api/genres/', None),
+    ('genre detail', 'GET', '/api/genres/{genre}/', None),
+    ('platforms', 'GET', '/api/platforms/', None),
+    ('platform detail', 'GET', '/api/platforms/{platform}/', None),
+    ('ratings list', 'GET', '/api/ratings/', None),
+    ('rating detail', 'GET', '/api/ratings/{rating}/', None),
+    ('rating upsert', 'POST', '/api/ratings/', {'content': '{movie}', 'rating': 8}),
+    ('reviews list', 'GET', '/api/reviews/', None),
+    ('review detail', 'GET', '/api/reviews/{review}/', None),
+    ('watch progress list', 'GET', '/api/watch-progress/?content={show}', None),
+    ('watch progress detail', 'GET', '/api/watch-progress/{progress}/', None),
+    ('up next', 'GET', '/api/watch-progress/up_next/', None),
+    ('mark episode', 'POST', '/api/watch-progress/mark_episode/',
+     {'content': '{show}', 'season': '{next_season}', 'episode': '{next_episode}', 'watch_time_minutes': 45}),
+    ('mark episodes', 'POST', '/api/watch-progress/mark_episodes/', {'content': '{show}', 'season': 1}),
+    ('watch history list', 'GET', '/api/watch-history/', None),
+    ('watch history by date', 'GET', '/api/watch-history/?watch_date={today}', None),
+    ('watch history detail', 'GET', '/api/watch-history/{history}/', None),
+    ('watch history ingest', 'POST', '/api/watch-history/ingest/',
+     {'events': [{'content': '{show}', 'watch_date': '{today}', 'watch_time_minutes': 45}]}),
+    ('watch history statistics', 'GET', '/api/watch-history/statistics/', None),
+    ('ingest stats', 'GET', '/api/watch-history/ingest_stats/', None),
+    ('import jobs', 'GET', '/api/imports/', None),
+    ('cache stats', 'GET', '/api/cache/stats/', None),
+    ('metrics', 'GET', '/api/metrics', None),
+]
+
+# Latency regressions smaller than this are noise whatever the tolerance
+NOISE_FLOOR_MS = 1.0
+
+
+def route_names(patterns, prefix=''):
+    """URL names under `patterns`, namespaced like resolver_match.view_name."""
+    names = set()
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            namespace = f'{prefix}{pattern.namespace}:' if pattern.namespace else prefix
+            names |= route_names(pattern.url_patterns, namespace)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            names.add(prefix + pattern.name)
+    return names
+
+
+def fill(value, ids):
+    """Replace '{name}' placeholders in a request body with the ids picked from the synthetic data."""
+    if isinstance(value, dict):
+        return {key: fill(item, ids) for key, item in value.items()}
+    if isinstance(value, list):
+        return [fill(item, ids) for item in value]
+    if isinstance(value, str) and value.startswith('{') and value.endswith('}'):
+        return ids[value[1:-1]]
+    return value
+
+
+def count_queries(queries):
+    """execute_wrapper appending each query; unlike CaptureQueriesContext it has no 9000-query cap."""
+    def record(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+    return record
+
+
+def compare(results, baseline, tolerance, queries_only=False):
+    """Regressions of `results` against `baseline`, as (label, message) pairs."""
+    regressions = []
+    for label, result in results.items():
+        before = baseline.get(label)
+        if before is None:
+            continue
+        if result['queries'] > before['queries']:
+            regressions.append((label, f"{before['queries']} -> {result['queries']} queries"))
+        if queries_only:
+            continue
+        for key in ('p50_ms', 'p95_ms'):
+            limit = before['latency'][key] * (1 + tolerance) + NOISE_FLOOR_MS
+            if result['latency'][key] > limit:
+                regressions.append((label, f"{key} {before['latency'][key]:.1f} -> {result['latency'][key]:.1f}"))
+    return regressions
+
+
+class Command(BaseCommand):
+    help = 'Measures latency and exact query counts of every API endpoint on synthetic data; fails on regressions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--content', type=int, default=2000, help='Synthetic titles (see seed_synthetic)')
+        parser.add_argument('--history', type=int, default=20000, help='Synthetic watch history sessions')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--iterations', type=int, default=10, help='Timed requests per endpoint')
+        parser.add_argument('--warmup', type=int, default=2, help='Untimed requests per endpoint first')
+        parser.add_argument('--only', nargs='+', metavar='LABEL', help='Only endpoints whose label contains one of these')
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help='Baseline JSON file')
+        parser.add_argument('--save', action='store_true', help='Write the results as the new baseline')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed relative p50/p95 slowdown before failing (query counts must not grow)')
+        parser.add_argument('--queries-only', action='store_true',
+                            help='Only compare query counts (latency baselines do not carry across machines)')
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be at least 1')
+        endpoints = [
+            endpoint for endpoint in ENDPOINTS
+            if not options['only'] or any(word in endpoint[0] for word in options['only'])
+        ]
+        if not endpoints:
+            raise CommandError('--only matched no endpoints')
+        if options['save'] and options['only']:
+            raise CommandError('--save records every endpoint; drop --only')
+        dataset = {'content': options['content'], 'history': options['history'], 'seed': options['seed']}
+
+        baseline_path = Path(options['baseline'])
+        baseline = None
+        if not options['save'] and baseline_path.exists():
+            baseline = json.loads(baseline_path.read_text())
+            if baseline['dataset'] != dataset:
+                raise CommandError(
+                    f"{baseline_path} was recorded on {baseline['dataset']}; run with the same options or --save"
+                )
+
+        # Recommendations fall back to TMDB; point it at a zero-latency fake so no real API is called
+        server = FakeUpstreamServer(FakeUpstream(synthesize=True, seed=options['seed']))
+        server.start_in_background()
+        try:
+            with override_settings(
+                CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+                ALLOWED_HOSTS=['testserver'],
+                # Count watch history writes in the request that makes them, not in the ingest thread
+                WATCH_HISTORY_INGEST={**settings.WATCH_HISTORY_INGEST, 'ENABLED': False},
+                **server.upstream_settings(),
+            ):
+                old_config = setup_databases(verbosity=0, interactive=False)
+                try:
+                    results = self._run(endpoints, dataset, options)
+                finally:
+                    teardown_databases(old_config, verbosity=0)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        regressions = compare(results, baseline['endpoints'], options['tolerance'], options['queries_only']) \
+            if baseline else []
+        uncovered = sorted(route_names(api_urls.urlpatterns) - {
+            result['route'] for result in results.values()
+        }) if not options['only'] else []
+
+        if options['json']:
+            self.stdout.write(json.dumps({
+                'dataset': dataset, 'endpoints': results,
+                'regressions': [f'{label}: {message}' for label, message in regressions],
+                'uncovered_routes': uncovered,
+            }, indent=2))
+        else:
+            self._print(results, baseline)
+            if uncovered:
+                self.stdout.write(f"Routes not benchmarked: {', '.join(uncovered)}")
+
+        if options['save']:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps({'dataset': dataset, 'endpoints': results}, indent=2) + '\n')
+            if not options['json']:
+                self.stdout.write(self.style.SUCCESS(f'Baseline written to {baseline_path}'))
+            return
+        if regressions:
+            for label, message in regressions:
+                self.stderr.write(self.style.ERROR(f'{label}: {message}'))
+            raise CommandError(f'{len(regressions)} regressions against {baseline_path}')
+        if baseline and not options['json']:
+            self.stdout.write(self.style.SUCCESS(f'No regressions against {baseline_path}'))
+
+    def _targets(self):
+        movie = Content.objects.filter(content_type='movie', ratings__isnull=False).order_by('pk').first()
+        show = TVShow.objects.filter(status='watching').exclude(latest_episode=None).order_by('pk').first()
+        if movie is None or show is None:
+            raise CommandError('The synthetic library is too small; raise --content')
+        season, episode = show.latest_season, show.latest_episode + 1
+        if episode > int(show.episodes_per_season.get(str(season), 0)):
+            season, episode = season + 1, 1
+        return {
+            'movie': movie.pk, 'show': show.pk, 'next_season': season, 'next_episode': episode,
+            'today': timezone.now().date().isoformat(),
+            'genre': Genre.objects.order_by('pk').first().pk,
+            'platform': Platform.objects.order_by('pk').first().pk,
+            'rating': Rating.objects.order_by('pk').first().pk,
+            'review': Review.objects.order_by('pk').first().pk,
+            'progress': WatchProgress.objects.filter(content=show).order_by('pk').first().pk,
+            'history': WatchHistory.objects.order_by('pk').first().pk,
+        }
+
+    def _run(self, endpoints, dataset, options):
+        call_command('seed_synthetic', content=dataset['content'], history=dataset['history'],
+                     seed=dataset['seed'], stdout=StringIO())
+        ids = self._targets()
+        client = Client()
+        results = {}
+        for label, method, url, body in endpoints:
+            url = url.format(**ids)
+            body = fill(body, ids)
+            samples, counts = [], set()
+            for i in range(options['warmup'] + options['iterations']):
+                # Cold requests: cached payloads would hide the queries being budgeted
+                cache.clear()
+                queries = []
+                with transaction.atomic(), connection.execute_wrapper(count_queries(queries)):
+                    started = time.perf_counter()
+                    if method == 'GET':
+                        response = client.get(url)
+                    else:
+                        response = client.generic(method, url, json.dumps(body), content_type='application/json')
+                    if hasattr(response, 'streaming_content'):
+                        b''.join(response.streaming_content)
+                    elapsed = (time.perf_counter() - started) * 1000
+                    transaction.set_rollback(True)
+                if response.status_code >= 400:
+                    raise CommandError(f'{method} {url} returned {response.status_code}')
+                if i >= options['warmup']:
+                    samples.append(elapsed)
+                    counts.add(len(queries))
+            results[label] = {
+                'method': method,
+                'url': url,
+                'route': resolve(url.split('?')[0]).view_name,
+                'queries': max(counts),
+                'stable_queries': len(counts) == 1,
+                'latency': summarize(samples),
+            }
+        return results
+
+    def _print(self, results, baseline):
+        before = baseline['endpoints'] if baseline else {}
+        self.stdout.write(f"{'endpoint':<34}{'queries':>8}{'base':>6}{'p50':>9}{'p95':>9}{'base p50':>10}")
+        for label, result in results.items():
+            previous = before.get(label)
+            latency = result['latency']
+            queries = f"{result['queries']}{'' if result['stable_queries'] else '*'}"
+            base_queries = str(previous['queries']) if previous else '-'
+            base_p50 = f"{previous['latency']['p50_ms']:.1f}" if previous else '-'
+            self.stdout.write(
+                f"{label:<34}{queries:>8}{base_queries:>6}{latency['p50_ms']:>9.1f}{latency['p95_ms']:>9.1f}{base_p50:>10}"
+            )
+        self.stdout.write('Latencies in milliseconds; * = query count varied between requests')
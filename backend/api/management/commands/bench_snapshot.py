@@ -0,0 +1,142 @@
+"""
+Management command to benchmark snapshot_library/restore_library against dumpdata/loaddata
+"""
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings, setup_databases, teardown_databases
+from django.utils import timezone
+
+from api.bulk import db_rows, insert_rows, table_columns
+from api.models import Content, Movie, Rating, TVShow, WatchHistory, WatchProgress
+from api.snapshot import clear_tables, create_snapshot, restore_snapshot
+
+EPISODES_PER_SEASON = 20
+
+
+class Command(BaseCommand):
+    help = 'Times snapshot/restore against dumpdata/loaddata on a temporary database of synthetic rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000,
+                            help='WatchHistory + WatchProgress rows to generate (content scales with it)')
+        parser.add_argument('--skip-dumpdata', action='store_true',
+                            help='Only time the snapshot commands (dumpdata/loaddata take minutes at 1M rows)')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    def handle(self, *args, **options):
+        if options['rows'] < 100:
+            raise CommandError('--rows must be at least 100')
+
+        # A throwaway test database and cache, so the real library is never touched
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            old_config = setup_databases(verbosity=0, interactive=False)
+            try:
+                with tempfile.TemporaryDirectory() as workdir:
+                    results = self._run(options, workdir)
+            finally:
+                teardown_databases(old_config, verbosity=0)
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(f"{results['rows']} rows in {results['tables']} tables")
+        self.stdout.write(f"{'step':<20}{'seconds':>10}{'rows/s':>12}{'size MB':>10}")
+        for step in ('snapshot', 'restore', 'dumpdata', 'loaddata'):
+            if step in results:
+                r = results[step]
+                size = f"{r['size_mb']:>10.1f}" if 'size_mb' in r else f"{'':>10}"
+                self.stdout.write(f"{step:<20}{r['seconds']:>10.2f}{r['rows_per_second']:>12.0f}{size}")
+        if 'dumpdata' in results:
+            self.stdout.write(self.style.SUCCESS(
+                f"snapshot is {results['dumpdata']['seconds'] / results['snapshot']['seconds']:.1f}x faster than dumpdata, "
+                f"restore {results['loaddata']['seconds'] / results['restore']['seconds']:.1f}x faster than loaddata"
+            ))
+
+    def _timed(self, rows, fn, path=None):
+        started = time.perf_counter()
+        fn()
+        seconds = time.perf_counter() - started
+        result = {'seconds': round(seconds, 3), 'rows_per_second': round(rows / seconds) if seconds else 0}
+        if path:
+            result['size_mb'] = round(os.path.getsize(path) / 1e6, 2)
+        return result
+
+    def _run(self, options, workdir):
+        rows = self._populate(options['rows'], random.Random(options['seed']))
+        snapshot_path = os.path.join(workdir, 'library.snapshot.zip')
+        results = {'rows': rows}
+        manifest = {}
+        results['snapshot'] = self._timed(
+            rows, lambda: manifest.update(create_snapshot(snapshot_path)), snapshot_path
+        )
+        results['tables'] = len(manifest['tables'])
+        results['restore'] = self._timed(rows, lambda: restore_snapshot(snapshot_path))
+
+        if not options['skip_dumpdata']:
+            fixture_path = os.path.join(workdir, 'library.json')
+            results['dumpdata'] = self._timed(
+                rows, lambda: call_command('dumpdata', 'api', output=fixture_path, verbosity=0), fixture_path
+            )
+            clear_tables()
+            results['loaddata'] = self._timed(rows, lambda: call_command('loaddata', fixture_path, verbosity=0))
+        return results
+
+    def _populate(self, total_rows, rng):
+        """Synthetic library: content, one rating per two titles, episode progress and watch sessions."""
+        now = timezone.now()
+        content_count = max(10, total_rows // 200)
+        progress_count = total_rows // 2
+        history_count = total_rows - progress_count
+        movie_ids = list(range(1, content_count // 2 + 1))
+        show_ids = list(range(content_count // 2 + 1, content_count + 1))
+        episodes_per_show = -(-progress_count // len(show_ids))
+        seasons = -(-episodes_per_show // EPISODES_PER_SEASON)
+        layout = {str(s): EPISODES_PER_SEASON for s in range(1, seasons + 1)}
+
+        contents = (
+            {
+                'id': pk, 'title': f'Title {pk}', 'content_type': 'movie' if pk <= len(movie_ids) else 'tv_show',
+                'status': rng.choice(['watching', 'completed', 'wishlist', 'paused']),
+                'runtime': rng.randint(80, 160) if pk <= len(movie_ids) else None,
+                'created_at': now, 'updated_at': now,
+            }
+            for pk in range(1, content_count + 1)
+        )
+        written = insert_rows(Content, table_columns(Content), db_rows(Content, contents))
+        insert_rows(Movie, table_columns(Movie), db_rows(Movie, ({'content_ptr_id': pk} for pk in movie_ids)))
+        insert_rows(TVShow, table_columns(TVShow), db_rows(TVShow, (
+            {'content_ptr_id': pk, 'total_seasons': seasons, 'total_episodes': seasons * EPISODES_PER_SEASON,
+             'episodes_per_season': layout}
+            for pk in show_ids
+        )))
+        written += insert_rows(Rating, table_columns(Rating), db_rows(Rating, (
+            {'id': i, 'content_id': pk, 'rating': rng.randint(1, 10), 'rated_at': now}
+            for i, pk in enumerate(range(1, content_count + 1, 2), 1)
+        )))
+        written += insert_rows(WatchProgress, table_columns(WatchProgress), db_rows(WatchProgress, (
+            {
+                'id': i + 1, 'content_id': show_ids[i % len(show_ids)],
+                'season': (i // len(show_ids)) // EPISODES_PER_SEASON + 1,
+                'episode': (i // len(show_ids)) % EPISODES_PER_SEASON + 1,
+                'completed': True, 'watched_at': now - timedelta(minutes=i), 'watch_time_minutes': 45,
+            }
+            for i in range(progress_count)
+        )))
+        written += insert_rows(WatchHistory, table_columns(WatchHistory), db_rows(WatchHistory, (
+            {
+                'id': i + 1, 'content_id': rng.randint(1, content_count),
+                'watch_date': (now - timedelta(days=rng.randint(0, 730))).date(),
+                'watch_time_minutes': rng.randint(20, 180),
+                'session_type': rng.choice(['movie', 'episode', 'binge']),
+            }
+            for i in range(history_count)
+        )))
+        return written
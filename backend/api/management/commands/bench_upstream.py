@@ -0,0 +1,111 @@
+"""
+Management command to benchmark the upstream (TMDB/OMDB) code paths offline
+"""
+import json
+import random
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory
+
+from api.bench import stopwatch, summarize
+from api.fake_upstream import FakeUpstream, FakeUpstreamServer
+from api.utils import search_tmdb, recommend_from_tmdb_genres
+from api.views import ContentViewSet
+
+FLOWS = ['search_tmdb', 'import_from_tmdb', 'recommend_from_tmdb_genres', 'import_from_omdb']
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks the TMDB/OMDB flows against the local fake upstream'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--flows', nargs='+', choices=FLOWS, default=FLOWS)
+        parser.add_argument('--latency-ms', type=float, default=20)
+        parser.add_argument('--jitter-ms', type=float, default=5)
+        parser.add_argument('--error-rate', type=float, default=0.0)
+        parser.add_argument('--rate-limit', type=float, default=0)
+        parser.add_argument('--warm', action='store_true',
+                            help='Keep the cache between iterations instead of measuring cold calls')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be at least 1')
+
+        upstream = FakeUpstream(
+            latency_ms=options['latency_ms'],
+            jitter_ms=options['jitter_ms'],
+            error_rate=options['error_rate'],
+            rate_limit=options['rate_limit'],
+            seed=options['seed'],
+        )
+        server = FakeUpstreamServer(upstream)
+        server.start_in_background()
+        self.rng = random.Random(options['seed'])
+        self.factory = APIRequestFactory()
+
+        results = {}
+        try:
+            with override_settings(**server.upstream_settings()):
+                for flow in options['flows']:
+                    results[flow] = self._run_flow(flow, upstream, options)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(f"{'flow':<28}{'p50':>10}{'p95':>10}{'p99':>10}{'calls/op':>10}")
+        for flow, result in results.items():
+            latency = result['latency']
+            self.stdout.write(
+                f"{flow:<28}{latency['p50_ms']:>10.1f}{latency['p95_ms']:>10.1f}"
+                f"{latency['p99_ms']:>10.1f}{result['upstream_calls_per_op']:>10.2f}"
+            )
+        self.stdout.write(self.style.SUCCESS('Latencies in milliseconds'))
+
+    def _run_flow(self, flow, upstream, options):
+        step = getattr(self, f'_step_{flow}')
+        cache.clear()
+        upstream.reset()
+        samples = []
+        for i in range(options['iterations']):
+            if not options['warm']:
+                cache.clear()
+            with stopwatch(samples):
+                step(i)
+        stats = upstream.stats()
+        return {
+            'latency': summarize(samples),
+            'upstream_calls': stats['total'],
+            'upstream_calls_per_op': stats['total'] / options['iterations'],
+            'upstream_routes': stats['by_route'],
+        }
+
+    def _step_search_tmdb(self, i):
+        search_tmdb(self.rng.choice(['matrix', 'alien', 'heat', 'up']), 'movie')
+
+    def _step_recommend_from_tmdb_genres(self, i):
+        recommend_from_tmdb_genres(['Action', 'Science Fiction'], limit=24)
+
+    def _step_import_from_tmdb(self, i):
+        content_type = 'movie' if i % 2 == 0 else 'tv_show'
+        self._post('import_from_tmdb', {'tmdb_id': 500000 + i, 'content_type': content_type})
+
+    def _step_import_from_omdb(self, i):
+        self._post('import_from_omdb', {'imdb_id': f"tt{8000000 + i:07d}"})
+
+    def _post(self, action, data):
+        # Run the real view, then roll back so repeated runs start from the same database
+        view = ContentViewSet.as_view({'post': action})
+        request = self.factory.post(f'/api/content/{action}/', data, format='json')
+        with transaction.atomic():
+            view(request)
+            transaction.set_rollback(True)
@@ -0,0 +1,35 @@
+"""
+Management command to fetch and thumbnail posters into the local poster cache
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from api.models import Content
+from api.posters import cache_poster, is_poster_cached
+
+
+class Command(BaseCommand):
+    help = 'Fetches remote posters into MEDIA_ROOT and generates thumbnails'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Concurrent downloads')
+        parser.add_argument('--force', action='store_true', help='Refetch posters that are already cached')
+
+    def handle(self, *args, **options):
+        contents = Content.objects.exclude(poster_url='').select_related('poster_image')
+        pending = [c for c in contents.iterator() if options['force'] or not is_poster_cached(c)]
+        self.stdout.write(f'{len(pending)} posters to cache')
+
+        def work(content):
+            try:
+                return cache_poster(content, force=options['force']) is not None
+            finally:
+                close_old_connections()
+
+        with ThreadPoolExecutor(max_workers=max(1, options['workers'])) as pool:
+            cached = sum(pool.map(work, pending))
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Cached {cached} posters ({len(pending) - cached} failed)')
+        )
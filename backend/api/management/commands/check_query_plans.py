@@ -0,0 +1,44 @@
+"""
+Management command to check the query plans behind the main API endpoints
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings, setup_databases, teardown_databases
+
+from api.query_plans import ENDPOINTS, endpoint_plans, populate_plan_fixtures
+
+
+class Command(BaseCommand):
+    help = "Runs EXPLAIN QUERY PLAN on each endpoint's queries and fails on full scans of large tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--show-plans', action='store_true', help='Print every query plan')
+
+    def handle(self, *args, **options):
+        with override_settings(
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+            ALLOWED_HOSTS=['testserver'],
+        ):
+            old_config = setup_databases(verbosity=0, interactive=False)
+            try:
+                failures = self._check(options['show_plans'])
+            finally:
+                teardown_databases(old_config, verbosity=0)
+
+        if failures:
+            raise CommandError(f'{failures} queries scan large tables; add or fix an index')
+        self.stdout.write(self.style.SUCCESS(f'All query plans for {len(ENDPOINTS)} endpoints use indexes'))
+
+    def _check(self, show_plans):
+        failures = 0
+        for endpoint in endpoint_plans(populate_plan_fixtures()):
+            if endpoint.status_code != 200:
+                raise CommandError(f'GET {endpoint.url} returned {endpoint.status_code}')
+            self.stdout.write(f'{endpoint.label} ({endpoint.url}): {endpoint.query_count} queries')
+            for query in endpoint.queries:
+                if query.problems:
+                    failures += 1
+                    self.stdout.write(self.style.ERROR(f"  {', '.join(query.problems)}: {query.sql}"))
+                if query.problems or show_plans:
+                    for detail in query.plan:
+                        self.stdout.write(f'    {detail}')
+        return failures
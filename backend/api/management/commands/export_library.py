@@ -0,0 +1,45 @@
+"""
+Management command to export the library as CSV or JSON Lines
+"""
+from django.core.management.base import BaseCommand
+from api.exporters import DEFAULT_CHUNK_SIZE, EXPORT_FORMATS, export_rows
+from api.models import Content
+
+
+class Command(BaseCommand):
+    help = 'Streams all content with genres, ratings, reviews and progress to a file or stdout'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', dest='export_format', choices=sorted(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--output', '-o', help='File to write (default: stdout)')
+        parser.add_argument('--status', help='Only export content with this status')
+        parser.add_argument('--content-type', choices=['movie', 'tv_show'])
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Rows fetched per query')
+
+    def handle(self, *args, **options):
+        contents = Content.objects.all()
+        if options['status']:
+            contents = contents.filter(status=options['status'])
+        if options['content_type']:
+            contents = contents.filter(content_type=options['content_type'])
+
+        streamer, _, _, include_episodes = EXPORT_FORMATS[options['export_format']]
+        exported = 0
+
+        def counted(rows):
+            # Count rows, not lines: CSV fields such as review text may contain newlines
+            nonlocal exported
+            for row in rows:
+                exported += 1
+                yield row
+
+        chunks = streamer(counted(export_rows(contents, options['chunk_size'], include_episodes)))
+        if not options['output']:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+
+        with open(options['output'], 'w', encoding='utf-8', newline='') as handle:
+            for chunk in chunks:
+                handle.write(chunk)
+        self.stdout.write(self.style.SUCCESS(f"Exported {exported} items to {options['output']}"))
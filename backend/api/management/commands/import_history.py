@@ -0,0 +1,58 @@
+"""
+Management command to import watch history from a Letterboxd or IMDb CSV export
+"""
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+from api.importers import (
+    DEFAULT_BATCH_SIZE, DEFAULT_CONCURRENCY, ROW_PARSERS, detect_source, run_import_job
+)
+from api.models import ImportJob
+
+
+class Command(BaseCommand):
+    help = 'Imports ratings and watch history from a Letterboxd or IMDb CSV export (resumable)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', help='CSV file to import')
+        parser.add_argument('--source', choices=sorted(ROW_PARSERS), help='Export format (detected from the header by default)')
+        parser.add_argument('--resume', type=int, metavar='JOB_ID', help='Resume an interrupted import job')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help='Parallel upstream lookups')
+        parser.add_argument('--no-resolve', action='store_true', help='Only match existing content; skip upstream lookups')
+
+    def handle(self, *args, **options):
+        if options['resume']:
+            try:
+                job = ImportJob.objects.get(pk=options['resume'])
+            except ImportJob.DoesNotExist:
+                raise CommandError(f"Import job {options['resume']} does not exist")
+            if job.status == 'completed':
+                raise CommandError(f'Import job {job.pk} already completed')
+        elif options['path']:
+            source = options['source']
+            if not source:
+                with open(options['path'], encoding='utf-8-sig', errors='replace', newline='') as handle:
+                    source = detect_source(next(csv.reader(handle), []))
+                if not source:
+                    raise CommandError('Could not detect the export format; pass --source')
+            job = ImportJob.objects.create(source=source, file_path=options['path'])
+        else:
+            raise CommandError('Pass a CSV path or --resume JOB_ID')
+
+        self.stdout.write(f'Import job {job.pk}: {job.get_source_display()} export, starting at row {job.rows_processed}')
+        try:
+            job = run_import_job(
+                job,
+                batch_size=options['batch_size'],
+                concurrency=options['concurrency'],
+                resolve=not options['no_resolve'],
+            )
+        except Exception as exc:
+            raise CommandError(f'Import job {job.pk} failed after {job.rows_processed} rows: {exc} '
+                               f'(resume with --resume {job.pk})')
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {job.rows_processed} rows: {job.matched} matched, {job.created_content} created, '
+            f'{job.unmatched} unmatched, {job.skipped} skipped; '
+            f'{job.ratings_imported} ratings and {job.history_imported} watch sessions written'
+        ))
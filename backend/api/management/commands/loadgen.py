@@ -0,0 +1,72 @@
+"""
+Management command to load test a running API server with simulated users
+"""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.loadgen import JOURNEYS, run_load
+
+
+class Command(BaseCommand):
+    help = ('Replays frontend user journeys (home list, movies/TV pages, detail bundle, search, rating, '
+            'mark episode) against a running server and reports throughput, errors and latency per step')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Base URL of the server under test')
+        parser.add_argument('--users', type=int, default=20, help='Concurrent virtual users')
+        parser.add_argument('--duration', type=float, default=30, help='Seconds to measure, after the ramp-up')
+        parser.add_argument('--ramp-up', type=float, default=5,
+                            help='Seconds over which users start; requests during it are not reported')
+        parser.add_argument('--think-time', type=float, default=1.0,
+                            help='Mean pause between a user\'s steps in seconds (0 for a closed loop)')
+        parser.add_argument('--timeout', type=float, default=30, help='Per-request timeout in seconds')
+        parser.add_argument('--journeys', nargs='+', choices=list(JOURNEYS), default=list(JOURNEYS))
+        parser.add_argument('--read-only', action='store_true',
+                            help='Skip rating and mark-episode writes (for servers with real data)')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1:
+            raise CommandError('--users must be at least 1')
+        if options['duration'] <= 0:
+            raise CommandError('--duration must be positive')
+
+        if not options['json']:
+            self.stdout.write(
+                f"{options['users']} users against {options['url']} for {options['duration']:.0f}s "
+                f"(ramp-up {options['ramp_up']:.0f}s, think time {options['think_time']}s)"
+            )
+        results = run_load(
+            base_url=options['url'],
+            users=options['users'],
+            duration=options['duration'],
+            think_time=options['think_time'],
+            ramp_up=options['ramp_up'],
+            timeout=options['timeout'],
+            seed=options['seed'],
+            read_only=options['read_only'],
+            journeys={name: JOURNEYS[name] for name in options['journeys']},
+        )
+        if not results['requests']:
+            raise CommandError(f"No requests completed against {options['url']}; is the server running?")
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(f"{'step':<14}{'requests':>10}{'req/s':>9}{'errors':>8}{'p50':>9}{'p95':>9}{'p99':>9}")
+        for name, step in results['steps'].items():
+            latency = step['latency']
+            self.stdout.write(
+                f"{name:<14}{step['requests']:>10}{step['requests_per_second']:>9.1f}{step['error_rate']:>8.1%}"
+                f"{latency['p50_ms']:>9.1f}{latency['p95_ms']:>9.1f}{latency['p99_ms']:>9.1f}"
+            )
+            if step['errors']:
+                self.stdout.write(f"{'':<14}errors: {', '.join(f'{k} x{v}' for k, v in step['errors'].items())}")
+        latency = results['latency']
+        style = self.style.SUCCESS if results['error_rate'] < 0.01 else self.style.WARNING
+        self.stdout.write(style(
+            f"{results['requests_per_second']:.1f} req/s, {results['error_rate']:.1%} errors, "
+            f"p50 {latency['p50_ms']:.1f} ms, p95 {latency['p95_ms']:.1f} ms, p99 {latency['p99_ms']:.1f} ms"
+        ))
@@ -0,0 +1,38 @@
+"""
+Management command to repair the denormalized progress counters on TV shows
+"""
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+from django.db.models.functions import Coalesce
+from api.conditional import bump_table_versions
+from api.detail_cache import invalidate_content_detail
+from api.models import TVShow
+from api.utils import progress_counter_expressions
+
+
+class Command(BaseCommand):
+    help = 'Recomputes watched_episode_count/latest_season/latest_episode from WatchProgress'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report shows whose counters drifted')
+
+    def handle(self, *args, **options):
+        expressions = progress_counter_expressions()
+        # Coalesce both sides so NULL latest_* values compare as equal
+        comparisons = {}
+        for name, expr in expressions.items():
+            comparisons[f'stored_{name}'] = Coalesce(F(name), -1)
+            comparisons[f'actual_{name}'] = Coalesce(expr, -1)
+        drift = Q()
+        for name in expressions:
+            drift |= ~Q(**{f'stored_{name}': F(f'actual_{name}')})
+        drifted = TVShow.objects.annotate(**comparisons).filter(drift)
+        ids = list(drifted.values_list('pk', flat=True))
+        self.stdout.write(f'{len(ids)} shows with drifted counters')
+        if options['dry_run'] or not ids:
+            return
+
+        TVShow.objects.filter(pk__in=ids).update(**expressions)
+        bump_table_versions(TVShow)
+        invalidate_content_detail(ids)
+        self.stdout.write(self.style.SUCCESS(f'Reconciled {len(ids)} shows'))
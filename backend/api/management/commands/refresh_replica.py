@@ -0,0 +1,66 @@
+"""
+Management command to refresh the read-only replica copy of the database
+"""
+import os
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from api.replica import replica_lag
+
+
+def refresh_replica(path: str) -> float:
+    """Copy the primary to `path` atomically; returns the copy's timestamp."""
+    synced_at = int(time.time())
+    temp_path = f'{path}.tmp'
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    connection = connections[DEFAULT_DB_ALIAS]
+    with connection.cursor() as cursor:
+        # A consistent, compacted copy taken inside one read transaction
+        cursor.execute('VACUUM INTO %s', [temp_path])
+    copy = sqlite3.connect(temp_path)
+    try:
+        # Lets each replica connection tell which copy it opened (api.replica)
+        copy.execute(f'PRAGMA user_version = {synced_at}')
+        copy.commit()
+    finally:
+        copy.close()
+    os.utime(temp_path, (synced_at, synced_at))
+    os.replace(temp_path, path)
+    return synced_at
+
+
+class Command(BaseCommand):
+    help = 'Copies the primary database to DB_REPLICA_PATH for read-only analytic queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Keep refreshing every N seconds (keep it below DB_REPLICA_MAX_LAG)')
+
+    def handle(self, *args, **options):
+        path = settings.DB_REPLICA_PATH
+        if not path:
+            raise CommandError('DB_REPLICA_PATH is not set')
+        if connections[DEFAULT_DB_ALIAS].vendor != 'sqlite':
+            raise CommandError('refresh_replica copies SQLite databases only')
+        if options['interval'] and options['interval'] >= settings.DB_REPLICA_MAX_LAG:
+            self.stdout.write(self.style.WARNING(
+                f'--interval {options["interval"]} >= DB_REPLICA_MAX_LAG; reads will fall back to the primary between refreshes'
+            ))
+
+        while True:
+            started = time.perf_counter()
+            previous_lag = replica_lag()
+            refresh_replica(path)
+            size_mb = os.path.getsize(path) / 1e6
+            lag = f'{previous_lag:.0f}s' if previous_lag is not None else 'none'
+            self.stdout.write(self.style.SUCCESS(
+                f'Replica refreshed in {time.perf_counter() - started:.2f}s ({size_mb:.1f} MB, previous lag {lag})'
+            ))
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
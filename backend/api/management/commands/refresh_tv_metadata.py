@@ -0,0 +1,107 @@
+"""
+Management command to refresh season/episode counts for TV shows in progress
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from api.conditional import bump_table_versions
+from api.detail_cache import invalidate_content_detail
+from api.models import TVShow
+from api.utils import fetch_tmdb_tv
+
+REFRESH_FIELDS = ['total_seasons', 'total_episodes', 'episodes_per_season']
+
+
+def _normalize_layout(layout):
+    """JSONField round-trips season keys as strings; compare and store them that way."""
+    return {str(season): count for season, count in (layout or {}).items()}
+
+
+class Command(BaseCommand):
+    help = 'Refreshes TMDB season/episode metadata for shows being watched or paused'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=8, help='Parallel TMDB requests')
+        parser.add_argument('--statuses', nargs='+', default=['watching', 'paused'])
+        parser.add_argument('--batch-size', type=int, default=500, help='Shows fetched and written per batch')
+        parser.add_argument('--limit', type=int, default=None)
+        parser.add_argument('--dry-run', action='store_true', help='Report changes without writing them')
+
+    def handle(self, *args, **options):
+        local = threading.local()
+
+        def fetch(tmdb_id):
+            # One keep-alive session per worker thread
+            if not hasattr(local, 'session'):
+                local.session = requests.Session()
+            return fetch_tmdb_tv(tmdb_id, revalidate=True, session=local.session)
+
+        shows = (
+            TVShow.objects.filter(status__in=options['statuses'], tmdb_id__isnull=False)
+            .only('id', 'tmdb_id', *REFRESH_FIELDS)
+            .order_by('id')
+        )
+        if options['limit']:
+            shows = shows[:options['limit']]
+
+        started = time.monotonic()
+        checked = failed = updated = 0
+        batch = []
+        with ThreadPoolExecutor(max_workers=max(1, options['concurrency'])) as pool:
+            for show in shows.iterator(chunk_size=options['batch_size']):
+                batch.append(show)
+                if len(batch) >= options['batch_size']:
+                    batch_failed, batch_updated = self._refresh_batch(pool, fetch, batch, options['dry_run'])
+                    checked, failed, updated = checked + len(batch), failed + batch_failed, updated + batch_updated
+                    batch = []
+            if batch:
+                batch_failed, batch_updated = self._refresh_batch(pool, fetch, batch, options['dry_run'])
+                checked, failed, updated = checked + len(batch), failed + batch_failed, updated + batch_updated
+
+        elapsed = time.monotonic() - started
+        verb = 'Would update' if options['dry_run'] else 'Updated'
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked {checked} shows in {elapsed:.1f}s: {verb.lower()} {updated}, {failed} failed'
+        ))
+
+    def _refresh_batch(self, pool, fetch, shows, dry_run):
+        """Fetch a batch concurrently and write back only the fields that changed."""
+        results = pool.map(fetch, [show.tmdb_id for show in shows])
+        failed = 0
+        by_fields = {}
+        now = timezone.now()
+        for show, data in zip(shows, results):
+            if not data:
+                failed += 1
+                continue
+            fresh = {
+                'total_seasons': data.get('total_seasons') or show.total_seasons,
+                'total_episodes': data.get('total_episodes') or show.total_episodes,
+                'episodes_per_season': _normalize_layout(data.get('episodes_per_season')),
+            }
+            changed = []
+            for field in REFRESH_FIELDS:
+                current = getattr(show, field)
+                if field == 'episodes_per_season':
+                    current = _normalize_layout(current)
+                    if not fresh[field]:
+                        continue
+                if current != fresh[field]:
+                    setattr(show, field, fresh[field])
+                    changed.append(field)
+            if changed:
+                show.updated_at = now
+                by_fields.setdefault(tuple(changed), []).append(show)
+
+        updated = sum(len(group) for group in by_fields.values())
+        if not dry_run:
+            for fields, group in by_fields.items():
+                TVShow.objects.bulk_update(group, list(fields) + ['updated_at'], batch_size=500)
+            if by_fields:
+                bump_table_versions(TVShow)
+                invalidate_content_detail(show.pk for group in by_fields.values() for show in group)
+        return failed, updated
@@ -0,0 +1,41 @@
+"""
+Management command to replace the library with a snapshot written by snapshot_library
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from api.snapshot import SnapshotError, read_manifest, restore_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Replaces all api data with a snapshot, in one transaction'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Snapshot file written by snapshot_library')
+        parser.add_argument('--noinput', '--no-input', action='store_false', dest='interactive',
+                            help='Do not ask for confirmation')
+
+    def handle(self, *args, **options):
+        try:
+            manifest = read_manifest(options['path'])
+        except (OSError, SnapshotError) as exc:
+            raise CommandError(str(exc))
+
+        rows = sum(table['rows'] for table in manifest['tables'])
+        if options['interactive']:
+            answer = input(
+                f"This replaces ALL library data with {rows} rows from a snapshot taken "
+                f"{manifest['created_at']}. Type 'yes' to continue: "
+            )
+            if answer != 'yes':
+                raise CommandError('Restore cancelled')
+
+        started = time.perf_counter()
+        try:
+            restored = restore_snapshot(options['path'])
+        except SnapshotError as exc:
+            raise CommandError(str(exc))
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Restored {sum(restored.values())} rows into {len(restored)} tables in {elapsed:.1f}s'
+        ))
@@ -0,0 +1,51 @@
+"""
+Management command to run the local TMDB/OMDB stand-in server
+"""
+from django.core.management.base import BaseCommand
+from api.fake_upstream import FakeUpstream, FakeUpstreamServer
+
+
+class Command(BaseCommand):
+    help = 'Runs a local fake TMDB/OMDB server that replays recorded fixtures'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--fixtures', help='Fixture file (defaults to the bundled fixtures)')
+        parser.add_argument('--latency-ms', type=float, default=0, help='Fixed latency added to every response')
+        parser.add_argument('--jitter-ms', type=float, default=0, help='Random extra latency (uniform 0..N ms)')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with 503')
+        parser.add_argument('--rate-limit', type=float, default=0, help='Requests per second before answering 429')
+        parser.add_argument('--record', action='store_true',
+                            help='Forward fixture misses to the real upstream and save the responses')
+        parser.add_argument('--no-synthesize', action='store_true',
+                            help='Answer 404 instead of synthesizing payloads for unknown ids')
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--verbose-requests', action='store_true')
+
+    def handle(self, *args, **options):
+        upstream = FakeUpstream(
+            fixtures_path=options['fixtures'],
+            latency_ms=options['latency_ms'],
+            jitter_ms=options['jitter_ms'],
+            error_rate=options['error_rate'],
+            rate_limit=options['rate_limit'],
+            record=options['record'],
+            synthesize=not options['no_synthesize'],
+            seed=options['seed'],
+        )
+        server = FakeUpstreamServer(upstream, options['host'], options['port'], verbose=options['verbose_requests'])
+
+        self.stdout.write(self.style.SUCCESS(f'Fake upstream listening on {server.base_url}'))
+        self.stdout.write('Point the backend at it with:')
+        for name, value in server.upstream_settings().items():
+            self.stdout.write(f'  {name}={value}')
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            if options['record']:
+                upstream.save_fixtures()
@@ -0,0 +1,50 @@
+"""
+Management command to report the slowest queries recorded by the slow-query log
+"""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.slow_queries import aggregate, read_entries, slow_query_settings
+
+
+class Command(BaseCommand):
+    help = 'Aggregates the slow-query log by SQL fingerprint and prints the top entries with their query plans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=10, help='Number of fingerprints to show')
+        parser.add_argument('--path', help='Log file (default: SLOW_QUERY_LOG["PATH"])')
+        parser.add_argument('--since', help='Only entries at or after this ISO timestamp, e.g. 2026-01-31T12:00')
+        parser.add_argument('--sort', choices=['total', 'count', 'max', 'mean'], default='total')
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    def handle(self, *args, **options):
+        path = options['path'] or slow_query_settings()['PATH']
+        try:
+            groups = aggregate(read_entries(path), since=options['since'])
+        except FileNotFoundError:
+            raise CommandError(f'No slow-query log at {path}; enable it with SLOW_QUERY_LOG=True')
+
+        key = {'total': 'total_ms', 'count': 'count', 'max': 'max_ms', 'mean': 'mean_ms'}[options['sort']]
+        groups = sorted(groups, key=lambda g: g[key], reverse=True)[:options['top']]
+        if options['json']:
+            self.stdout.write(json.dumps(groups, indent=2, default=str))
+            return
+        if not groups:
+            self.stdout.write('No slow queries recorded')
+            return
+
+        for rank, group in enumerate(groups, 1):
+            slowest = group['slowest']
+            origins = ', '.join(f'{origin} ({count})' for origin, count in
+                                sorted(group['origins'].items(), key=lambda item: -item[1]))
+            self.stdout.write(self.style.SUCCESS(
+                f"#{rank} {group['fingerprint']}: {group['count']} slow runs, total {group['total_ms']:.1f} ms, "
+                f"mean {group['mean_ms']:.1f} ms, p95 {group['p95_ms']:.1f} ms, max {group['max_ms']:.1f} ms"
+            ))
+            self.stdout.write(f'  from: {origins}')
+            self.stdout.write(f"  sql:  {group['sql']}")
+            self.stdout.write(f"  slowest params: {json.dumps(slowest.get('params'), default=str)}")
+            for line in slowest.get('plan') or []:
+                self.stdout.write(f'    {line}')
+            self.stdout.write('')
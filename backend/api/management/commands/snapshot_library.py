@@ -0,0 +1,30 @@
+"""
+Management command to write a compressed columnar snapshot of the library
+"""
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from api.snapshot import CHUNK_ROWS, create_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Writes every api table to a compressed columnar snapshot (restore with restore_library)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Snapshot file to write, e.g. library.snapshot.zip')
+        parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help='Rows per stored chunk')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        manifest = create_snapshot(options['path'], chunk_rows=options['chunk_rows'])
+        elapsed = time.perf_counter() - started
+        rows = sum(table['rows'] for table in manifest['tables'])
+        size_mb = os.path.getsize(options['path']) / 1e6
+        for table in manifest['tables']:
+            if table['rows']:
+                self.stdout.write(f"  {table['table']:<32}{table['rows']:>12}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {rows} rows from {len(manifest['tables'])} tables to {options['path']} "
+            f"({size_mb:.1f} MB) in {elapsed:.1f}s"
+        ))
@@ -0,0 +1,39 @@
+"""
+Management command to pre-populate the content detail cache
+"""
+from django.core.management.base import BaseCommand
+from api.detail_cache import cache_details, detail_versions
+from api.models import Content
+from api.serializers import PolymorphicContentSerializer
+
+
+class Command(BaseCommand):
+    help = 'Serializes content detail payloads into the per-object cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--status', help='Only warm content with this status')
+
+    def handle(self, *args, **options):
+        contents = (
+            Content.objects.select_related('platform', 'movie', 'tvshow')
+            .prefetch_related('genre', 'ratings', 'reviews', 'watch_progress')
+            .order_by('pk')
+        )
+        if options['status']:
+            contents = contents.filter(status=options['status'])
+
+        warmed = 0
+        ids = list(contents.values_list('pk', flat=True))
+        for start in range(0, len(ids), options['batch_size']):
+            batch_ids = ids[start:start + options['batch_size']]
+            # Versions first, then the rows: a payload a concurrent write makes stale is never served
+            versions = detail_versions(batch_ids)
+            batch = {
+                content.pk: PolymorphicContentSerializer(content).data
+                for content in contents.filter(pk__in=batch_ids)
+            }
+            cache_details(batch, versions)
+            warmed += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'Warmed {warmed} content detail entries'))
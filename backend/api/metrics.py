@@ -0,0 +1,262 @@
+"""
+Request, database, upstream HTTP and cache metrics in Prometheus text format.
+
+`MetricsMiddleware` times every request and, for its duration, wraps each
+database connection with `execute_wrapper` to count queries. Upstream calls
+are counted by a hook on `requests`' HTTPAdapter, so every TMDB/OMDb/poster
+request is included whichever session made it. Cache counters come from the
+two-tier cache's per key-group statistics. `GET /api/metrics` renders it all.
+
+Metrics are per process, like `/api/cache/stats/`: scrape each worker, or
+aggregate by instance. With METRICS_ENABLED off the middleware removes itself
+and the upstream hook is never installed.
+"""
+import bisect
+import threading
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+from typing import Dict, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names: Sequence[str], values: Tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Tuple = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            yield f'{self.name}{_labels(self.labelnames, labels)} {value}'
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple, list] = {}  # labels -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def samples(self):
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        for labels, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), values):
+                cumulative += count
+                le = f'le="{bound}"'
+                yield f'{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}'
+            yield f'{self.name}_sum{_labels(self.labelnames, labels)} {values[-1]}'
+            yield f'{self.name}_count{_labels(self.labelnames, labels)} {cumulative}'
+
+
+REQUEST_LATENCY = Histogram(
+    'moviemate_http_request_duration_seconds', 'Time to produce a response, by route',
+    ['route', 'method', 'status'],
+)
+REQUEST_QUERIES = Histogram(
+    'moviemate_http_request_db_queries', 'Database queries per request, by route',
+    ['route'], buckets=QUERY_COUNT_BUCKETS,
+)
+DB_QUERIES = Counter('moviemate_db_queries_total', 'Database queries run while serving a route', ['route', 'alias'])
+DB_TIME = Counter('moviemate_db_query_seconds_total', 'Time spent in database queries, by route', ['route', 'alias'])
+ROUTE_UPSTREAM_CALLS = Counter(
+    'moviemate_route_upstream_requests_total', 'Upstream HTTP requests made while serving a route', ['route'],
+)
+ROUTE_UPSTREAM_TIME = Counter(
+    'moviemate_route_upstream_seconds_total', 'Time spent waiting on upstream HTTP, by route', ['route'],
+)
+UPSTREAM_LATENCY = Histogram(
+    'moviemate_upstream_request_duration_seconds', 'Upstream HTTP request time, by host and status',
+    ['host', 'status'],
+)
+
+REGISTRY = [
+    REQUEST_LATENCY, REQUEST_QUERIES, DB_QUERIES, DB_TIME,
+    ROUTE_UPSTREAM_CALLS, ROUTE_UPSTREAM_TIME, UPSTREAM_LATENCY,
+]
+
+
+class RequestStats:
+    """Query and upstream counters for the request being served."""
+
+    def __init__(self):
+        self.queries = {}  # alias -> [count, seconds]
+        self.upstream_calls = 0
+        self.upstream_seconds = 0.0
+
+    def wrapper_for(self, alias: str):
+        totals = self.queries.setdefault(alias, [0, 0.0])
+
+        def record_query(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                totals[0] += 1
+                totals[1] += time.perf_counter() - started
+        return record_query
+
+
+_current = ContextVar('request_metrics', default=None)
+
+
+def metrics_enabled() -> bool:
+    return getattr(settings, 'METRICS_ENABLED', False)
+
+
+def route_name(request) -> str:
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match and match.view_name else 'unmatched'
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        if not metrics_enabled():
+            raise MiddlewareNotUsed
+        install_upstream_hook()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(stats.wrapper_for(alias)))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._record(request, response, stats, time.perf_counter() - started)
+        return response
+
+    @staticmethod
+    def _record(request, response, stats: RequestStats, seconds: float):
+        route = route_name(request)
+        REQUEST_LATENCY.observe((route, request.method, response.status_code), seconds)
+        REQUEST_QUERIES.observe((route,), sum(count for count, _ in stats.queries.values()))
+        for alias, (count, query_seconds) in stats.queries.items():
+            if count:
+                DB_QUERIES.inc((route, alias), count)
+                DB_TIME.inc((route, alias), query_seconds)
+        if stats.upstream_calls:
+            ROUTE_UPSTREAM_CALLS.inc((route,), stats.upstream_calls)
+            ROUTE_UPSTREAM_TIME.inc((route,), stats.upstream_seconds)
+
+
+_hook_lock = threading.Lock()
+_hook_installed = False
+
+
+def install_upstream_hook():
+    """Time every request sent through `requests` (idempotent)."""
+    global _hook_installed
+    with _hook_lock:
+        if _hook_installed:
+            return
+        from requests.adapters import HTTPAdapter
+        original_send = HTTPAdapter.send
+
+        def send(adapter, request, *args, **kwargs):
+            started = time.perf_counter()
+            status = 'error'
+            try:
+                response = original_send(adapter, request, *args, **kwargs)
+                status = str(response.status_code)
+                return response
+            finally:
+                seconds = time.perf_counter() - started
+                UPSTREAM_LATENCY.observe((urlsplit(request.url).netloc, status), seconds)
+                stats = _current.get()
+                if stats is not None:
+                    stats.upstream_calls += 1
+                    stats.upstream_seconds += seconds
+
+        HTTPAdapter.send = send
+        _hook_installed = True
+
+
+def _cache_samples():
+    """Cache hit/miss counters by key group, from the two-tier cache and the detail cache."""
+    from .detail_cache import detail_cache_stats
+
+    lines = [
+        '# HELP moviemate_cache_requests_total Cache lookups by key group and result',
+        '# TYPE moviemate_cache_requests_total counter',
+    ]
+    stats = cache.stats() if hasattr(cache, 'stats') else {}
+    for group, counters in sorted(stats.get('groups', {}).items()):
+        for result in ('l1_hits', 'l2_hits', 'misses'):
+            if result in counters:
+                lines.append(
+                    f'moviemate_cache_requests_total{_labels(("group", "result"), (group, result))} {counters[result]}'
+                )
+    detail = detail_cache_stats()
+    for result in ('hits', 'misses'):
+        if result in detail:
+            lines.append(
+                f'moviemate_cache_requests_total{_labels(("group", "result"), ("content_detail", result))} '
+                f'{detail[result]}'
+            )
+    if 'l1_entries' in stats:
+        lines += [
+            '# HELP moviemate_cache_l1_entries Entries in this process\'s in-memory cache tier',
+            '# TYPE moviemate_cache_l1_entries gauge',
+            f'moviemate_cache_l1_entries {stats["l1_entries"]}',
+        ]
+    return lines
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        lines.extend(metric.samples())
+    lines.extend(_cache_samples())
+    return '\n'.join(lines) + '\n'
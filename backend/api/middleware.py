@@ -0,0 +1,26 @@
+"""
+Request middleware for the API.
+"""
+import time
+
+from .replica import FENCE_HEADER, db_fence, parse_fence
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReadYourWritesMiddleware:
+    """Carry the client's last write time (X-DB-Fence) into replica routing.
+
+    Successful writes answer with a fresh fence; requests that echo it read
+    from the primary until the replica has been refreshed past that time.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with db_fence(parse_fence(request.headers.get(FENCE_HEADER))):
+            response = self.get_response(request)
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            response[FENCE_HEADER] = str(time.time_ns())
+        return response
@@ -0,0 +1,46 @@
+# Generated by Django 5.0.1 on 2026-10-19 07:42
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_progress_counters(apps, schema_editor):
+    TVShow = apps.get_model('api', 'TVShow')
+    WatchProgress = apps.get_model('api', 'WatchProgress')
+    latest = WatchProgress.objects.filter(content=OuterRef('pk')).order_by('-watched_at', '-id')
+    watched = (
+        WatchProgress.objects.filter(content=OuterRef('pk'), completed=True)
+        .values('content').annotate(total=Count('id')).values('total')
+    )
+    TVShow.objects.update(
+        watched_episode_count=Coalesce(Subquery(watched), 0),
+        latest_season=Subquery(latest.values('season')[:1]),
+        latest_episode=Subquery(latest.values('episode')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_poster_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tvshow',
+            name='latest_episode',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='tvshow',
+            name='latest_season',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='tvshow',
+            name='watched_episode_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_progress_counters, migrations.RunPython.noop),
+    ]
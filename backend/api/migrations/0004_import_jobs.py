@@ -0,0 +1,36 @@
+# Generated by Django 5.0.1 on 2026-10-19 07:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_tvshow_progress_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('letterboxd', 'Letterboxd'), ('imdb', 'IMDb')], max_length=20)),
+                ('file_path', models.CharField(max_length=500)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('rows_processed', models.IntegerField(default=0, help_text='Rows committed so far; a resumed import starts after them')),
+                ('matched', models.IntegerField(default=0)),
+                ('created_content', models.IntegerField(default=0)),
+                ('unmatched', models.IntegerField(default=0)),
+                ('skipped', models.IntegerField(default=0)),
+                ('ratings_imported', models.IntegerField(default=0)),
+                ('history_imported', models.IntegerField(default=0)),
+                ('unmatched_titles', models.JSONField(blank=True, default=list)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
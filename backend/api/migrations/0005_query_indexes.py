@@ -0,0 +1,45 @@
+# Generated by Django 5.0.1 on 2026-10-19 08:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_import_jobs'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='content',
+            index=models.Index(fields=['-created_at'], name='content_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='content',
+            index=models.Index(fields=['status', '-created_at'], name='content_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='content',
+            index=models.Index(fields=['content_type', '-created_at'], name='content_type_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rating',
+            index=models.Index(fields=['-rated_at'], name='rating_rated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['-created_at'], name='review_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='watchhistory',
+            index=models.Index(fields=['watch_date'], name='history_watch_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='watchprogress',
+            index=models.Index(fields=['content', 'completed'], name='progress_content_done_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='watchprogress',
+            index=models.Index(fields=['-watched_at'], name='progress_watched_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-19 08:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='posterimage',
+            name='failed_at',
+            field=models.DateTimeField(blank=True, help_text='Last failed fetch; retried after POSTER_RETRY_AFTER', null=True),
+        ),
+    ]
@@ -19,6 +19,19 @@ class Platform(models.Model):
         return self.name
 
 
+class PosterImage(models.Model):
+    """Locally cached poster image with generated thumbnails"""
+    source_url = models.URLField(max_length=500, unique=True)
+    content_hash = models.CharField(max_length=64, blank=True, help_text="Hash of the image bytes, used in file URLs")
+    width = models.IntegerField(null=True, blank=True)
+    height = models.IntegerField(null=True, blank=True)
+    fetched_at = models.DateTimeField(auto_now=True)
+    failed_at = models.DateTimeField(null=True, blank=True, help_text="Last failed fetch; retried after POSTER_RETRY_AFTER")
+
+    def __str__(self):
+        return self.source_url
+
+
 class Content(models.Model):
     """Base model for movies and TV shows"""
     STATUS_CHOICES = [
@@ -42,6 +55,8 @@ class Content(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='wishlist')
     content_type = models.CharField(max_length=10, choices=CONTENT_TYPE_CHOICES)
     poster_url = models.URLField(blank=True)
+    poster_image = models.ForeignKey(PosterImage, on_delete=models.SET_NULL, null=True, blank=True,
+                                     related_name='contents')
     tmdb_id = models.IntegerField(null=True, blank=True, unique=True)
     imdb_id = models.CharField(max_length=20, blank=True)
     runtime = models.IntegerField(null=True, blank=True, help_text="Runtime in minutes")
@@ -50,6 +65,11 @@ class Content(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='content_created_idx'),
+            models.Index(fields=['status', '-created_at'], name='content_status_created_idx'),
+            models.Index(fields=['content_type', '-created_at'], name='content_type_created_idx'),
+        ]
     
     def __str__(self):
         return self.title
@@ -61,6 +81,10 @@ class TVShow(Content):
     total_episodes = models.IntegerField(default=0)
     episodes_per_season = models.JSONField(default=dict, blank=True, 
                                            help_text="Dictionary with season number as key and episode count as value")
+    # Denormalized from WatchProgress; kept current by utils.refresh_progress_counters
+    watched_episode_count = models.IntegerField(default=0)
+    latest_season = models.IntegerField(null=True, blank=True)
+    latest_episode = models.IntegerField(null=True, blank=True)
     
     class Meta:
         verbose_name = "TV Show"
@@ -89,6 +113,10 @@ class WatchProgress(models.Model):
     class Meta:
         ordering = ['-watched_at']
         unique_together = ['content', 'season', 'episode']
+        indexes = [
+            models.Index(fields=['content', 'completed'], name='progress_content_done_idx'),
+            models.Index(fields=['-watched_at'], name='progress_watched_idx'),
+        ]
     
     def __str__(self):
         return f"{self.content.title} - S{self.season}E{self.episode}"
@@ -104,6 +132,9 @@ class Rating(models.Model):
     class Meta:
         ordering = ['-rated_at']
         unique_together = ['content']
+        indexes = [
+            models.Index(fields=['-rated_at'], name='rating_rated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.content.title} - {self.rating}/10"
@@ -119,6 +150,9 @@ class Review(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='review_created_idx'),
+        ]
     
     def __str__(self):
         return f"Review for {self.content.title}"
@@ -137,8 +171,44 @@ class WatchHistory(models.Model):
     
     class Meta:
         ordering = ['-watch_date']
+        indexes = [
+            models.Index(fields=['watch_date'], name='history_watch_date_idx'),
+        ]
     
     def __str__(self):
         return f"{self.content.title} - {self.watch_date}"
 
 
+class ImportJob(models.Model):
+    """A CSV history import (Letterboxd or IMDb export), resumable by row"""
+    SOURCE_CHOICES = [
+        ('letterboxd', 'Letterboxd'),
+        ('imdb', 'IMDb'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    file_path = models.CharField(max_length=500)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    rows_processed = models.IntegerField(default=0, help_text="Rows committed so far; a resumed import starts after them")
+    matched = models.IntegerField(default=0)
+    created_content = models.IntegerField(default=0)
+    unmatched = models.IntegerField(default=0)
+    skipped = models.IntegerField(default=0)
+    ratings_imported = models.IntegerField(default=0)
+    history_imported = models.IntegerField(default=0)
+    unmatched_titles = models.JSONField(default=list, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.get_source_display()} import #{self.pk} ({self.status})"
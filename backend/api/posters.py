@@ -0,0 +1,213 @@
+"""
+Local poster cache: fetch each remote poster once, store it under MEDIA_ROOT
+and generate resized copies that can be served with long-lived cache headers.
+
+Requests never wait on a download: `queue_poster_fetch` hands uncached posters
+to a small per-process thread pool (POSTER_FETCH_WORKERS threads).
+"""
+import hashlib
+import io
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+from typing import Dict, Optional
+
+import requests
+from django.conf import settings
+from django.db import IntegrityError, connection
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from PIL import Image
+
+from .models import Content, PosterImage
+
+logger = logging.getLogger(__name__)
+
+# Target widths in pixels; images are never upscaled
+POSTER_SIZES = {
+    'small': 185,
+    'medium': 342,
+    'large': 500,
+}
+
+_fetcher = None
+
+_fetch_pool = None
+_fetch_pool_pid = None
+_queued = set()
+_queued_lock = threading.Lock()
+
+
+class PosterFetcher(ABC):
+    """Base class for poster fetchers, selected by `settings.POSTER_FETCHER`."""
+
+    @abstractmethod
+    def fetch(self, url: str) -> bytes:
+        """Return the raw image bytes at `url`; raise on any failure."""
+
+
+class RequestsPosterFetcher(PosterFetcher):
+    """Fetch posters over HTTP with a shared keep-alive session"""
+
+    def __init__(self):
+        self.session = requests.Session()
+
+    def fetch(self, url: str) -> bytes:
+        response = self.session.get(url, timeout=10)
+        response.raise_for_status()
+        return response.content
+
+
+def get_poster_fetcher() -> PosterFetcher:
+    """Return the fetcher configured by `settings.POSTER_FETCHER`."""
+    global _fetcher
+    if _fetcher is None:
+        _fetcher = import_string(settings.POSTER_FETCHER)()
+    return _fetcher
+
+
+def set_poster_fetcher(fetcher: Optional[PosterFetcher]):
+    """Replace the active fetcher (e.g. with a local stub); None restores the default."""
+    global _fetcher
+    _fetcher = fetcher
+
+
+def poster_dir(content_hash: str) -> Path:
+    return Path(settings.MEDIA_ROOT) / 'posters' / content_hash
+
+
+def poster_path(content_hash: str, size: str) -> Path:
+    return poster_dir(content_hash) / f"{size}.jpg"
+
+
+def _write_sizes(data: bytes, content_hash: str):
+    """Write every configured size for the image; returns the original dimensions."""
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    original_size = image.size
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    target_dir = poster_dir(content_hash)
+    target_dir.mkdir(parents=True, exist_ok=True)
+    for size, width in POSTER_SIZES.items():
+        path = poster_path(content_hash, size)
+        if path.exists():
+            continue
+        resized = image.copy()
+        if resized.width > width:
+            height = max(1, round(resized.height * width / resized.width))
+            resized = resized.resize((width, height), Image.LANCZOS)
+        tmp_path = path.with_suffix('.tmp')
+        resized.save(tmp_path, 'JPEG', quality=82, optimize=True, progressive=True)
+        tmp_path.replace(path)
+    return original_size
+
+
+def _recently_failed(poster: PosterImage) -> bool:
+    retry_after = timedelta(seconds=getattr(settings, 'POSTER_RETRY_AFTER', 600))
+    return poster.failed_at is not None and timezone.now() - poster.failed_at < retry_after
+
+
+def is_poster_cached(content: Content) -> bool:
+    """True when the content's cached poster matches its current poster_url."""
+    image = content.poster_image
+    return bool(image and image.content_hash and image.source_url == content.poster_url)
+
+
+def cache_poster(content: Content, force: bool = False) -> Optional[PosterImage]:
+    """Make sure the poster for `content` is stored locally and linked to it.
+
+    Returns None when the poster cannot be fetched. A failure is remembered on the
+    PosterImage, and the URL is not tried again for POSTER_RETRY_AFTER seconds
+    unless `force` is set, so a dead link does not cost a fetch on every render.
+    """
+    if not content.poster_url:
+        return None
+    if not force and is_poster_cached(content):
+        return content.poster_image
+
+    try:
+        poster, _ = PosterImage.objects.get_or_create(source_url=content.poster_url)
+    except IntegrityError:
+        # Another request created it between our lookup and insert
+        poster = PosterImage.objects.get(source_url=content.poster_url)
+    if force or not poster.content_hash or not poster_path(poster.content_hash, 'small').exists():
+        if not force and _recently_failed(poster):
+            return None
+        try:
+            data = get_poster_fetcher().fetch(content.poster_url)
+            content_hash = hashlib.sha256(data).hexdigest()[:20]
+            poster.width, poster.height = _write_sizes(data, content_hash)
+        except Exception as exc:
+            logger.warning("Error caching poster %s: %s", content.poster_url, exc)
+            PosterImage.objects.filter(pk=poster.pk).update(failed_at=timezone.now())
+            return None
+        poster.content_hash = content_hash
+        poster.failed_at = None
+        poster.save()
+
+    if content.poster_image_id != poster.id:
+        # update() rather than save() so caching a poster does not bump updated_at. The table
+        # version is left alone too: payloads that still point at the on-demand URL keep working.
+        Content.objects.filter(pk=content.pk).update(poster_image=poster)
+        content.poster_image = poster
+    return poster
+
+
+def queue_poster_fetch(content_id: int) -> bool:
+    """Cache a content's poster on a background thread; False if it is already queued."""
+    global _fetch_pool, _fetch_pool_pid
+    with _queued_lock:
+        # A forked worker must not reuse its parent's threads
+        if _fetch_pool is None or _fetch_pool_pid != os.getpid():
+            workers = max(1, int(getattr(settings, 'POSTER_FETCH_WORKERS', 2)))
+            _fetch_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='poster-fetch')
+            _fetch_pool_pid = os.getpid()
+            _queued.clear()
+        if content_id in _queued:
+            return False
+        _queued.add(content_id)
+    _fetch_pool.submit(_fetch_queued, content_id)
+    return True
+
+
+def _fetch_queued(content_id: int):
+    try:
+        content = Content.objects.select_related('poster_image').filter(pk=content_id).first()
+        if content is not None:
+            cache_poster(content)
+    except Exception:
+        logger.exception("Error caching poster for content %s", content_id)
+    finally:
+        with _queued_lock:
+            _queued.discard(content_id)
+        connection.close()
+
+
+def poster_urls(content: Content, request=None) -> Optional[Dict[str, str]]:
+    """Per-size URLs for a content's poster.
+
+    Cached posters get immutable content-hash URLs; posters not fetched yet point
+    at the on-demand endpoint, which caches the image and redirects.
+    """
+    if not content.poster_url:
+        return None
+    if is_poster_cached(content):
+        urls = {
+            size: reverse('poster-file', args=[content.poster_image.content_hash, size])
+            for size in POSTER_SIZES
+        }
+    else:
+        urls = {
+            size: reverse('poster-for-content', args=[content.pk, size])
+            for size in POSTER_SIZES
+        }
+    if request is not None:
+        urls = {size: request.build_absolute_uri(url) for size, url in urls.items()}
+    return urls
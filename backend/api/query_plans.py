@@ -0,0 +1,131 @@
+"""
+EXPLAIN QUERY PLAN checks for the main API endpoints.
+
+`endpoint_plans` requests each of ENDPOINTS with the test client, captures the
+SELECTs it runs and returns their plans with any full scans of large tables
+flagged by `plan_problems`. The check runs as part of the test suite
+(api/tests/test_query_plans.py) and from `manage.py check_query_plans`.
+"""
+import re
+from typing import Dict, List, NamedTuple
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .models import Content, Genre, Movie, Platform, Rating, Review, TVShow, WatchHistory, WatchProgress
+
+# Tables that grow with the library; a scan of one of these is what the check looks for
+LARGE_TABLES = {
+    model._meta.db_table
+    for model in (Content, Movie, TVShow, WatchProgress, WatchHistory, Rating, Review)
+} | {Content.genre.through._meta.db_table}
+
+# (label, URL) for each endpoint's main queries
+ENDPOINTS = [
+    ('content list', '/api/content/'),
+    ('content list by status', '/api/content/?status=watching'),
+    ('content list by type', '/api/content/?content_type=movie'),
+    ('content list by status and type', '/api/content/?status=watching&content_type=tv_show'),
+    ('movies', '/api/content/movies/'),
+    ('tv shows', '/api/content/tv_shows/'),
+    ('content statistics', '/api/content/statistics/'),
+    ('content detail', '/api/content/{movie}/'),
+    ('content bundle', '/api/content/{show}/bundle/'),
+    ('completion estimates', '/api/content/completion_estimates/'),
+    ('up next', '/api/watch-progress/up_next/'),
+    ('watch progress list', '/api/watch-progress/'),
+    ('watch progress for a show', '/api/watch-progress/?content={show}&completed=true'),
+    ('watch history list', '/api/watch-history/'),
+    ('watch history by date', '/api/watch-history/?watch_date={today}'),
+    ('watch history statistics', '/api/watch-history/statistics/'),
+    ('ratings list', '/api/ratings/'),
+    ('reviews list', '/api/reviews/'),
+]
+
+# `"api_content" U0` -> U0: subquery aliases show up in plans instead of table names
+ALIAS_RE = re.compile(r'"(\w+)" ([A-Z]\d+)\b')
+SCAN_RE = re.compile(r'^SCAN (\w+)')
+
+
+class QueryPlan(NamedTuple):
+    sql: str
+    plan: List[str]
+    problems: List[str]
+
+
+class EndpointPlans(NamedTuple):
+    label: str
+    url: str
+    status_code: int
+    query_count: int
+    queries: List[QueryPlan]
+
+
+def plan_problems(sql, plan):
+    """Scans of large tables that an index should have avoided.
+
+    A scan is expected when the query reads the whole table anyway (exports,
+    totals); it is a problem when the query filters rows (WHERE) or sorts the
+    whole table to return one page (temp B-tree ORDER BY with LIMIT). Sorting
+    the few rows found by an index search is fine.
+    """
+    aliases = {alias: table for table, alias in ALIAS_RE.findall(sql)}
+    filtered = ' WHERE ' in sql
+    sorts_page = ' LIMIT ' in sql and any(detail.startswith('USE TEMP B-TREE FOR ORDER BY') for detail in plan)
+    problems = []
+    for detail in plan:
+        match = SCAN_RE.match(detail)
+        if not match:
+            continue
+        table = aliases.get(match.group(1), match.group(1))
+        if table not in LARGE_TABLES:
+            continue
+        if filtered:
+            problems.append(f'full scan of {table}')
+        elif sorts_page:
+            problems.append(f'sorts all of {table} to return one page')
+    return problems
+
+
+def populate_plan_fixtures() -> Dict[str, object]:
+    """A little of everything so each endpoint runs its full set of queries; returns the URL placeholders."""
+    platform = Platform.objects.create(name='Netflix')
+    genre = Genre.objects.create(name='Drama')
+    movie = Movie.objects.create(title='Movie', content_type='movie', status='completed',
+                                 platform=platform, runtime=120)
+    show = TVShow.objects.create(title='Show', content_type='tv_show', status='watching', platform=platform,
+                                 total_seasons=1, total_episodes=8, episodes_per_season={'1': 8})
+    for content in (movie, show):
+        content.genre.add(genre)
+        Rating.objects.create(content=content, rating=8)
+        Review.objects.create(content=content, review_text='Good')
+    for episode in (1, 2, 3):
+        WatchProgress.objects.create(content=show, season=1, episode=episode, completed=True,
+                                     watch_time_minutes=45)
+        WatchHistory.objects.create(content=show, watch_time_minutes=45)
+    return {'movie': movie.pk, 'show': show.pk, 'today': timezone.now().date().isoformat()}
+
+
+def explain(sql: str) -> List[str]:
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def endpoint_plans(ids: Dict[str, object], client=None) -> List[EndpointPlans]:
+    """Request every endpoint and explain the distinct SELECTs it ran."""
+    client = client or Client()
+    results = []
+    for label, url in ENDPOINTS:
+        url = url.format(**ids)
+        with CaptureQueriesContext(connection) as captured:
+            response = client.get(url)
+        queries = []
+        for sql in dict.fromkeys(query['sql'] for query in captured):
+            if sql.startswith('SELECT'):
+                plan = explain(sql)
+                queries.append(QueryPlan(sql, plan, plan_problems(sql, plan)))
+        results.append(EndpointPlans(label, url, response.status_code, len(captured), queries))
+    return results
@@ -0,0 +1,64 @@
+"""
+Fast JSON rendering for API responses.
+
+`FastJSONRenderer` is DRF's JSONRenderer with orjson doing the encoding when
+it is installed and API_JSON_RENDERER is 'orjson' (the default). Output matches
+the stdlib renderer: compact separators, UTF-8, datetimes ending in 'Z',
+U+2028/U+2029 escaped. Anything orjson cannot handle (indented output for the
+browsable API, integers over 64 bits) falls back to the stdlib renderer, as
+does everything when orjson is missing.
+
+`to_columnar` turns a list of objects into one row per object under shared
+column names; list endpoints return it for `?layout=columnar`.
+"""
+import logging
+from typing import Dict, List
+
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # optional: pip install orjson
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+COLUMNAR_LAYOUT = 'columnar'
+
+_warned_missing = False
+
+
+def fast_json_enabled() -> bool:
+    global _warned_missing
+    if getattr(settings, 'API_JSON_RENDERER', 'orjson') != 'orjson':
+        return False
+    if orjson is None:
+        if not _warned_missing:
+            logger.info('orjson is not installed; rendering JSON with the standard library')
+            _warned_missing = True
+        return False
+    return True
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if not fast_json_enabled() or self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        options = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Keep the output a strict JavaScript subset, like the stdlib renderer
+        if b'\xe2\x80' in ret:
+            ret = ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+        return ret
+
+
+def to_columnar(items: List[Dict]) -> Dict:
+    """{'columns': [...], 'rows': [[...], ...]}; fields missing from an item are null."""
+    columns = list(dict.fromkeys(key for item in items for key in item))
+    return {'columns': columns, 'rows': [[item.get(column) for column in columns] for item in items]}
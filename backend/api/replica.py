@@ -0,0 +1,149 @@
+"""
+Read replica routing for long analytic reads.
+
+The replica is a copy of the primary SQLite file, rebuilt by `manage.py
+refresh_replica` (VACUUM INTO a temp file, then an atomic rename) and opened
+with `mode=ro` as the `replica` database alias when DB_REPLICA_PATH is set.
+Writes always go to the primary.
+
+Reads are sent to the replica only inside `use_replica()` (the designated
+actions of a `ReplicaReadMixin` viewset), and only when the copy is fresh
+enough: not older than DB_REPLICA_MAX_LAG seconds and not older than the
+caller's last write. Every successful write response carries an `X-DB-Fence`
+header (the write time); clients echo it on later requests so their own
+changes are read back from the primary until the replica has caught up.
+"""
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_DB = 'replica'
+FENCE_HEADER = 'X-DB-Fence'
+
+_use_replica = ContextVar('use_replica', default=False)
+_fence = ContextVar('db_fence', default=0)
+
+
+def replica_path() -> Optional[str]:
+    return getattr(settings, 'DB_REPLICA_PATH', '') or None
+
+
+def replica_synced_at() -> Optional[int]:
+    """Unix time the replica was copied from, or None when there is no replica."""
+    path = replica_path()
+    if not path or REPLICA_DB not in settings.DATABASES:
+        return None
+    try:
+        # refresh_replica stamps the copy's mtime with the time it started copying
+        return int(os.stat(path).st_mtime)
+    except OSError:
+        return None
+
+
+def replica_lag() -> Optional[float]:
+    synced_at = replica_synced_at()
+    return None if synced_at is None else max(0.0, time.time() - synced_at)
+
+
+def replica_usable() -> bool:
+    synced_at = replica_synced_at()
+    if synced_at is None:
+        return False
+    if time.time() - synced_at > settings.DB_REPLICA_MAX_LAG:
+        return False
+    # The caller wrote after the copy was taken: read their writes from the primary
+    return _fence.get() < synced_at * 1_000_000_000
+
+
+def read_alias() -> str:
+    """The alias reads in the current context go to."""
+    return REPLICA_DB if _use_replica.get() and replica_usable() else DEFAULT_DB_ALIAS
+
+
+@contextmanager
+def use_replica():
+    """Route reads in this block to the replica when it is usable."""
+    _close_stale_replica_connection()
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+@contextmanager
+def db_fence(fence: int):
+    """Reads in this block must see writes made up to `fence` (time.time_ns())."""
+    token = _fence.set(fence)
+    try:
+        yield
+    finally:
+        _fence.reset(token)
+
+
+def parse_fence(value: Optional[str]) -> int:
+    try:
+        return max(0, int(value or 0))
+    except ValueError:
+        return 0
+
+
+def record_replica_version(sender, connection, **kwargs):
+    """connection_created receiver: remember which copy a replica connection opened."""
+    if connection.alias != REPLICA_DB:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA user_version')
+        connection.replica_version = cursor.fetchone()[0]
+
+
+def _close_stale_replica_connection():
+    # A connection keeps reading the file it opened after refresh_replica renames a
+    # new copy over it; reconnect so persistent connections pick up the new copy.
+    if REPLICA_DB not in connections:
+        return
+    connection = connections[REPLICA_DB]
+    if connection.connection is None:
+        return
+    if getattr(connection, 'replica_version', None) != replica_synced_at():
+        connection.close()
+
+
+class ReplicaRouter:
+    """Reads inside `use_replica()` go to the replica; everything else to the primary."""
+
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and replica_usable():
+            return REPLICA_DB
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA_DB
+
+
+class ReplicaReadMixin:
+    """ViewSet mixin running the actions in `replica_actions` inside `use_replica()`.
+
+    Keep these to endpoints that only read and tolerate data up to
+    DB_REPLICA_MAX_LAG seconds old (statistics, recommendations, exports).
+    """
+    replica_actions = ()
+
+    def dispatch(self, request, *args, **kwargs):
+        action = self.action_map.get(request.method.lower()) if hasattr(self, 'action_map') else None
+        if action in self.replica_actions:
+            with use_replica():
+                return super().dispatch(request, *args, **kwargs)
+        return super().dispatch(request, *args, **kwargs)
@@ -1,8 +1,10 @@
 from rest_framework import serializers
 from .models import (
     Content, Movie, TVShow, Genre, Platform, 
-    Rating, Review, WatchProgress, WatchHistory
+    Rating, Review, WatchProgress, WatchHistory, ImportJob
 )
+from .posters import poster_urls
+from .utils import as_subtypes, as_tv_show
 
 
 class GenreSerializer(serializers.ModelSerializer):
@@ -48,13 +50,13 @@ class ContentSerializer(serializers.ModelSerializer):
     
     def get_progress_info(self, obj):
         if obj.content_type == 'tv_show':
-            progress = obj.watch_progress.all()
-            total_watched = progress.filter(completed=True).count()
-            latest = progress.order_by('-watched_at').first()
+            tv_show = as_tv_show(obj)
+            if tv_show is None:
+                return None
             return {
-                'total_watched_episodes': total_watched,
-                'latest_season': latest.season if latest else None,
-                'latest_episode': latest.episode if latest else None,
+                'total_watched_episodes': tv_show.watched_episode_count,
+                'latest_season': tv_show.latest_season,
+                'latest_episode': tv_show.latest_episode,
             }
         return None
 
@@ -76,6 +78,42 @@ class TVShowSerializer(ContentSerializer):
         ]
 
 
+class PolymorphicContentListSerializer(serializers.ListSerializer):
+    """Resolves the Movie/TVShow rows for the whole page at once before serializing."""
+
+    def to_representation(self, data):
+        items = data.all() if hasattr(data, 'all') else data
+        return [self.child.to_representation(item) for item in as_subtypes(list(items))]
+
+
+class PolymorphicContentSerializer(ContentSerializer):
+    """Read-only: each content serialized with MovieSerializer or TVShowSerializer.
+
+    Give it instances loaded with select_related('movie', 'tvshow') (and
+    prefetched genre/ratings/reviews) to keep a page at a constant number of
+    queries; anything not joined costs one query per subtype, not per row.
+    """
+
+    class Meta(ContentSerializer.Meta):
+        list_serializer_class = PolymorphicContentListSerializer
+
+    def to_representation(self, instance):
+        if self.parent is None:
+            instance = as_subtypes([instance])[0]
+        serializer = self._subtype_serializer(type(instance))
+        return serializer.to_representation(instance) if serializer else super().to_representation(instance)
+
+    def _subtype_serializer(self, model):
+        cache = self.__dict__.setdefault('_subtype_serializers', {})
+        if model not in cache:
+            serializer_class = SUBTYPE_SERIALIZERS.get(model)
+            cache[model] = serializer_class(context=self.context) if serializer_class else None
+        return cache[model]
+
+
+SUBTYPE_SERIALIZERS = {Movie: MovieSerializer, TVShow: TVShowSerializer}
+
+
 class RatingSerializer(serializers.ModelSerializer):
     content_title = serializers.CharField(source='content.title', read_only=True)
     
@@ -122,17 +160,30 @@ class ContentListSerializer(serializers.ModelSerializer):
     genre = GenreSerializer(many=True, read_only=True)
     platform_name = serializers.CharField(source='platform.name', read_only=True)
     rating_value = serializers.SerializerMethodField()
+    poster_thumbnails = serializers.SerializerMethodField()
     
     class Meta:
         model = Content
         fields = [
             'id', 'title', 'director', 'release_date', 'genre',
             'platform_name', 'status', 'content_type', 'poster_url',
-            'rating_value', 'runtime'
+            'poster_thumbnails', 'rating_value', 'runtime'
         ]
     
     def get_rating_value(self, obj):
         rating = obj.ratings.first()
         return rating.rating if rating else None
 
+    def get_poster_thumbnails(self, obj):
+        return poster_urls(obj, self.context.get('request'))
 
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ImportJob
+        fields = [
+            'id', 'source', 'status', 'rows_processed', 'matched', 'created_content',
+            'unmatched', 'skipped', 'ratings_imported', 'history_imported',
+            'unmatched_titles', 'error', 'created_at', 'updated_at'
+        ]
+        read_only_fields = fields
@@ -0,0 +1,64 @@
+"""
+Model signal receivers that keep derived data in sync with the database
+"""
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .conditional import bump_table_versions
+from .detail_cache import invalidate_content_detail
+from .utils import refresh_progress_counters
+from .models import (
+    Content, Movie, TVShow, Genre, Platform, PosterImage,
+    Rating, Review, WatchProgress, WatchHistory
+)
+
+VERSIONED_MODELS = [
+    Content, Movie, TVShow, Genre, Platform, PosterImage,
+    Rating, Review, WatchProgress, WatchHistory,
+]
+
+
+def _bump_versions(sender, **kwargs):
+    bump_table_versions(sender)
+
+
+for model in VERSIONED_MODELS:
+    post_save.connect(_bump_versions, sender=model, dispatch_uid=f'bump_versions_save_{model.__name__}')
+    post_delete.connect(_bump_versions, sender=model, dispatch_uid=f'bump_versions_delete_{model.__name__}')
+
+
+@receiver(m2m_changed, sender=Content.genre.through)
+def content_genres_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    bump_table_versions(Content)
+    if not reverse:
+        invalidate_content_detail([instance.pk])
+    elif pk_set:
+        invalidate_content_detail(pk_set)
+    else:
+        # genre.content_set.clear(): the affected ids are no longer known
+        invalidate_content_detail(Content.objects.values_list('pk', flat=True))
+
+
+def _invalidate_own_detail(sender, instance, **kwargs):
+    invalidate_content_detail([instance.pk])
+
+
+def _invalidate_parent_detail(sender, instance, **kwargs):
+    invalidate_content_detail([instance.content_id])
+
+
+for model in (Content, Movie, TVShow):
+    post_save.connect(_invalidate_own_detail, sender=model, dispatch_uid=f'detail_save_{model.__name__}')
+    post_delete.connect(_invalidate_own_detail, sender=model, dispatch_uid=f'detail_delete_{model.__name__}')
+
+for model in (Rating, Review, WatchProgress):
+    post_save.connect(_invalidate_parent_detail, sender=model, dispatch_uid=f'detail_save_{model.__name__}')
+    post_delete.connect(_invalidate_parent_detail, sender=model, dispatch_uid=f'detail_delete_{model.__name__}')
+
+
+@receiver(post_save, sender=WatchProgress)
+@receiver(post_delete, sender=WatchProgress)
+def watch_progress_changed(sender, instance, **kwargs):
+    refresh_progress_counters([instance.content_id])
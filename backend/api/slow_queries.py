@@ -0,0 +1,230 @@
+"""
+Opt-in slow-query log.
+
+`SlowQueryMiddleware` wraps every database connection with `execute_wrapper`
+while a request is served. Queries slower than SLOW_QUERY_LOG['THRESHOLD_MS']
+are appended to a JSON Lines file with the view and action that ran them, the
+SQL and parameters, a fingerprint of the normalized SQL and the database's
+query plan (EXPLAIN QUERY PLAN on SQLite), captured right after the query ran.
+`manage.py slow_queries --top N` aggregates the log by fingerprint.
+
+Code outside requests (commands, worker threads) can opt in with
+`log_slow_queries('origin')`.
+"""
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': False,
+    'THRESHOLD_MS': 100,
+    'PATH': 'slow_queries.jsonl',
+    'EXPLAIN': True,
+    # Longer parameter values are cut so one bulk insert cannot bloat the log
+    'MAX_PARAM_LENGTH': 200,
+}
+
+_write_lock = threading.Lock()
+_explaining = ContextVar('slow_query_explaining', default=False)
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\bIN \((?:\s*(?:%s|\?)\s*,?)+\)', re.IGNORECASE)
+_VALUES_RE = re.compile(r'VALUES\s*(\((?:%s|\?|\s|,)+\))(?:\s*,\s*\1)+', re.IGNORECASE)
+_SPACE_RE = re.compile(r'\s+')
+
+
+def slow_query_settings() -> Dict:
+    return {**DEFAULTS, **getattr(settings, 'SLOW_QUERY_LOG', {})}
+
+
+def normalize_sql(sql: str) -> str:
+    """SQL with literals and placeholder lists collapsed, so equivalent queries compare equal."""
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _IN_LIST_RE.sub('IN (...)', sql)
+    sql = _VALUES_RE.sub(r'VALUES \1, ...', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+def fingerprint(sql: str) -> str:
+    return hashlib.sha1(normalize_sql(sql).encode()).hexdigest()[:12]
+
+
+def _json_param(value, max_length: int):
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return f'<{len(value)} bytes>'
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    text = str(value)
+    return text if len(text) <= max_length else text[:max_length] + '...'
+
+
+class SlowQueryRecorder:
+    """execute_wrapper that logs queries over the threshold for one origin."""
+
+    def __init__(self, alias: str, origin_fn, options: Dict):
+        self.alias = alias
+        self.origin_fn = origin_fn
+        self.threshold = options['THRESHOLD_MS'] / 1000
+        self.options = options
+
+    def __call__(self, execute, sql, params, many, context):
+        if _explaining.get():
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            seconds = time.perf_counter() - started
+            if seconds >= self.threshold:
+                self._log(sql, params, many, seconds, context)
+
+    def _log(self, sql, params, many, seconds, context):
+        options = self.options
+        max_length = options['MAX_PARAM_LENGTH']
+        if many:
+            params = list(params or [])
+            shown = {'rows': len(params), 'first': [_json_param(p, max_length) for p in (params[0] if params else [])]}
+        else:
+            shown = [_json_param(p, max_length) for p in (params or [])]
+        entry = {
+            'time': datetime.now(dt_timezone.utc).isoformat(),
+            'duration_ms': round(seconds * 1000, 3),
+            'alias': self.alias,
+            **self.origin_fn(),
+            'fingerprint': fingerprint(sql),
+            'sql': sql,
+            'params': shown,
+            'plan': self._explain(sql, params, context) if options['EXPLAIN'] and not many else None,
+        }
+        logger.warning('Slow query (%.0f ms) in %s: %s', entry['duration_ms'], entry.get('view'), sql[:200])
+        write_entry(entry, options['PATH'])
+
+    def _explain(self, sql, params, context) -> Optional[List[str]]:
+        connection = context['connection']
+        if connection.vendor != 'sqlite' and not sql.lstrip().upper().startswith('SELECT'):
+            # EXPLAIN of a write executes it on some backends (e.g. EXPLAIN ANALYZE); only SQLite is safe
+            return None
+        token = _explaining.set(True)
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+                return [str(row[-1]) if len(row) > 1 else str(row[0]) for row in cursor.fetchall()]
+        except Exception as exc:
+            return [f'EXPLAIN failed: {exc}']
+        finally:
+            _explaining.reset(token)
+
+
+def write_entry(entry: Dict, path):
+    path = Path(path)
+    line = json.dumps(entry, default=str) + '\n'
+    with _write_lock:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as log:
+            log.write(line)
+
+
+@contextmanager
+def log_slow_queries(origin, options: Optional[Dict] = None):
+    """Log slow queries on every connection in this block; `origin` is a view label or a callable returning a dict."""
+    options = options or slow_query_settings()
+    origin_fn = origin if callable(origin) else (lambda: {'view': origin, 'action': None})
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(SlowQueryRecorder(alias, origin_fn, options)))
+        yield
+
+
+def request_origin(request) -> Dict:
+    """View name and viewset action of a request (resolved lazily: URLs are resolved after middleware runs)."""
+    match = getattr(request, 'resolver_match', None)
+    view = match.view_name if match else None
+    action = None
+    if match is not None:
+        func = match.func
+        viewset = getattr(func, 'cls', None)
+        actions = getattr(func, 'actions', None) or {}
+        name = actions.get(request.method.lower())
+        if viewset is not None:
+            action = f'{viewset.__name__}.{name}' if name else viewset.__name__
+        else:
+            action = getattr(func, '__name__', None)
+    return {'view': view, 'action': action, 'method': request.method, 'path': request.path}
+
+
+class SlowQueryMiddleware:
+    def __init__(self, get_response):
+        self.options = slow_query_settings()
+        if not self.options['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with log_slow_queries(lambda: request_origin(request), self.options):
+            return self.get_response(request)
+
+
+def read_entries(path) -> Iterator[Dict]:
+    with open(path, encoding='utf-8') as log:
+        for line in log:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue  # a line cut short by a crash
+
+
+def aggregate(entries, since: Optional[str] = None) -> List[Dict]:
+    """Per-fingerprint totals, slowest total time first."""
+    groups = {}
+    for entry in entries:
+        if since and entry.get('time', '') < since:
+            continue
+        group = groups.get(entry['fingerprint'])
+        if group is None:
+            group = groups[entry['fingerprint']] = {
+                'fingerprint': entry['fingerprint'],
+                'sql': normalize_sql(entry['sql']),
+                'count': 0,
+                'total_ms': 0.0,
+                'max_ms': 0.0,
+                'durations': [],
+                'origins': {},
+                'slowest': entry,
+            }
+        duration = entry['duration_ms']
+        group['count'] += 1
+        group['total_ms'] += duration
+        group['durations'].append(duration)
+        origin = entry.get('action') or entry.get('view') or 'unknown'
+        group['origins'][origin] = group['origins'].get(origin, 0) + 1
+        if duration >= group['max_ms']:
+            group['max_ms'] = duration
+            group['slowest'] = entry
+    results = []
+    for group in groups.values():
+        durations = sorted(group.pop('durations'))
+        group['mean_ms'] = round(group['total_ms'] / group['count'], 3)
+        group['p95_ms'] = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+        group['total_ms'] = round(group['total_ms'], 3)
+        results.append(group)
+    return sorted(results, key=lambda g: g['total_ms'], reverse=True)
@@ -0,0 +1,244 @@
+"""
+Deterministic synthetic library for load and performance testing.
+
+`SyntheticLibrary(seed, ...)` yields database-ready rows for every api table
+from generators, so volumes far larger than memory-friendly model instances
+can be written with `api.bulk.insert_rows` (which, unlike `bulk_create`, also
+handles the Movie/TVShow multi-table children). The same seed and options
+always produce the same rows.
+
+Distributions are loosely modelled on real libraries: a few genres and
+platforms dominate, most titles are on the wishlist or finished, recent
+years and recent watch dates are more common, and TV show progress runs in
+episode order, so the denormalized TVShow counters match WatchProgress.
+"""
+import random
+from datetime import timedelta
+from typing import Dict, Iterator, List, Tuple
+
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+
+from .bulk import db_rows, insert_rows, table_columns
+from .models import Content, Genre, Movie, Platform, Rating, Review, TVShow, WatchHistory, WatchProgress
+
+# name -> relative weight
+GENRE_WEIGHTS = {
+    'Drama': 20, 'Comedy': 16, 'Action': 14, 'Thriller': 10, 'Crime': 8, 'Science Fiction': 7,
+    'Adventure': 7, 'Romance': 6, 'Horror': 6, 'Animation': 5, 'Mystery': 5, 'Fantasy': 5,
+    'Documentary': 4, 'Family': 4, 'Biography': 2, 'History': 2, 'War': 1, 'Music': 1,
+    'Western': 1, 'TV Movie': 1,
+}
+PLATFORM_WEIGHTS = {
+    'Netflix': 30, 'Amazon Prime': 18, 'Disney+': 12, 'HBO Max': 10, 'Hulu': 8, 'Apple TV+': 6,
+    'Paramount+': 5, 'Peacock': 3, 'YouTube': 3, 'Other': 5,
+}
+STATUS_WEIGHTS = {'wishlist': 35, 'completed': 35, 'watching': 15, 'paused': 15}
+# Share of titles with a rating, by status
+RATED_SHARE = {'completed': 0.9, 'watching': 0.4, 'paused': 0.3, 'wishlist': 0.0}
+REVIEWED_SHARE = 0.15
+HISTORY_DAYS = 730
+
+TITLE_WORDS = (
+    'Last', 'Night', 'City', 'Dark', 'Blue', 'River', 'Storm', 'Silent', 'Empire', 'Garden', 'Ghost',
+    'Road', 'Winter', 'Fire', 'Secret', 'House', 'Star', 'Lost', 'Golden', 'Iron', 'Wild', 'Deep',
+)
+REVIEW_TEMPLATES = (
+    'Great pacing and a strong cast.', 'Slow start but worth it.', 'Not for me.',
+    'Beautifully shot, weak ending.', 'Would watch again.', 'Overhyped but fun.',
+)
+
+
+class SyntheticLibrary:
+    def __init__(self, seed: int = 42, content: int = 100000, tv_share: float = 0.4, history: int = 1000000,
+                 genre_ids: Dict[str, int] = None, platform_ids: Dict[str, int] = None):
+        self.seed = seed
+        self.content_count = content
+        self.tv_share = tv_share
+        self.history_count = history
+        self.now = timezone.now()
+        self.genres = self._weighted(genre_ids or {}, GENRE_WEIGHTS)
+        self.platforms = self._weighted(platform_ids or {}, PLATFORM_WEIGHTS)
+        # Filled while content rows are generated; later tables depend on them
+        self.kinds: List[Tuple[bool, str]] = []  # per content: (is_tv, status)
+        self.shows: Dict[int, Tuple[Dict[str, int], int]] = {}  # pk -> (episodes_per_season, watched)
+
+    @staticmethod
+    def _weighted(ids: Dict[str, int], weights: Dict[str, int]):
+        names = [name for name in weights if name in ids]
+        return [ids[name] for name in names], [weights[name] for name in names]
+
+    # Content and its children
+
+    def content_rows(self) -> Iterator[Dict]:
+        rng = random.Random(self.seed)
+        statuses, status_weights = list(STATUS_WEIGHTS), list(STATUS_WEIGHTS.values())
+        platform_ids, platform_weights = self.platforms
+        for pk in range(1, self.content_count + 1):
+            is_tv = rng.random() < self.tv_share
+            status = rng.choices(statuses, status_weights)[0]
+            self.kinds.append((is_tv, status))
+            year = max(1950, 2025 - int(rng.expovariate(1 / 12)))
+            created_at = self.now - timedelta(days=rng.randint(0, HISTORY_DAYS), seconds=rng.randint(0, 86399))
+            yield {
+                'id': pk,
+                'title': f'{rng.choice(TITLE_WORDS)} {rng.choice(TITLE_WORDS)} {pk}',
+                'director': '' if is_tv else f'Director {rng.randint(1, self.content_count // 20 + 1)}',
+                'description': '',
+                'release_date': created_at.date().replace(year=year, day=min(created_at.day, 28)),
+                'platform_id': rng.choices(platform_ids, platform_weights)[0] if platform_ids else None,
+                'status': status,
+                'content_type': 'tv_show' if is_tv else 'movie',
+                'poster_url': '',
+                'poster_image_id': None,
+                'tmdb_id': None,
+                'imdb_id': '',
+                'runtime': None if is_tv else max(60, int(rng.gauss(110, 20))),
+                'created_at': created_at,
+                'updated_at': created_at,
+            }
+
+    def movie_rows(self) -> Iterator[Dict]:
+        for pk, (is_tv, _) in enumerate(self.kinds, 1):
+            if not is_tv:
+                yield {'content_ptr_id': pk}
+
+    def tv_show_rows(self) -> Iterator[Dict]:
+        for pk, (is_tv, status) in enumerate(self.kinds, 1):
+            if not is_tv:
+                continue
+            rng = self._show_rng(pk)
+            seasons = min(15, 1 + int(rng.expovariate(1 / 2)))
+            layout = {str(s): rng.randint(6, 24) for s in range(1, seasons + 1)}
+            total = sum(layout.values())
+            if status == 'completed':
+                watched = total
+            elif status == 'watching':
+                watched = rng.randint(1, total)
+            elif status == 'paused':
+                watched = rng.randint(1, max(1, total // 2))
+            else:
+                watched = 0
+            self.shows[pk] = (layout, watched)
+            latest = self._nth_episode(layout, watched) if watched else (None, None)
+            yield {
+                'content_ptr_id': pk,
+                'total_seasons': seasons,
+                'total_episodes': total,
+                'episodes_per_season': layout,
+                'watched_episode_count': watched,
+                'latest_season': latest[0],
+                'latest_episode': latest[1],
+            }
+
+    def _show_rng(self, pk: int) -> random.Random:
+        return random.Random(self.seed * 1000003 + pk)
+
+    @staticmethod
+    def _nth_episode(layout: Dict[str, int], n: int) -> Tuple[int, int]:
+        for season in sorted(layout, key=int):
+            if n <= layout[season]:
+                return int(season), n
+            n -= layout[season]
+        raise ValueError('Episode beyond the season layout')
+
+    def genre_link_rows(self) -> Iterator[Dict]:
+        rng = random.Random(self.seed + 1)
+        genre_ids, weights = self.genres
+        if not genre_ids:
+            return
+        link_id = 0
+        for pk in range(1, len(self.kinds) + 1):
+            for genre_id in sorted(set(rng.choices(genre_ids, weights, k=rng.randint(1, 3)))):
+                link_id += 1
+                yield {'id': link_id, 'content_id': pk, 'genre_id': genre_id}
+
+    # Activity
+
+    def rating_rows(self) -> Iterator[Dict]:
+        rng = random.Random(self.seed + 2)
+        rating_id = 0
+        for pk, (_, status) in enumerate(self.kinds, 1):
+            if rng.random() < RATED_SHARE[status]:
+                rating_id += 1
+                yield {
+                    'id': rating_id, 'content_id': pk,
+                    'rating': min(10, max(1, round(rng.gauss(7, 1.6)))),
+                    'rated_at': self.now - timedelta(days=rng.randint(0, HISTORY_DAYS)),
+                }
+
+    def review_rows(self) -> Iterator[Dict]:
+        rng = random.Random(self.seed + 3)
+        review_id = 0
+        for pk, (_, status) in enumerate(self.kinds, 1):
+            if status != 'wishlist' and rng.random() < REVIEWED_SHARE:
+                review_id += 1
+                written = self.now - timedelta(days=rng.randint(0, HISTORY_DAYS))
+                yield {
+                    'id': review_id, 'content_id': pk, 'review_text': rng.choice(REVIEW_TEMPLATES),
+                    'notes': '', 'created_at': written, 'updated_at': written,
+                }
+
+    def watch_progress_rows(self) -> Iterator[Dict]:
+        progress_id = 0
+        for pk, (layout, watched) in self.shows.items():
+            if not watched:
+                continue
+            rng = self._show_rng(pk)
+            rng.random()  # decorrelate from the layout draws
+            # Episodes were watched in order, a few a day, ending at a recent date
+            watched_at = self.now - timedelta(days=int(rng.expovariate(1 / 60)))
+            watched_at -= timedelta(hours=watched * 8)
+            remaining = watched
+            for season in sorted(layout, key=int):
+                for episode in range(1, layout[season] + 1):
+                    if not remaining:
+                        break
+                    remaining -= 1
+                    progress_id += 1
+                    watched_at += timedelta(hours=8)
+                    yield {
+                        'id': progress_id, 'content_id': pk, 'season': int(season), 'episode': episode,
+                        'completed': True, 'watched_at': watched_at, 'watch_time_minutes': rng.randint(20, 60),
+                    }
+
+    def watch_history_rows(self) -> Iterator[Dict]:
+        rng = random.Random(self.seed + 4)
+        watched = [pk for pk, (_, status) in enumerate(self.kinds, 1) if status != 'wishlist']
+        if not watched:
+            return
+        today = self.now.date()
+        for history_id in range(1, self.history_count + 1):
+            pk = rng.choice(watched)
+            is_tv = self.kinds[pk - 1][0]
+            session_type = rng.choice(('episode', 'episode', 'binge')) if is_tv else 'movie'
+            yield {
+                'id': history_id, 'content_id': pk,
+                'watch_date': today - timedelta(days=min(HISTORY_DAYS, int(rng.expovariate(1 / 90)))),
+                'watch_time_minutes': rng.randint(90, 300) if session_type == 'binge' else rng.randint(20, 150),
+                'session_type': session_type,
+            }
+
+    def write(self, using: str = DEFAULT_DB_ALIAS, batch_size: int = 10000, progress=None) -> Dict[str, int]:
+        """Insert every table in dependency order; returns rows written per model."""
+        through = Content.genre.through
+        steps = [
+            (Content, self.content_rows), (Movie, self.movie_rows), (TVShow, self.tv_show_rows),
+            (through, self.genre_link_rows), (Rating, self.rating_rows), (Review, self.review_rows),
+            (WatchProgress, self.watch_progress_rows), (WatchHistory, self.watch_history_rows),
+        ]
+        written = {}
+        for model, rows in steps:
+            count = insert_rows(model, table_columns(model), db_rows(model, rows(), using),
+                                using=using, batch_size=batch_size)
+            written[model._meta.label] = count
+            if progress:
+                progress(model, count)
+        return written
+
+
+def genre_and_platform_ids() -> Tuple[Dict[str, int], Dict[str, int]]:
+    return (
+        dict(Genre.objects.values_list('name', 'pk')),
+        dict(Platform.objects.values_list('name', 'pk')),
+    )
@@ -0,0 +1,40 @@
+from django.test import TestCase, override_settings
+
+from api.query_plans import ENDPOINTS, endpoint_plans, plan_problems, populate_plan_fixtures
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    ALLOWED_HOSTS=['testserver'],
+)
+class EndpointQueryPlanTests(TestCase):
+    """Every main endpoint must reach large tables through an index"""
+
+    def test_endpoints_use_indexes(self):
+        results = endpoint_plans(populate_plan_fixtures())
+        self.assertEqual(len(results), len(ENDPOINTS))
+        for endpoint in results:
+            with self.subTest(endpoint.label, url=endpoint.url):
+                self.assertEqual(endpoint.status_code, 200)
+                problems = [f"{', '.join(query.problems)}: {query.sql}" for query in endpoint.queries if query.problems]
+                self.assertEqual(problems, [])
+
+
+class PlanProblemTests(TestCase):
+    def test_filtered_scan_of_large_table_is_flagged(self):
+        sql = 'SELECT * FROM "api_content" WHERE "api_content"."title" = %s'
+        self.assertEqual(plan_problems(sql, ['SCAN api_content']), ['full scan of api_content'])
+
+    def test_page_sorted_in_temp_btree_is_flagged(self):
+        sql = 'SELECT * FROM "api_watchhistory" ORDER BY "api_watchhistory"."watch_date" DESC LIMIT 50'
+        plan = ['SCAN api_watchhistory', 'USE TEMP B-TREE FOR ORDER BY']
+        self.assertEqual(plan_problems(sql, plan), ['sorts all of api_watchhistory to return one page'])
+
+    def test_unfiltered_scan_and_small_tables_are_allowed(self):
+        self.assertEqual(plan_problems('SELECT COUNT(*) FROM "api_content"', ['SCAN api_content']), [])
+        sql = 'SELECT * FROM "api_genre" WHERE "api_genre"."name" = %s'
+        self.assertEqual(plan_problems(sql, ['SCAN api_genre']), [])
+
+    def test_subquery_aliases_resolve_to_tables(self):
+        sql = 'SELECT * FROM "api_rating" WHERE "api_rating"."content_id" IN (SELECT U0."id" FROM "api_content" U0)'
+        self.assertEqual(plan_problems(sql, ['SCAN U0']), ['full scan of api_content'])
@@ -3,7 +3,7 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     ContentViewSet, GenreViewSet, PlatformViewSet,
     RatingViewSet, ReviewViewSet, WatchProgressViewSet,
-    WatchHistoryViewSet
+    WatchHistoryViewSet, ImportJobViewSet, cache_stats, metrics, poster_file, poster_for_content
 )
 
 router = DefaultRouter()
@@ -14,9 +14,14 @@ router.register(r'ratings', RatingViewSet, basename='rating')
 router.register(r'reviews', ReviewViewSet, basename='review')
 router.register(r'watch-progress', WatchProgressViewSet, basename='watch-progress')
 router.register(r'watch-history', WatchHistoryViewSet, basename='watch-history')
+router.register(r'imports', ImportJobViewSet, basename='import')
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('cache/stats/', cache_stats, name='cache-stats'),
+    path('metrics', metrics, name='metrics'),
+    path('posters/<slug:content_hash>/<slug:size>.jpg', poster_file, name='poster-file'),
+    path('posters/content/<int:content_id>/<slug:size>/', poster_for_content, name='poster-for-content'),
 ]
 
 
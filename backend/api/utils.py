@@ -1,12 +1,23 @@
 """
 Utility functions for TMDB API integration and recommendations
 """
+import logging
+import math
+import time
 import requests
 from django.conf import settings
 from django.core.cache import cache
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Dict, Optional, List
-from .models import Content, Rating, Genre, TVShow, WatchHistory, WatchProgress
+from django.db.models import Avg, Count, F, FilteredRelation, Min, OuterRef, Q, Subquery, Sum, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+from django.db.models.functions import Coalesce
+from .models import Content, Movie, Rating, Genre, TVShow, WatchHistory, WatchProgress
+
+logger = logging.getLogger(__name__)
+
+
 def fetch_tmdb_movie(tmdb_id: int) -> Optional[Dict]:
     """Fetch movie details from TMDB API"""
     api_key = settings.TMDB_API_KEY
@@ -17,7 +28,7 @@ def fetch_tmdb_movie(tmdb_id: int) -> Optional[Dict]:
     if cached:
         return cached
     
-    url = f"https://api.themoviedb.org/3/movie/{tmdb_id}"
+    url = f"{settings.TMDB_API_BASE_URL}/movie/{tmdb_id}"
     params = {
         'api_key': api_key,
         'language': 'en-US'
@@ -33,7 +44,7 @@ def fetch_tmdb_movie(tmdb_id: int) -> Optional[Dict]:
             'title': data.get('title'),
             'description': data.get('overview') or '',
             'release_date': data.get('release_date'),
-            'poster_url': f"https://image.tmdb.org/t/p/w500{poster_path}" if poster_path else '',
+            'poster_url': f"{settings.TMDB_IMAGE_BASE_URL}/w500{poster_path}" if poster_path else '',
             'runtime': data.get('runtime') or 0,
             'imdb_id': None,
             'genres': [g['name'] for g in data.get('genres', [])],
@@ -42,7 +53,7 @@ def fetch_tmdb_movie(tmdb_id: int) -> Optional[Dict]:
 
         # Try to fetch director from credits and IMDB id from external_ids
         try:
-            credits_url = f"https://api.themoviedb.org/3/movie/{tmdb_id}/credits"
+            credits_url = f"{settings.TMDB_API_BASE_URL}/movie/{tmdb_id}/credits"
             credits_resp = requests.get(credits_url, params={'api_key': api_key}, timeout=10)
             credits_resp.raise_for_status()
             credits = credits_resp.json()
@@ -51,7 +62,7 @@ def fetch_tmdb_movie(tmdb_id: int) -> Optional[Dict]:
                     result['director'] = member.get('name')
                     break
 
-            ext_url = f"https://api.themoviedb.org/3/movie/{tmdb_id}/external_ids"
+            ext_url = f"{settings.TMDB_API_BASE_URL}/movie/{tmdb_id}/external_ids"
             ext_resp = requests.get(ext_url, params={'api_key': api_key}, timeout=10)
             ext_resp.raise_for_status()
             ext = ext_resp.json()
@@ -65,52 +76,83 @@ def fetch_tmdb_movie(tmdb_id: int) -> Optional[Dict]:
         cache.set(cache_key, result, 60 * 60 * 24)
         return result
     except Exception as e:
-        print(f"Error fetching TMDB movie: {e}")
+        logger.warning("Error fetching TMDB movie %s: %s", tmdb_id, e)
         return None
 
 
-def fetch_tmdb_tv(tmdb_id: int) -> Optional[Dict]:
-    """Fetch TV show details from TMDB API"""
+def _get_with_retry(url: str, params: Dict, headers: Optional[Dict] = None, session=None, retries: int = 3):
+    """GET that backs off and retries when the upstream answers 429 Too Many Requests"""
+    http = session or requests
+    for attempt in range(retries + 1):
+        response = http.get(url, params=params, headers=headers, timeout=10)
+        if response.status_code != 429 or attempt == retries:
+            return response
+        try:
+            delay = float(response.headers.get('Retry-After', 1))
+        except ValueError:
+            delay = 1.0
+        time.sleep(min(delay, 10) * (attempt + 1))
+    return response
+
+
+def fetch_tmdb_tv(tmdb_id: int, revalidate: bool = False, session=None) -> Optional[Dict]:
+    """Fetch TV show details from TMDB API
+
+    With `revalidate=True` the 24 hour cache is skipped and the last response is
+    revalidated with If-None-Match, so an unchanged show costs a bodyless 304.
+    """
     api_key = settings.TMDB_API_KEY
     if not api_key:
         return None
     cache_key = f"tmdb_tv_{tmdb_id}"
-    cached = cache.get(cache_key)
-    if cached:
-        return cached
+    if not revalidate:
+        cached = cache.get(cache_key)
+        if cached:
+            return cached
+
+    # ETag of the last full response, kept longer than the details themselves
+    validator_key = f"tmdb_tv_etag_{tmdb_id}"
+    validator = cache.get(validator_key)
+    headers = {'If-None-Match': validator['etag']} if validator else None
     
-    url = f"https://api.themoviedb.org/3/tv/{tmdb_id}"
+    url = f"{settings.TMDB_API_BASE_URL}/tv/{tmdb_id}"
     params = {
         'api_key': api_key,
         'language': 'en-US'
     }
     
     try:
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        
-        # Get episode counts per season
-        episodes_per_season = {}
-        for season in data.get('seasons', []):
-            episodes_per_season[season['season_number']] = season['episode_count']
-        
-        poster_path = data.get('poster_path') or ''
-        result = {
-            'title': data.get('name'),
-            'description': data.get('overview') or '',
-            'release_date': data.get('first_air_date'),
-            'poster_url': f"https://image.tmdb.org/t/p/w500{poster_path}" if poster_path else '',
-            'total_seasons': data.get('number_of_seasons', 0),
-            'total_episodes': data.get('number_of_episodes', 0),
-            'episodes_per_season': episodes_per_season,
-            'genres': [g['name'] for g in data.get('genres', [])],
-        }
+        response = _get_with_retry(url, params, headers=headers, session=session)
+        if response.status_code == 304 and validator:
+            result = validator['result']
+        else:
+            response.raise_for_status()
+            data = response.json()
+            
+            # Get episode counts per season
+            episodes_per_season = {}
+            for season in data.get('seasons', []):
+                episodes_per_season[season['season_number']] = season['episode_count']
+            
+            poster_path = data.get('poster_path') or ''
+            result = {
+                'title': data.get('name'),
+                'description': data.get('overview') or '',
+                'release_date': data.get('first_air_date'),
+                'poster_url': f"{settings.TMDB_IMAGE_BASE_URL}/w500{poster_path}" if poster_path else '',
+                'total_seasons': data.get('number_of_seasons', 0),
+                'total_episodes': data.get('number_of_episodes', 0),
+                'episodes_per_season': episodes_per_season,
+                'genres': [g['name'] for g in data.get('genres', [])],
+            }
+            etag = response.headers.get('ETag')
+            if etag:
+                cache.set(validator_key, {'etag': etag, 'result': result}, 60 * 60 * 24 * 30)
         # Cache TV details for 24 hours
         cache.set(cache_key, result, 60 * 60 * 24)
         return result
     except Exception as e:
-        print(f"Error fetching TMDB TV show: {e}")
+        logger.warning("Error fetching TMDB TV show %s: %s", tmdb_id, e)
         return None
 
 
@@ -121,7 +163,7 @@ def search_tmdb(query: str, content_type: str = 'movie') -> List[Dict]:
         return []
     
     search_type = 'movie' if content_type == 'movie' else 'tv'
-    url = f"https://api.themoviedb.org/3/search/{search_type}"
+    url = f"{settings.TMDB_API_BASE_URL}/search/{search_type}"
     params = {
         'api_key': api_key,
         'language': 'en-US',
@@ -147,7 +189,7 @@ def search_tmdb(query: str, content_type: str = 'movie') -> List[Dict]:
                 'title': item.get('title') if content_type == 'movie' else item.get('name'),
                 'description': item.get('overview') or '',
                 'release_date': item.get('release_date') if content_type == 'movie' else item.get('first_air_date'),
-                'poster_url': f"https://image.tmdb.org/t/p/w500{item.get('poster_path', '')}" if item.get('poster_path') else '',
+                'poster_url': f"{settings.TMDB_IMAGE_BASE_URL}/w500{item.get('poster_path', '')}" if item.get('poster_path') else '',
             }
 
             # Enrich search results with fuller details for movies/tv when possible
@@ -182,10 +224,33 @@ def search_tmdb(query: str, content_type: str = 'movie') -> List[Dict]:
         cache.set(cache_key, results, 60)
         return results
     except Exception as e:
-        print(f"Error searching TMDB: {e}")
+        logger.warning("Error searching TMDB: %s", e)
         return []
 
 
+def find_tmdb_id(title: str, year: Optional[int] = None, content_type: str = 'movie', session=None) -> Optional[int]:
+    """TMDB id of the best match for a title (and release year).
+
+    Unlike search_tmdb this makes a single request and does not enrich results,
+    which keeps bulk imports to one search per unmatched row.
+    """
+    api_key = settings.TMDB_API_KEY
+    if not api_key or not title:
+        return None
+    search_type = 'movie' if content_type == 'movie' else 'tv'
+    params = {'api_key': api_key, 'language': 'en-US', 'query': title, 'page': 1}
+    if year:
+        params['year' if search_type == 'movie' else 'first_air_date_year'] = year
+    try:
+        response = _get_with_retry(f"{settings.TMDB_API_BASE_URL}/search/{search_type}", params, session=session)
+        response.raise_for_status()
+        results = response.json().get('results', [])
+    except Exception as e:
+        logger.warning("Error searching TMDB: %s", e)
+        return None
+    return results[0]['id'] if results else None
+
+
 def get_recommendations_based_on_ratings(user_ratings: List[Rating] = None, pool_size: int = 24) -> List[Dict]:
     """
     Generate recommendations based on user's ratings
@@ -391,7 +456,7 @@ def _fetch_tmdb_genre_map(api_key: str) -> Dict[str, int]:
         return cached
 
     try:
-        resp = requests.get('https://api.themoviedb.org/3/genre/movie/list', params={'api_key': api_key, 'language': 'en-US'}, timeout=10)
+        resp = requests.get(f"{settings.TMDB_API_BASE_URL}/genre/movie/list", params={'api_key': api_key, 'language': 'en-US'}, timeout=10)
         resp.raise_for_status()
         data = resp.json()
         mapping = {g['name'].lower(): g['id'] for g in data.get('genres', [])}
@@ -438,7 +503,7 @@ def recommend_from_tmdb_genres(top_genres: List[str], limit: int = 20) -> List[D
                     'title': item.get('title') or item.get('name'),
                     'description': item.get('overview') or '',
                     'release_date': item.get('release_date') or item.get('first_air_date'),
-                    'poster_url': f"https://image.tmdb.org/t/p/w500{poster}" if poster else '',
+                    'poster_url': f"{settings.TMDB_IMAGE_BASE_URL}/w500{poster}" if poster else '',
                 })
                 if len(results) >= limit:
                     return
@@ -454,44 +519,244 @@ def recommend_from_tmdb_genres(top_genres: List[str], limit: int = 20) -> List[D
     }
 
     # collect movies
-    _collect_from('https://api.themoviedb.org/3/discover/movie', base_params)
+    _collect_from(f"{settings.TMDB_API_BASE_URL}/discover/movie", base_params)
     # collect tv shows as well
-    _collect_from('https://api.themoviedb.org/3/discover/tv', base_params)
+    _collect_from(f"{settings.TMDB_API_BASE_URL}/discover/tv", base_params)
 
     return results[:limit]
 
 
-def estimate_completion_time(content: Content, avg_watch_time_per_day: int = 120) -> Dict:
+def progress_counter_expressions(watch_progress_model=WatchProgress) -> Dict:
+    """Subquery expressions computing TVShow progress counters from WatchProgress"""
+    latest = watch_progress_model.objects.filter(content=OuterRef('pk')).order_by('-watched_at', '-id')
+    watched = (
+        watch_progress_model.objects.filter(content=OuterRef('pk'), completed=True)
+        .values('content').annotate(total=Count('id')).values('total')
+    )
+    return {
+        'watched_episode_count': Coalesce(Subquery(watched), 0),
+        'latest_season': Subquery(latest.values('season')[:1]),
+        'latest_episode': Subquery(latest.values('episode')[:1]),
+    }
+
+
+def refresh_progress_counters(content_ids) -> int:
+    """Recompute the denormalized progress counters for the given TV shows in one UPDATE"""
+    ids = {pk for pk in content_ids if pk is not None}
+    if not ids:
+        return 0
+    return TVShow.objects.filter(pk__in=ids).update(**progress_counter_expressions())
+
+
+def as_tv_show(content: Content) -> Optional[TVShow]:
+    """Return the TVShow row for `content` (free when fetched with select_related('tvshow'))"""
+    if isinstance(content, TVShow):
+        return content
+    try:
+        return content.tvshow
+    except TVShow.DoesNotExist:
+        return None
+
+
+# content_type -> multi-table child model
+CONTENT_SUBTYPES = {'movie': Movie, 'tv_show': TVShow}
+
+
+def as_subtypes(contents: List[Content]) -> List[Content]:
+    """Each content as its Movie/TVShow instance, in the same order.
+
+    Children already joined with select_related('movie', 'tvshow') are used as
+    they are; the rest are loaded with one query per subtype. Related objects
+    cached on the parent (select_related, prefetch_related) are carried over so
+    serializing the children does not query them again.
+    """
+    resolved = {}
+    missing = {}
+    for content in contents:
+        model = CONTENT_SUBTYPES.get(content.content_type)
+        if model is None or isinstance(content, model):
+            resolved[content.pk] = content
+            continue
+        relation = getattr(Content, model._meta.model_name).related
+        if relation.is_cached(content):
+            # None when the join found no child row
+            child = relation.get_cached_value(content)
+            resolved[content.pk] = _adopt_relations(child, content) if child else content
+        else:
+            missing.setdefault(model, []).append(content)
+
+    for model, parents in missing.items():
+        children = model.objects.in_bulk([parent.pk for parent in parents])
+        for parent in parents:
+            child = children.get(parent.pk)
+            resolved[parent.pk] = _adopt_relations(child, parent) if child else parent
+    return [resolved[content.pk] for content in contents]
+
+
+def _adopt_relations(child: Content, parent: Content) -> Content:
+    for name, value in parent._state.fields_cache.items():
+        child._state.fields_cache.setdefault(name, value)
+    if hasattr(parent, '_prefetched_objects_cache'):
+        child._prefetched_objects_cache = parent._prefetched_objects_cache
+    return child
+
+
+def next_episode(layout: Dict, season: Optional[int], episode: Optional[int]):
+    """The (season, episode) after the given one per the season layout, or None when caught up"""
+    counts = {int(s): int(c) for s, c in (layout or {}).items() if c}
+    regular_seasons = sorted(s for s in counts if s > 0)
+    if season is None:
+        return (regular_seasons[0], 1) if regular_seasons else (1, 1)
+    if not counts:
+        # Unknown layout: assume the season continues
+        return (season, episode + 1)
+    if episode < counts.get(season, 0):
+        return (season, episode + 1)
+    later = [s for s in regular_seasons if s > season]
+    return (later[0], 1) if later else None
+
+
+def get_up_next(status: str = 'watching') -> List[Dict]:
+    """Next unwatched episode for every show with `status`, from a single query.
+
+    ROW_NUMBER() over each show's completed progress (LEFT JOINed, so shows
+    without progress are included) picks the furthest (season, episode) watched.
+    """
+    furthest = (
+        TVShow.objects.filter(status=status)
+        .annotate(done=FilteredRelation('watch_progress', condition=Q(watch_progress__completed=True)))
+        .annotate(
+            last_season=F('done__season'),
+            last_episode=F('done__episode'),
+            rank=Window(
+                RowNumber(),
+                partition_by=[F('pk')],
+                order_by=[F('done__season').desc(nulls_last=True), F('done__episode').desc(nulls_last=True)],
+            ),
+        )
+        .filter(rank=1)
+        .order_by('-updated_at')
+        .values('pk', 'title', 'poster_url', 'episodes_per_season', 'last_season', 'last_episode')
+    )
+    results = []
+    for row in furthest:
+        upcoming = next_episode(row['episodes_per_season'], row['last_season'], row['last_episode'])
+        results.append({
+            'content': row['pk'],
+            'title': row['title'],
+            'poster_url': row['poster_url'],
+            'last_watched': (
+                {'season': row['last_season'], 'episode': row['last_episode']}
+                if row['last_season'] is not None else None
+            ),
+            'next': {'season': upcoming[0], 'episode': upcoming[1]} if upcoming else None,
+            'caught_up': upcoming is None,
+        })
+    return results
+
+
+DEFAULT_MINUTES_PER_DAY = 120
+DEFAULT_EPISODE_MINUTES = 45
+
+
+def get_daily_watch_rate(window_days: int = 30) -> float:
+    """Average minutes watched per day over the trailing window, from WatchHistory.
+
+    The average is taken over the days since the first session in the window, so a
+    new user is not diluted by empty days before they started. Falls back to
+    DEFAULT_MINUTES_PER_DAY when there is no recent history.
+    """
+    today = timezone.now().date()
+    since = today - timedelta(days=window_days - 1)
+    totals = WatchHistory.objects.filter(watch_date__gte=since).aggregate(
+        total=Sum('watch_time_minutes'), first=Min('watch_date')
+    )
+    if not totals['total']:
+        return float(DEFAULT_MINUTES_PER_DAY)
+    first = totals['first']
+    if isinstance(first, datetime):
+        first = first.date()
+    span_days = max(1, min(window_days, (today - first).days + 1))
+    return totals['total'] / span_days
+
+
+def _remaining_episodes(tv_show: TVShow, watched_by_season: Dict[int, int]) -> int:
+    """Unwatched episodes, season by season when the season layout is known"""
+    layout = tv_show.episodes_per_season or {}
+    seasons = {int(season): int(count or 0) for season, count in layout.items()}
+    # Season 0 holds specials, which TMDB leaves out of number_of_episodes
+    seasons.pop(0, None)
+    if not seasons:
+        return max(0, tv_show.total_episodes - tv_show.watched_episode_count)
+    return sum(max(0, count - watched_by_season.get(season, 0)) for season, count in seasons.items())
+
+
+def estimate_completion_times(tv_shows: List[TVShow], minutes_per_day: Optional[float] = None) -> Dict[int, Dict]:
+    """Completion estimates for many shows using two queries in total.
+
+    Per-season progress and observed episode lengths come from one grouped
+    WatchProgress query; the watch rate is measured from WatchHistory unless
+    `minutes_per_day` is given.
+    """
+    if not tv_shows:
+        return {}
+    if minutes_per_day is None:
+        minutes_per_day = get_daily_watch_rate()
+
+    watched = {}
+    episode_minutes = {}
+    rows = (
+        WatchProgress.objects.filter(content_id__in=[show.pk for show in tv_shows], completed=True)
+        .values('content_id', 'season')
+        .annotate(episodes=Count('id'), avg_minutes=Avg('watch_time_minutes'))
+    )
+    for row in rows:
+        watched.setdefault(row['content_id'], {})[row['season']] = row['episodes']
+        if row['avg_minutes']:
+            episode_minutes.setdefault(row['content_id'], []).append((row['avg_minutes'], row['episodes']))
+
+    estimates = {}
+    for show in tv_shows:
+        total_episodes = show.total_episodes
+        watched_count = show.watched_episode_count
+        remaining = _remaining_episodes(show, watched.get(show.pk, {}))
+        if remaining <= 0:
+            estimates[show.pk] = {'estimated_days': 0, 'message': 'Show already completed'}
+            continue
+
+        # Prefer the show's runtime, then the time actually logged per episode
+        avg_episode_time = show.runtime
+        if not avg_episode_time and show.pk in episode_minutes:
+            samples = episode_minutes[show.pk]
+            avg_episode_time = sum(m * n for m, n in samples) / sum(n for _, n in samples)
+        avg_episode_time = avg_episode_time or DEFAULT_EPISODE_MINUTES
+
+        estimated_days = remaining * avg_episode_time / minutes_per_day
+        estimates[show.pk] = {
+            'estimated_days': round(estimated_days, 1),
+            'estimated_completion_date': (timezone.now().date() + timedelta(days=math.ceil(estimated_days))).isoformat(),
+            'remaining_episodes': remaining,
+            'total_episodes': total_episodes,
+            'watched_episodes': watched_count,
+            'completion_percentage': round((watched_count / total_episodes) * 100, 1) if total_episodes > 0 else 0,
+            'episode_minutes': round(avg_episode_time, 1),
+            'minutes_per_day': round(minutes_per_day, 1),
+        }
+    return estimates
+
+
+def estimate_completion_time(content: Content, avg_watch_time_per_day: Optional[float] = None) -> Dict:
     """
     Estimate time to complete a show based on watching habits
-    avg_watch_time_per_day in minutes
+    avg_watch_time_per_day in minutes; measured from WatchHistory when omitted
     """
     if content.content_type != 'tv_show':
         return {'estimated_days': None, 'message': 'Only available for TV shows'}
     
-    tv_show = TVShow.objects.get(id=content.id)
-    total_episodes = tv_show.total_episodes
-    
-    # Calculate watched episodes
-    watched = content.watch_progress.filter(completed=True).count()
-    remaining = total_episodes - watched
-    
-    if remaining <= 0:
-        return {'estimated_days': 0, 'message': 'Show already completed'}
-    
-    # Assume average episode runtime if not available
-    avg_episode_time = content.runtime or 45  # Default 45 minutes per episode
-    
-    total_minutes_needed = remaining * avg_episode_time
-    estimated_days = total_minutes_needed / avg_watch_time_per_day
-    
-    return {
-        'estimated_days': round(estimated_days, 1),
-        'remaining_episodes': remaining,
-        'total_episodes': total_episodes,
-        'watched_episodes': watched,
-        'completion_percentage': round((watched / total_episodes) * 100, 1) if total_episodes > 0 else 0,
-    }
+    tv_show = as_tv_show(content)
+    if tv_show is None:
+        return {'estimated_days': None, 'message': 'Only available for TV shows'}
+    return estimate_completion_times([tv_show], avg_watch_time_per_day)[tv_show.pk]
 
 
 def generate_review_from_notes(notes: str) -> str:
@@ -550,7 +815,7 @@ def search_omdb(query: str, content_type: str = 'movie') -> List[Dict]:
     }
 
     try:
-        response = requests.get("https://www.omdbapi.com/", params=params, timeout=10)
+        response = requests.get(settings.OMDB_API_BASE_URL, params=params, timeout=10)
         response.raise_for_status()
         data = response.json()
 
@@ -569,7 +834,7 @@ def search_omdb(query: str, content_type: str = 'movie') -> List[Dict]:
             })
         return results
     except Exception as exc:
-        print(f"Error searching OMDB: {exc}")
+        logger.warning("Error searching OMDB: %s", exc)
         return []
 
 
@@ -586,7 +851,7 @@ def fetch_omdb_title(imdb_id: str) -> Optional[Dict]:
     }
 
     try:
-        response = requests.get("https://www.omdbapi.com/", params=params, timeout=10)
+        response = requests.get(settings.OMDB_API_BASE_URL, params=params, timeout=10)
         response.raise_for_status()
         data = response.json()
 
@@ -613,7 +878,7 @@ def fetch_omdb_title(imdb_id: str) -> Optional[Dict]:
             'total_episodes': 0,
         }
     except Exception as exc:
-        print(f"Error fetching OMDB title: {exc}")
+        logger.warning("Error fetching OMDB title: %s", exc)
         return None
 
 
@@ -1,26 +1,54 @@
 from rest_framework import viewsets, status
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view
 from rest_framework.response import Response
 from rest_framework.filters import SearchFilter, OrderingFilter
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Q, Avg, Count, Sum
 from .models import (
-    Content, Movie, TVShow, Genre, Platform,
-    Rating, Review, WatchProgress, WatchHistory
+    Content, Movie, TVShow, Genre, Platform, PosterImage,
+    Rating, Review, WatchProgress, WatchHistory, ImportJob
 )
 from .serializers import (
     ContentSerializer, MovieSerializer, TVShowSerializer,
     GenreSerializer, PlatformSerializer, RatingSerializer,
     ReviewSerializer, WatchProgressSerializer, WatchHistorySerializer,
-    ContentListSerializer
+    ContentListSerializer, ImportJobSerializer, PolymorphicContentSerializer
 )
 from .utils import (
     fetch_tmdb_movie, fetch_tmdb_tv, search_tmdb,
     get_recommendations_based_on_ratings, estimate_completion_time,
     generate_review_from_notes, search_omdb, fetch_omdb_title,
-    update_recommendations_cache_after_import
+    update_recommendations_cache_after_import, refresh_progress_counters,
+    estimate_completion_times, get_daily_watch_rate, get_up_next
 )
+from .conditional import ConditionalGetMixin, bump_table_versions
+from .metrics import metrics_enabled, render_metrics
+from .replica import ReplicaReadMixin, read_alias
+from .renderers import COLUMNAR_LAYOUT, to_columnar
+from .detail_cache import cache_detail, detail_cache_stats, get_cached_detail, invalidate_content_detail
+from .posters import POSTER_SIZES, is_poster_cached, poster_path, queue_poster_fetch
+from .exporters import EXPORT_FORMATS, stream_export
+from .importers import ROW_PARSERS, detect_source, is_job_running, start_import_job
+from .ingest import (
+    IngestQueueFull, get_watch_history_ingest, parse_watch_event, write_watch_events
+)
+import csv
+import uuid
+from datetime import timedelta
+from pathlib import Path
+from django.conf import settings
 from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseNotModified, HttpResponseRedirect, StreamingHttpResponse
+)
+from django.shortcuts import get_object_or_404
+from django.template.defaultfilters import filesizeformat
+from django.urls import reverse
+
+# Similar-item ids returned by the content bundle endpoint
+BUNDLE_SIMILAR_LIMIT = 12
 
 
 class GenreViewSet(viewsets.ModelViewSet):
@@ -37,22 +65,70 @@ class PlatformViewSet(viewsets.ModelViewSet):
     search_fields = ['name']
 
 
-class ContentViewSet(viewsets.ModelViewSet):
-    queryset = Content.objects.all()
+class ContentViewSet(ReplicaReadMixin, ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = Content.objects.select_related('platform', 'poster_image', 'tvshow')
     serializer_class = ContentSerializer
+    conditional_models = [Content, Genre, Platform, PosterImage, Rating, Review, WatchProgress]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ['status', 'platform', 'content_type']
     search_fields = ['title', 'director', 'description']
     ordering_fields = ['title', 'release_date', 'created_at', 'updated_at']
     ordering = ['-created_at']
+    replica_actions = ('statistics', 'recommendations', 'completion_estimates', 'export')
     
     def get_serializer_class(self):
-        if self.action == 'list':
-            return ContentListSerializer
+        if self.action in ('list', 'movies', 'tv_shows'):
+            return PolymorphicContentSerializer if self._full_detail() else ContentListSerializer
         return ContentSerializer
+
+    def _full_detail(self):
+        """?detail=full: list endpoints return the typed detail payload of each item"""
+        return self.request.query_params.get('detail') == 'full'
+
+    def _columnar(self):
+        """?layout=columnar: list items as rows of values under one `columns` header"""
+        return self.request.query_params.get('layout') == COLUMNAR_LAYOUT
+
+    def get_paginated_response(self, data):
+        if not self._columnar():
+            return super().get_paginated_response(data)
+        response = super().get_paginated_response([])
+        del response.data['results']
+        response.data.update(to_columnar(data))
+        return response
+
+    def _with_subtypes(self, queryset):
+        """Join the Movie/TVShow rows and prefetch what the detail serializers read"""
+        if not (self._full_detail() or self.action in ('retrieve', 'bundle')):
+            return queryset
+        return queryset.select_related('movie').prefetch_related('genre', 'ratings', 'reviews')
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(request, self._retrieve_cached, *args, **kwargs)
+
+    def _retrieve_cached(self, request, *args, **kwargs):
+        """Serve the detail payload from the per-object cache when possible"""
+        return Response(self._detail_payload(kwargs.get(self.lookup_url_kwarg or self.lookup_field)))
+
+    def _is_filtered(self):
+        """True when query parameters narrow the queryset, which a cached detail payload would ignore"""
+        params = {'genre', 'min_rating', SearchFilter.search_param, *self.filterset_fields}
+        return any(self.request.query_params.get(name) for name in params)
+
+    def _detail_payload(self, pk):
+        if not str(pk).isdigit() or self._is_filtered():
+            instance = self.get_object()
+            return PolymorphicContentSerializer(instance, context=self.get_serializer_context()).data
+        # The version is read before the row, so a write committing meanwhile makes this fill stale on arrival
+        data, version = get_cached_detail(pk)
+        if data is None:
+            instance = self.get_object()
+            data = PolymorphicContentSerializer(instance, context=self.get_serializer_context()).data
+            cache_detail(instance.pk, data, version)
+        return data
     
     def get_queryset(self):
-        queryset = Content.objects.all()
+        queryset = Content.objects.select_related('platform', 'poster_image', 'tvshow')
         
         # Filter by genre
         genre = self.request.query_params.get('genre', None)
@@ -66,7 +142,7 @@ class ContentViewSet(viewsets.ModelViewSet):
                 avg_rating=Avg('ratings__rating')
             ).filter(avg_rating__gte=min_rating)
         
-        return queryset.distinct()
+        return self._with_subtypes(queryset.distinct())
 
     def perform_create(self, serializer):
         instance = serializer.save()
@@ -87,16 +163,16 @@ class ContentViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def movies(self, request):
         """Get all movies"""
-        movies = self.queryset.filter(content_type='movie')
-        serializer = ContentListSerializer(movies, many=True)
-        return Response(serializer.data)
+        movies = self._with_subtypes(self.queryset.filter(content_type='movie'))
+        serializer = self.get_serializer(movies, many=True)
+        return Response(to_columnar(serializer.data) if self._columnar() else serializer.data)
     
     @action(detail=False, methods=['get'])
     def tv_shows(self, request):
         """Get all TV shows"""
-        tv_shows = self.queryset.filter(content_type='tv_show')
-        serializer = ContentListSerializer(tv_shows, many=True)
-        return Response(serializer.data)
+        tv_shows = self._with_subtypes(self.queryset.filter(content_type='tv_show'))
+        serializer = self.get_serializer(tv_shows, many=True)
+        return Response(to_columnar(serializer.data) if self._columnar() else serializer.data)
     
     @action(detail=False, methods=['get'])
     def statistics(self, request):
@@ -126,6 +202,84 @@ class ContentViewSet(viewsets.ModelViewSet):
         result = estimate_completion_time(content)
         return Response(result)
     
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream the (filtered) library as CSV or JSON Lines.
+
+        `?export_format=csv|jsonl` (`format` is taken by DRF's renderer selection).
+        """
+        export_format = request.query_params.get('export_format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return Response({'error': f'export_format must be one of {sorted(EXPORT_FORMATS)}'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        _, media_type, extension, _ = EXPORT_FORMATS[export_format]
+        # The stream is read after this method returns, outside the replica context: pin the alias
+        contents = self.filter_queryset(self.get_queryset()).using(read_alias())
+        response = StreamingHttpResponse(stream_export(export_format, contents), content_type=media_type)
+        response['Content-Disposition'] = f'attachment; filename="moviemate-library.{extension}"'
+        return response
+
+    @action(detail=True, methods=['get'])
+    def bundle(self, request, pk=None):
+        """Everything the detail page shows, in one response.
+
+        Uses a fixed number of queries however large the library is: the cached
+        detail payload, then one query each for rating, reviews, progress and
+        similar items, plus three for a TV show's completion estimate.
+        """
+        data = self._detail_payload(pk)
+        content_id = data['id']
+        rating = Rating.objects.filter(content_id=content_id).select_related('content').first()
+        reviews = Review.objects.filter(content_id=content_id).select_related('content')
+
+        progress = []
+        estimate = None
+        if data['content_type'] == 'tv_show':
+            progress = list(
+                WatchProgress.objects.filter(content_id=content_id)
+                .order_by('season', 'episode')
+                .values('season', 'episode', 'completed', 'watched_at', 'watch_time_minutes')
+            )
+            tv_show = TVShow.objects.filter(pk=content_id).first()
+            if tv_show is not None:
+                estimate = estimate_completion_times([tv_show])[tv_show.pk]
+
+        genre_ids = [genre['id'] for genre in data['genre']]
+        similar_ids = []
+        if genre_ids:
+            similar_ids = list(
+                Content.objects.filter(genre__in=genre_ids)
+                .exclude(pk=content_id)
+                .annotate(shared_genres=Count('genre'))
+                .order_by('-shared_genres', '-created_at')
+                .values_list('pk', flat=True)[:BUNDLE_SIMILAR_LIMIT]
+            )
+
+        return Response({
+            'content': data,
+            'rating': RatingSerializer(rating).data if rating else None,
+            'reviews': ReviewSerializer(reviews, many=True).data,
+            'progress': progress,
+            'completion_estimate': estimate,
+            'similar_ids': similar_ids,
+        })
+
+    @action(detail=False, methods=['get'])
+    def completion_estimates(self, request):
+        """Completion estimates for every show being watched, in one pass"""
+        status_filter = request.query_params.get('status', 'watching')
+        shows = list(TVShow.objects.filter(status=status_filter).order_by('-updated_at'))
+        minutes_per_day = get_daily_watch_rate()
+        estimates = estimate_completion_times(shows, minutes_per_day)
+        results = [
+            {'id': show.pk, 'title': show.title, **estimates[show.pk]}
+            for show in shows
+        ]
+        return Response({
+            'minutes_per_day': round(minutes_per_day, 1),
+            'results': results,
+        })
+    
     @action(detail=False, methods=['get'])
     def recommendations(self, request):
         """Get content recommendations based on ratings"""
@@ -329,9 +483,10 @@ class ContentViewSet(viewsets.ModelViewSet):
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
-class RatingViewSet(viewsets.ModelViewSet):
-    queryset = Rating.objects.all()
+class RatingViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = Rating.objects.select_related('content')
     serializer_class = RatingSerializer
+    conditional_models = [Rating, Content]
     filter_backends = [DjangoFilterBackend, OrderingFilter]
     filterset_fields = ['content', 'rating']
     ordering_fields = ['rated_at']
@@ -351,9 +506,10 @@ class RatingViewSet(viewsets.ModelViewSet):
             serializer.save()
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
-    queryset = Review.objects.all()
+class ReviewViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = Review.objects.select_related('content')
     serializer_class = ReviewSerializer
+    conditional_models = [Review, Content]
     filter_backends = [DjangoFilterBackend, OrderingFilter]
     filterset_fields = ['content']
     ordering_fields = ['created_at', 'updated_at']
@@ -390,6 +546,19 @@ class WatchProgressViewSet(viewsets.ModelViewSet):
     filterset_fields = ['content', 'completed']
     ordering_fields = ['watched_at']
     ordering = ['-watched_at']
+
+    # Writes run in a transaction so TVShow progress counters change atomically with them
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            serializer.save()
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            serializer.save()
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
     
     @action(detail=False, methods=['post'])
     def mark_episode(self, request):
@@ -403,35 +572,113 @@ class WatchProgressViewSet(viewsets.ModelViewSet):
             return Response({'error': 'content is required'}, 
                           status=status.HTTP_400_BAD_REQUEST)
         
-        progress, created = WatchProgress.objects.update_or_create(
-            content_id=content_id,
-            season=season,
-            episode=episode,
-            defaults={
-                'completed': True,
-                'watch_time_minutes': watch_time
-            }
-        )
-        
-        # Create watch history entry
-        content = Content.objects.get(id=content_id)
-        WatchHistory.objects.create(
-            content=content,
-            watch_time_minutes=watch_time or 45,
-            session_type='episode'
-        )
+        with transaction.atomic():
+            progress, created = WatchProgress.objects.update_or_create(
+                content_id=content_id,
+                season=season,
+                episode=episode,
+                defaults={
+                    'completed': True,
+                    'watch_time_minutes': watch_time
+                }
+            )
+            
+            # Create watch history entry
+            WatchHistory.objects.create(
+                content_id=progress.content_id,
+                watch_time_minutes=watch_time or 45,
+                session_type='episode'
+            )
         
         serializer = WatchProgressSerializer(progress)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'])
+    def up_next(self, request):
+        """Next unwatched episode for every show currently being watched"""
+        return Response(get_up_next(request.query_params.get('status', 'watching')))
 
-class WatchHistoryViewSet(viewsets.ReadOnlyModelViewSet):
+    @action(detail=False, methods=['post'])
+    def mark_episodes(self, request):
+        """Mark many episodes as watched in one transaction.
+
+        Accepts `content` plus one of:
+        - `episodes`: a list of {"season": s, "episode": e}
+        - `season` with `episode_from`/`episode_to` (inclusive range)
+        - `season` alone: every episode of that season per `episodes_per_season`
+        """
+        content_id = request.data.get('content')
+        if not content_id:
+            return Response({'error': 'content is required'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            content_id = _int_field(content_id, 'content')
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        content = get_object_or_404(Content.objects.select_related('tvshow'), pk=content_id)
+
+        try:
+            episodes = _parse_episode_selection(request.data, content)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        watch_time = request.data.get('watch_time_minutes')
+        if watch_time in (None, ''):
+            watch_time = None
+        else:
+            try:
+                watch_time = int(watch_time)
+            except (TypeError, ValueError):
+                return Response({'error': 'watch_time_minutes must be an integer'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            if watch_time < 0:
+                return Response({'error': 'watch_time_minutes must not be negative'},
+                                status=status.HTTP_400_BAD_REQUEST)
+        per_episode = watch_time or content.runtime or 45
+        now = timezone.now()
+        # Stagger timestamps so the last episode in the batch is the latest watched
+        rows = [
+            WatchProgress(
+                content=content, season=season, episode=episode, completed=True,
+                watched_at=now - timedelta(microseconds=len(episodes) - 1 - i),
+                watch_time_minutes=watch_time,
+            )
+            for i, (season, episode) in enumerate(episodes)
+        ]
+
+        with transaction.atomic():
+            WatchProgress.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=['content', 'season', 'episode'],
+                update_fields=['completed', 'watched_at', 'watch_time_minutes'],
+            )
+            WatchHistory.objects.create(
+                content=content,
+                watch_time_minutes=per_episode * len(episodes),
+                session_type='binge',
+            )
+            # bulk_create does not send post_save
+            refresh_progress_counters([content.pk])
+            bump_table_versions(WatchProgress, TVShow)
+            invalidate_content_detail([content.pk])
+
+        return Response({
+            'content': content.pk,
+            'marked': len(episodes),
+            'episodes': [{'season': s, 'episode': e} for s, e in episodes],
+            'watch_time_minutes': per_episode * len(episodes),
+        })
+
+
+class WatchHistoryViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     queryset = WatchHistory.objects.all()
     serializer_class = WatchHistorySerializer
     filter_backends = [DjangoFilterBackend, OrderingFilter]
     filterset_fields = ['content', 'watch_date', 'session_type']
     ordering_fields = ['watch_date']
     ordering = ['-watch_date']
+    replica_actions = ('statistics',)
     
     @action(detail=False, methods=['get'])
     def statistics(self, request):
@@ -471,6 +718,194 @@ class WatchHistoryViewSet(viewsets.ReadOnlyModelViewSet):
             'daily_breakdown': list(reversed(daily_stats))
         })
 
+    @action(detail=False, methods=['post'])
+    def ingest(self, request):
+        """Accept watch events (`{"events": [...]}` or a single event) into the ingest buffer.
+
+        Responds 202 once the events are queued (and journaled); 503 with
+        Retry-After when the buffer stays full.
+        """
+        payload = request.data.get('events', [request.data]) if isinstance(request.data, dict) else request.data
+        if not isinstance(payload, list) or not payload:
+            return Response({'error': 'events must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            events = [parse_watch_event(item) for item in payload]
+        except (ValueError, AttributeError) as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        ingest = get_watch_history_ingest()
+        if ingest is None:
+            return Response({'accepted': write_watch_events(events), 'buffered': False},
+                            status=status.HTTP_201_CREATED)
+        try:
+            accepted = ingest.submit_many(events)
+        except IngestQueueFull as exc:
+            response = Response({'error': str(exc), 'accepted': exc.accepted},
+                                status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            response['Retry-After'] = str(max(1, round(ingest.flush_interval)))
+            return response
+        return Response({'accepted': accepted, 'buffered': True}, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=['get'])
+    def ingest_stats(self, request):
+        """Queue depth, backpressure and flush metrics of the ingest buffer"""
+        ingest = get_watch_history_ingest()
+        return Response(ingest.stats() if ingest is not None else {'enabled': False})
+
+
+class ImportJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Letterboxd/IMDb CSV imports: upload a file, then poll the job for progress"""
+    queryset = ImportJob.objects.all()
+    serializer_class = ImportJobSerializer
+
+    def create(self, request):
+        """Store the uploaded CSV and start importing it in the background"""
+        upload = request.FILES.get('file')
+        if not upload:
+            return Response({'error': 'file is required'}, status=status.HTTP_400_BAD_REQUEST)
+        max_bytes = settings.IMPORT_MAX_UPLOAD_BYTES
+        if upload.size > max_bytes:
+            return Response({'error': f'file must be at most {filesizeformat(max_bytes)}'},
+                            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        import_dir = Path(settings.MEDIA_ROOT) / 'imports'
+        import_dir.mkdir(parents=True, exist_ok=True)
+        path = import_dir / f"{uuid.uuid4().hex}.csv"
+        with open(path, 'wb') as handle:
+            for chunk in upload.chunks():
+                handle.write(chunk)
+
+        source = request.data.get('source')
+        if not source:
+            with open(path, encoding='utf-8-sig', errors='replace', newline='') as handle:
+                source = detect_source(next(csv.reader(handle), []))
+        if source not in ROW_PARSERS:
+            path.unlink()
+            return Response({'error': f'source must be one of {sorted(ROW_PARSERS)} (could not detect it)'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        job = ImportJob.objects.create(source=source, file_path=str(path))
+        start_import_job(job)
+        return Response(ImportJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['post'])
+    def resume(self, request, pk=None):
+        """Continue an interrupted or failed import after its last committed batch"""
+        job = self.get_object()
+        if job.status == 'completed':
+            return Response({'error': 'Import already completed'}, status=status.HTTP_400_BAD_REQUEST)
+        if is_job_running(job.pk):
+            return Response({'error': 'Import is already running'}, status=status.HTTP_409_CONFLICT)
+        start_import_job(job)
+        return Response(ImportJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+MAX_EPISODES_PER_BATCH = 1000
+
+
+def _int_field(value, name):
+    """`value` as an int; ValueError naming the field otherwise"""
+    if isinstance(value, bool):
+        raise ValueError(f'{name} must be an integer')
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{name} must be an integer')
+
+
+def _parse_episode_selection(data, content):
+    """Turn a mark_episodes payload into a sorted list of (season, episode) pairs"""
+    if data.get('episodes'):
+        items = data['episodes']
+        if not isinstance(items, list):
+            raise ValueError('episodes must be a list')
+        # Check sizes before building anything: a huge selection must not exhaust memory
+        if len(items) > MAX_EPISODES_PER_BATCH:
+            raise ValueError(f'At most {MAX_EPISODES_PER_BATCH} episodes can be marked at once')
+        if not all(isinstance(item, dict) for item in items):
+            raise ValueError('episodes must be a list of {"season": s, "episode": e} objects')
+        pairs = {
+            (_int_field(item.get('season'), 'episodes[].season'),
+             _int_field(item.get('episode'), 'episodes[].episode'))
+            for item in items
+        }
+    elif data.get('season') is not None:
+        season = _int_field(data['season'], 'season')
+        if data.get('episode_from') is not None or data.get('episode_to') is not None:
+            first = _int_field(data.get('episode_from') or 1, 'episode_from')
+            last = _int_field(data.get('episode_to') or first, 'episode_to')
+        else:
+            tv_show = getattr(content, 'tvshow', None) if content.content_type == 'tv_show' else None
+            layout = tv_show.episodes_per_season if tv_show else {}
+            count = layout.get(str(season), layout.get(season))
+            if not count:
+                raise ValueError(f'No episode count known for season {season}; pass episode_from/episode_to')
+            first, last = 1, _int_field(count, f'episodes_per_season[{season}]')
+        if last < first:
+            raise ValueError('episode_to must not be before episode_from')
+        if last - first + 1 > MAX_EPISODES_PER_BATCH:
+            raise ValueError(f'At most {MAX_EPISODES_PER_BATCH} episodes can be marked at once')
+        pairs = {(season, episode) for episode in range(first, last + 1)}
+    else:
+        raise ValueError('Provide episodes, or season with an optional episode_from/episode_to')
+    if not pairs:
+        raise ValueError('No episodes selected')
+    if len(pairs) > MAX_EPISODES_PER_BATCH:
+        raise ValueError(f'At most {MAX_EPISODES_PER_BATCH} episodes can be marked at once')
+    if any(season < 0 or episode < 1 for season, episode in pairs):
+        raise ValueError('Seasons must be >= 0 and episodes >= 1')
+    return sorted(pairs)
+
+
+@api_view(['GET'])
+def cache_stats(request):
+    """Per key-group cache hit/miss statistics for the worker serving the request"""
+    stats = cache.stats() if hasattr(cache, 'stats') else {}
+    stats['content_detail'] = detail_cache_stats()
+    return Response(stats)
+
+
+def metrics(request):
+    """Prometheus text exposition of this worker's request, query, upstream and cache metrics"""
+    if not metrics_enabled():
+        raise Http404('Metrics are disabled')
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def poster_file(request, content_hash, size):
+    """Serve a cached poster. URLs embed the image hash, so responses never change."""
+    if size not in POSTER_SIZES:
+        raise Http404('Unknown poster size')
+    etag = f'"{content_hash}-{size}"'
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponseNotModified()
+    else:
+        path = poster_path(content_hash, size)
+        if not path.exists():
+            raise Http404('Poster not cached')
+        response = FileResponse(open(path, 'rb'), content_type='image/jpeg')
+    response['ETag'] = etag
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+
+def poster_for_content(request, content_id, size):
+    """Redirect to a content item's cached poster, or to the original while it is fetched in the background."""
+    if size not in POSTER_SIZES:
+        raise Http404('Unknown poster size')
+    content = get_object_or_404(Content.objects.select_related('poster_image'), pk=content_id)
+    if not content.poster_url:
+        raise Http404('Content has no poster')
+    if is_poster_cached(content) and poster_path(content.poster_image.content_hash, size).exists():
+        response = HttpResponseRedirect(reverse('poster-file', args=[content.poster_image.content_hash, size]))
+        response['Cache-Control'] = 'public, max-age=300'
+        return response
+    queue_poster_fetch(content.pk)
+    # Hotlink for now; the next render gets the cached copy
+    response = HttpResponseRedirect(content.poster_url)
+    response['Cache-Control'] = 'no-cache'
+    return response
+
 
 # Need to import Sum for statistics
 from django.db.models import Sum
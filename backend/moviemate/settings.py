@@ -3,6 +3,7 @@ Django settings for moviemate project.
 """
 
 from pathlib import Path
+from corsheaders.defaults import default_headers
 from decouple import config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -36,6 +37,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
+    'api.slow_queries.SlowQueryMiddleware',
+    'api.compression.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -44,6 +48,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.ReadYourWritesMiddleware',
 ]
 
 ROOT_URLCONF = 'moviemate.urls'
@@ -70,13 +75,44 @@ WSGI_APPLICATION = 'moviemate.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# SQLite tuning profile applied to every connection (see api/db_profiles.py):
+# 'production' (WAL, mmap, busy timeout, lock retries) or 'default' (stock SQLite)
+DB_PROFILE = config('DB_PROFILE', default='production')
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Keep connections open across requests instead of reconnecting each time
+        'CONN_MAX_AGE': config('CONN_MAX_AGE', default=600, cast=int),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {},
     }
 }
 
+# Opt-in BEGIN mode, e.g. 'IMMEDIATE' (Django 5.1+). It applies to every transaction,
+# read-only ones included, so only set it for write-heavy deployments.
+DB_TRANSACTION_MODE = config('DB_TRANSACTION_MODE', default='')
+if DB_TRANSACTION_MODE:
+    DATABASES['default']['OPTIONS']['transaction_mode'] = DB_TRANSACTION_MODE
+
+# Optional read replica for statistics, recommendations and exports (see api/replica.py).
+# Set DB_REPLICA_PATH and refresh the copy with `manage.py refresh_replica --interval 60`.
+DB_REPLICA_PATH = config('DB_REPLICA_PATH', default='')
+# Older copies are ignored and reads fall back to the primary
+DB_REPLICA_MAX_LAG = config('DB_REPLICA_MAX_LAG', default=300, cast=int)
+
+if DB_REPLICA_PATH:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': f'file:{DB_REPLICA_PATH}?mode=ro',
+        # A read-only file cannot take the write lock BEGIN IMMEDIATE asks for
+        'OPTIONS': {},
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['api.replica.ReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -118,6 +154,29 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Class used to download posters into the local poster cache (see api/posters.py)
+POSTER_FETCHER = config('POSTER_FETCHER', default='api.posters.RequestsPosterFetcher')
+# Seconds to wait before fetching a poster again after a failed attempt
+POSTER_RETRY_AFTER = config('POSTER_RETRY_AFTER', default=600, cast=int)
+# Background threads per process downloading posters requested before they were cached
+POSTER_FETCH_WORKERS = config('POSTER_FETCH_WORKERS', default=2, cast=int)
+
+# Largest Letterboxd/IMDb CSV accepted by POST /api/imports/
+IMPORT_MAX_UPLOAD_BYTES = config('IMPORT_MAX_UPLOAD_BYTES', default=20 * 1024 * 1024, cast=int)
+
+# Buffered WatchHistory writes (see api/ingest.py). Events are journaled to
+# JOURNAL_DIR before being acknowledged; set it to '' to trade durability for speed.
+WATCH_HISTORY_INGEST = {
+    'ENABLED': config('WATCH_HISTORY_INGEST', default=True, cast=bool),
+    'MAX_QUEUE': config('WATCH_HISTORY_INGEST_MAX_QUEUE', default=10000, cast=int),
+    'BATCH_SIZE': config('WATCH_HISTORY_INGEST_BATCH_SIZE', default=500, cast=int),
+    'FLUSH_INTERVAL': config('WATCH_HISTORY_INGEST_FLUSH_INTERVAL', default=1.0, cast=float),
+    'SUBMIT_TIMEOUT': 0.5,
+    'JOURNAL_DIR': config('WATCH_HISTORY_INGEST_JOURNAL_DIR', default=str(BASE_DIR / 'ingest_journal')),
+    'JOURNAL_MAX_BYTES': config('WATCH_HISTORY_INGEST_JOURNAL_MAX_BYTES', default=1024 * 1024, cast=int),
+    'FSYNC': config('WATCH_HISTORY_INGEST_FSYNC', default=False, cast=bool),
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -131,6 +190,21 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
+# JSON encoder for API responses: 'orjson' (used when installed) or 'stdlib' (see api/renderers.py)
+API_JSON_RENDERER = config('API_JSON_RENDERER', default='orjson')
+
+# brotli/gzip for text and JSON responses of at least MIN_SIZE bytes (see api/compression.py)
+RESPONSE_COMPRESSION = {
+    'ENABLED': config('RESPONSE_COMPRESSION', default=True, cast=bool),
+    'MIN_SIZE': config('RESPONSE_COMPRESSION_MIN_SIZE', default=1024, cast=int),
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 5,
 }
 
 # CORS settings
@@ -141,17 +215,74 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_ALL_ORIGINS = DEBUG  # Only in development
 
+# The SPA echoes the read-your-writes fence from write responses (api/replica.py)
+CORS_ALLOW_HEADERS = (*default_headers, 'x-db-fence')
+CORS_EXPOSE_HEADERS = ['X-DB-Fence']
+
+# Prometheus metrics at /api/metrics (see api/metrics.py); off removes all instrumentation
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+
+# Opt-in slow-query log with query plans (see api/slow_queries.py); report with `manage.py slow_queries`
+SLOW_QUERY_LOG = {
+    'ENABLED': config('SLOW_QUERY_LOG', default=False, cast=bool),
+    'THRESHOLD_MS': config('SLOW_QUERY_THRESHOLD_MS', default=100, cast=float),
+    'PATH': config('SLOW_QUERY_LOG_PATH', default=str(BASE_DIR / 'logs' / 'slow_queries.jsonl')),
+    'EXPLAIN': True,
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'simple': {'format': '{asctime} {levelname} {name}: {message}', 'style': '{'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'simple'},
+    },
+    'loggers': {
+        'api': {'handlers': ['console'], 'level': config('LOG_LEVEL', default='INFO'), 'propagate': False},
+    },
+}
+
 # TMDB API Key (get from https://www.themoviedb.org/settings/api)
 TMDB_API_KEY = config('TMDB_API_KEY', default='')
 
 # OMDB API Key (get from http://www.omdbapi.com/apikey.aspx)
 OMDB_API_KEY = config('OMDB_API_KEY', default='')
 
-# Simple in-memory cache for development. Use Redis or Memcached in production.
+# Upstream base URLs. Point these at `manage.py run_fake_upstream` to work offline.
+TMDB_API_BASE_URL = config('TMDB_API_BASE_URL', default='https://api.themoviedb.org/3')
+TMDB_IMAGE_BASE_URL = config('TMDB_IMAGE_BASE_URL', default='https://image.tmdb.org/t/p')
+OMDB_API_BASE_URL = config('OMDB_API_BASE_URL', default='https://www.omdbapi.com/')
+
+# Two-tier cache: a per-process LRU in front of a cache shared by all workers.
+# The shared tier is Redis when REDIS_URL is set (requires the `redis` package),
+# otherwise a file-based cache under BASE_DIR / '.cache'.
+REDIS_URL = config('REDIS_URL', default='')
+
+if REDIS_URL:
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    }
+else:
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '.cache',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'moviemate-cache',
-    }
+        'BACKEND': 'api.cache_backends.TwoTierCache',
+        'OPTIONS': {
+            'L2': 'shared',
+            'L1_MAX_ENTRIES': config('CACHE_L1_MAX_ENTRIES', default=2000, cast=int),
+            'L1_TIMEOUT': config('CACHE_L1_TIMEOUT', default=60, cast=int),
+            'STAMP_CHECK_INTERVAL': 1.0,
+            # ETag validators and detail payload versions must never be served stale
+            'L1_BYPASS': ['table_version', 'content_detail_version'],
+        },
+    },
+    'shared': SHARED_CACHE,
 }
-
@@ -23,8 +23,16 @@ const ContentCard = ({ content }) => {
   const cardInner = (
     <>
       <div className="card-image">
-        {content.poster_url ? (
-          <img src={content.poster_url} alt={content.title} />
+        {content.poster_thumbnails ? (
+          <img
+            src={content.poster_thumbnails.medium}
+            srcSet={`${content.poster_thumbnails.small} 185w, ${content.poster_thumbnails.medium} 342w`}
+            sizes="(max-width: 768px) 150px, 250px"
+            loading="lazy"
+            alt={content.title}
+          />
+        ) : content.poster_url ? (
+          <img src={content.poster_url} alt={content.title} loading="lazy" />
         ) : (
           <div className="placeholder-image">
             <FaVideo />
@@ -21,27 +21,18 @@ const ContentDetail = () => {
     loadContent()
   }, [id])
 
-  useEffect(() => {
-    if (content) {
-      if (content.rating_value) {
-        setRating(content.rating_value)
-      }
-      if (content.review_text) {
-        setReview(content.review_text)
-      }
-      loadRating()
-      loadReview()
-      if (content.content_type === 'tv_show') {
-        loadEstimate()
-      }
-    }
-  }, [content])
-
   const loadContent = async () => {
     try {
       setLoading(true)
-      const response = await contentAPI.get(id)
-      setContent(response.data)
+      // One request for the content, its rating, reviews and completion estimate
+      const response = await contentAPI.getBundle(id)
+      const bundle = response.data
+      setContent(bundle.content)
+      setRating(bundle.rating ? bundle.rating.rating : 0)
+      const contentReview = bundle.reviews[0]
+      setReview(contentReview ? contentReview.review_text : '')
+      setNotes(contentReview ? contentReview.notes : '')
+      setEstimate(bundle.completion_estimate)
     } catch (error) {
       console.error('Error loading content:', error)
       toast.error('Error loading content')
@@ -50,52 +41,6 @@ const ContentDetail = () => {
     }
   }
 
-  const loadRating = async () => {
-    try {
-      const response = await ratingAPI.getAll()
-      const ratings = response.data.results || response.data
-      const contentRating = ratings.find(r => r.content === parseInt(id))
-      if (contentRating) {
-        setRating(contentRating.rating)
-      } else if (content?.rating_value) {
-        setRating(content.rating_value)
-      }
-    } catch (error) {
-      console.error('Error loading rating:', error)
-      if (content?.rating_value) {
-        setRating(content.rating_value)
-      }
-    }
-  }
-
-  const loadReview = async () => {
-    try {
-      const response = await reviewAPI.getAll()
-      const reviews = response.data.results || response.data
-      const contentReview = reviews.find(r => r.content === parseInt(id))
-      if (contentReview) {
-        setReview(contentReview.review_text)
-        setNotes(contentReview.notes)
-      } else if (content?.review_text) {
-        setReview(content.review_text)
-      }
-    } catch (error) {
-      console.error('Error loading review:', error)
-      if (content?.review_text) {
-        setReview(content.review_text)
-      }
-    }
-  }
-
-  const loadEstimate = async () => {
-    try {
-      const response = await contentAPI.getCompletionEstimate(id)
-      setEstimate(response.data)
-    } catch (error) {
-      console.error('Error loading estimate:', error)
-    }
-  }
-
   const handleRatingChange = async (newRating) => {
     try {
       setRating(newRating)
@@ -157,7 +102,6 @@ const ContentDetail = () => {
       })
       toast.success(`Season ${season}, Episode ${episode} marked as watched!`)
       loadContent()
-      loadEstimate()
     } catch (error) {
       console.error('Error marking episode:', error)
       toast.error('Error marking episode')
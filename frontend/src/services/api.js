@@ -9,6 +9,19 @@ const api = axios.create({
   },
 })
 
+// Read-your-writes: after a write, echo its fence so analytics endpoints served
+// from the read replica fall back to the primary until the replica catches up
+let dbFence = null
+api.interceptors.request.use((config) => {
+  if (dbFence) config.headers['X-DB-Fence'] = dbFence
+  return config
+})
+api.interceptors.response.use((response) => {
+  const fence = response.headers['x-db-fence']
+  if (fence) dbFence = fence
+  return response
+})
+
 // Content API
 export const contentAPI = {
   getAll: (params) => api.get('/content/', { params }),
@@ -24,7 +37,10 @@ export const contentAPI = {
   importFromTMDB: (data) => api.post('/content/import_from_tmdb/', data),
   searchOMDB: (query, type) => api.get('/content/search_omdb/', { params: { q: query, type } }),
   importFromOMDB: (data) => api.post('/content/import_from_omdb/', data),
+  getBundle: (id) => api.get(`/content/${id}/bundle/`),
   getCompletionEstimate: (id) => api.get(`/content/${id}/completion_estimate/`),
+  getCompletionEstimates: (params) => api.get('/content/completion_estimates/', { params }),
+  exportUrl: (exportFormat = 'csv') => `${API_BASE_URL}/content/export/?export_format=${exportFormat}`,
 }
 
 // Genre API
@@ -59,6 +75,8 @@ export const watchProgressAPI = {
   getAll: () => api.get('/watch-progress/'),
   create: (data) => api.post('/watch-progress/', data),
   markEpisode: (data) => api.post('/watch-progress/mark_episode/', data),
+  markEpisodes: (data) => api.post('/watch-progress/mark_episodes/', data),
+  getUpNext: (params) => api.get('/watch-progress/up_next/', { params }),
 }
 
 // Watch History API
@@ -67,6 +85,18 @@ export const watchHistoryAPI = {
   getStatistics: () => api.get('/watch-history/statistics/'),
 }
 
+// History Import API (Letterboxd / IMDb CSV exports)
+export const importAPI = {
+  upload: (file, source) => {
+    const data = new FormData()
+    data.append('file', file)
+    if (source) data.append('source', source)
+    return api.post('/imports/', data, { headers: { 'Content-Type': 'multipart/form-data' } })
+  },
+  get: (id) => api.get(`/imports/${id}/`),
+  resume: (id) => api.post(`/imports/${id}/resume/`),
+}
+
 export default api
 
 